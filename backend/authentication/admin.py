@@ -1,9 +1,15 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User
+from .models import RevokedToken, User
 
 class CustomUserAdmin(UserAdmin):
     pass
 
 # Register your models here.
 admin.site.register(User, CustomUserAdmin)
+
+
+@admin.register(RevokedToken)
+class RevokedTokenAdmin(admin.ModelAdmin):
+    list_display = ('jti', 'user_id', 'revoked_at', 'expires_at')
+    search_fields = ('jti',)
@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from . import revocation
+
+DEFAULT_USER_CACHE_TTL = 60
+
+
+def _user_cache_key(user_id):
+    return f"authentication:user:{user_id}"
+
+
+def cached_user(user_id):
+    """
+    The User with primary key `user_id`, cached for AUTH_USER_CACHE_TTL
+    seconds, or None if there is no such user.
+    """
+    key = _user_cache_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = get_user_model().objects.filter(pk=user_id).first()
+        if user is not None:
+            cache.set(key, user, getattr(settings, "AUTH_USER_CACHE_TTL", DEFAULT_USER_CACHE_TTL))
+    return user
+
+
+def forget_user(user_id):
+    cache.delete(_user_cache_key(user_id))
+
+
+class ClaimsUser:
+    """
+    request.user under ClaimsJWTAuthentication. `id`, `username` and
+    `first_name` are read from the signed claims that
+    MyTokenObtainPairSerializer.get_token adds, so code that only needs
+    those never touches the database. Any other attribute (email,
+    is_staff, has_perm(), ...) comes from the full User, loaded on first
+    use through cached_user().
+
+    Code that assigns a user to a foreign key should set `user_id` instead:
+    a ClaimsUser is not a model instance.
+    """
+
+    is_anonymous = False
+    is_authenticated = True
+
+    def __init__(self, token):
+        self.token = token
+        # The claim is a string; match the model's primary key type.
+        self.id = self.pk = get_user_model()._meta.pk.to_python(token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def username(self):
+        # Tokens issued before the claim was added fall back to the model.
+        return self.token["username"] if "username" in self.token else self.user.username
+
+    @cached_property
+    def first_name(self):
+        return self.token["first_name"] if "first_name" in self.token else self.user.first_name
+
+    @cached_property
+    def user(self):
+        user = cached_user(self.id)
+        if user is None:
+            raise AuthenticationFailed("User not found.", code="user_not_found")
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive.", code="user_inactive")
+        return user
+
+    def get_username(self):
+        return self.username
+
+    def __getattr__(self, attr):
+        # Only called for attributes not found above.
+        if attr.startswith("__") or attr in ("token", "id", "pk"):
+            raise AttributeError(attr)
+        return getattr(self.user, attr)
+
+    def __eq__(self, other):
+        return getattr(other, "pk", None) == self.pk and getattr(other, "is_authenticated", False)
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __str__(self):
+        return self.username
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication without the per-request User lookup: a validated,
+    unrevoked token is trusted as is. Deactivating or deleting a user
+    revokes the tokens issued to them so far (see authentication.signals).
+    """
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if revocation.is_revoked(token):
+            raise InvalidToken("Token has been revoked.")
+        return token
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken("Token contained no recognizable user identification")
+        return ClaimsUser(validated_token)
@@ -0,0 +1,94 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class HashingBusy(Exception):
+    """
+    Raised instead of queueing when the hashing executor's backlog is full.
+    """
+
+
+class HashingExecutor:
+    """
+    Thread pool for password hashing with a bounded backlog. PBKDF2 runs in
+    OpenSSL with the GIL released, so a few threads use the CPUs while the
+    event loop (or the request worker) stays free for other requests. Work
+    beyond `max_pending` is refused with HashingBusy rather than queued,
+    so a login storm cannot grow latency without bound.
+    """
+
+    def __init__(self, workers, max_pending):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hashing")
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def submit(self, func, *args):
+        with self.lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HashingBusy()
+            self.pending += 1
+        future = self.executor.submit(func, *args)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future):
+        with self.lock:
+            self.pending -= 1
+            self.completed += 1
+
+    async def run(self, func, *args):
+        return await asyncio.wrap_future(self.submit(func, *args))
+
+    def stats(self):
+        with self.lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                # Queued and running; at most `workers` of them are running.
+                "pending": self.pending,
+                "queued": max(0, self.pending - self.workers),
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = getattr(settings, "AUTH_HASHING_WORKERS", os.cpu_count() or 1)
+                _executor = HashingExecutor(workers, getattr(settings, "AUTH_HASHING_MAX_PENDING", workers * 64))
+    return _executor
+
+
+async def make_password(raw_password):
+    return await get_executor().run(hashers.make_password, raw_password)
+
+
+def _check(raw_password, encoded):
+    upgrade = []
+    valid = hashers.check_password(raw_password, encoded, setter=upgrade.append)
+    return valid, bool(upgrade)
+
+
+async def check_password(raw_password, encoded):
+    """
+    Return (valid, needs_upgrade): needs_upgrade is True when the hash was
+    made with an outdated hasher or iteration count and should be replaced.
+    """
+    return await get_executor().run(_check, raw_password, encoded)
@@ -0,0 +1,117 @@
+import asyncio
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient
+
+from authentication import hashing
+from authentication.models import User
+
+USERNAME_PREFIX = "loginstorm-"
+PASSWORD = "Shift-change-2024"
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure logins/sec and the latency of concurrent ticket reads during "
+        "a login storm, against the ASGI application in-process. Benchmark "
+        "users are created for the run and deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--logins", type=int, default=100,
+                            help="Logins in the storm (default 100).")
+        parser.add_argument("--concurrency", type=int, default=50,
+                            help="Logins in flight at once (default 50).")
+        parser.add_argument("--readers", type=int, default=4,
+                            help="Concurrent ticket readers (default 4).")
+        parser.add_argument("--reads", type=int, default=50,
+                            help="Reads per reader in the quiet baseline (default 50).")
+        parser.add_argument("--read-url", default="/api/tickets/all/?page_size=50",
+                            help="Ticket read request (default first page of /api/tickets/all/).")
+
+    def handle(self, *args, **options):
+        # One hash shared by every benchmark user; hashing each would take
+        # longer than the storm itself.
+        encoded = make_password(PASSWORD)
+        users = [User(username=f"{USERNAME_PREFIX}{i}", password=encoded) for i in range(options["logins"])]
+        User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+        User.objects.bulk_create(users)
+        try:
+            asyncio.run(self._run(options))
+        finally:
+            User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+
+    async def _read(self, client, url, latencies):
+        started = time.perf_counter()
+        response = await client.get(url)
+        latencies.append(time.perf_counter() - started)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {url} returned {response.status_code}")
+
+    async def _run(self, options):
+        client = AsyncClient()
+        url = options["read_url"]
+        await self._read(client, url, [])  # warm caches
+
+        quiet = []
+
+        async def quiet_reader():
+            for _ in range(options["reads"]):
+                await self._read(client, url, quiet)
+
+        await asyncio.gather(*(quiet_reader() for _ in range(options["readers"])))
+
+        storm_reads = []
+        login_times = []
+        statuses = {}
+        peak = {"pending": 0}
+        done = asyncio.Event()
+        slots = asyncio.Semaphore(options["concurrency"])
+        executor = hashing.get_executor()
+
+        async def login(index):
+            async with slots:
+                started = time.perf_counter()
+                response = await client.post(
+                    "/api/auth/login/",
+                    {"username": f"{USERNAME_PREFIX}{index}", "password": PASSWORD},
+                    content_type="application/json",
+                )
+                login_times.append(time.perf_counter() - started)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                peak["pending"] = max(peak["pending"], executor.stats()["pending"])
+
+        async def storm_reader():
+            while not done.is_set():
+                await self._read(client, url, storm_reads)
+
+        async def storm():
+            try:
+                await asyncio.gather(*(login(i) for i in range(options["logins"])))
+            finally:
+                done.set()
+
+        started = time.perf_counter()
+        await asyncio.gather(storm(), *(storm_reader() for _ in range(options["readers"])))
+        elapsed = time.perf_counter() - started
+
+        ok = statuses.get(200, 0)
+        self.stdout.write(
+            f"Logins: {ok}/{options['logins']} succeeded in {elapsed:.2f}s ({ok / elapsed:.1f}/s), "
+            f"p50 {percentile(login_times, 0.5) * 1000:.0f}ms, p99 {percentile(login_times, 0.99) * 1000:.0f}ms, "
+            f"statuses {dict(sorted(statuses.items()))}, peak hashing backlog {peak['pending']}"
+        )
+        for label, latencies in (("quiet", quiet), ("during storm", storm_reads)):
+            self.stdout.write(
+                f"Ticket reads {label}: {len(latencies)} request(s), "
+                f"p50 {percentile(latencies, 0.5) * 1000:.1f}ms, p99 {percentile(latencies, 0.99) * 1000:.1f}ms"
+            )
@@ -0,0 +1,40 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.provisioning import ProvisioningError, provision_staff, read_staff_csv
+
+
+class Command(BaseCommand):
+    help = (
+        "Create user accounts from a staff CSV (username, email and optionally "
+        "first_name, last_name, password). Invalid or duplicate rows are "
+        "reported and skipped; the rest are created in one transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Staff CSV file.")
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="Password hashing processes (default: one per CPU).")
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Only validate the file.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            with open(options["path"], newline="", encoding="utf-8-sig") as source:
+                rows = read_staff_csv(source)
+            result = provision_staff(rows, workers=options["workers"], dry_run=options["dry_run"])
+        except (OSError, ProvisioningError) as exc:
+            raise CommandError(str(exc))
+
+        for error in result["errors"]:
+            problems = "; ".join(f"{field}: {' '.join(messages)}" for field, messages in error["errors"].items())
+            self.stderr.write(f"Row {error['row']}: {problems}")
+        elapsed = time.monotonic() - started
+        verb = "Validated" if options["dry_run"] else "Created"
+        count = len(rows) - len(result["errors"]) if options["dry_run"] else result["created"]
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {count} user(s), {len(result['errors'])} row(s) rejected, in {elapsed:.1f}s."
+        ))
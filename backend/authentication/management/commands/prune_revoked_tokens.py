@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from authentication.revocation import prune_expired
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete revocations of tokens that have expired anyway. Workers drop "
+        "them from their in-memory filter at their next rebuild."
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Pruned {prune_expired()} expired revocation(s).")
@@ -1,9 +1,10 @@
-# from django.db import models
+from django.db import models
 from django.contrib.auth.models import AbstractUser
 
 
 class User(AbstractUser):
-    pass
+    # Indexed for the uniqueness checks at registration and bulk provisioning.
+    email = models.EmailField("email address", blank=True, db_index=True)
     '''
     This is a custom version of the built in User class
     It contains all of the built in fields and functionality of the standard User
@@ -11,6 +12,21 @@ class User(AbstractUser):
     This is useful for adding roles (Customer and Employee, for example)
     For just a few roles, adding boolean fields is advised
     '''
-    # Example (note import of models above that is commented out)
+    # Example (uses the models import above)
     # this will add a column to the user table
     # is_student = models.BooleanField('student status', default=False)
+
+
+class RevokedToken(models.Model):
+    """
+    A revoked JWT, by its `jti` claim. Rows are only needed until the token
+    would have expired anyway, then `prune_revoked_tokens` deletes them.
+    """
+    jti = models.CharField(max_length=255, unique=True)
+    # Not a ForeignKey: the revocation must outlive a deleted user.
+    user_id = models.BigIntegerField(null=True, blank=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"{self.jti} (expires {self.expires_at:%Y-%m-%d %H:%M})"
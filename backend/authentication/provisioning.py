@@ -0,0 +1,156 @@
+import csv
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.contrib.auth import hashers
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from .models import User
+
+REQUIRED_COLUMNS = ("username", "email")
+OPTIONAL_COLUMNS = ("first_name", "last_name", "password")
+
+# Uploads through the endpoint are hashed inside the request, in its own
+# process. An empty password (an unusable one) costs next to nothing, but
+# each real one is a full PBKDF2 run, about half a second: larger files go
+# through the provision_staff command and its process pool.
+MAX_PROVISION_ROWS = 5000
+MAX_PROVISION_PASSWORDS = 10
+
+# Rows per IN (...) lookup, under every backend's bound-parameter limit.
+LOOKUP_CHUNK = 1000
+
+
+class ProvisioningError(Exception):
+    """
+    The staff file as a whole cannot be provisioned (bad header, too many
+    rows, or a concurrent insert of the same user).
+    """
+
+
+def read_staff_csv(source):
+    """
+    Parse a staff CSV (a text file object or a string) with a header row of
+    username, email and optionally first_name, last_name, password.
+    Returns a list of dicts; an empty password means the account gets an
+    unusable password.
+    """
+    if isinstance(source, str):
+        source = io.StringIO(source)
+    reader = csv.DictReader(source)
+    header = [name.strip() for name in reader.fieldnames or []]
+    missing = [name for name in REQUIRED_COLUMNS if name not in header]
+    if missing:
+        raise ProvisioningError(f"Missing column(s): {', '.join(missing)}.")
+    reader.fieldnames = header
+    return [
+        {name: (row.get(name) or "").strip() for name in REQUIRED_COLUMNS + OPTIONAL_COLUMNS}
+        for row in reader
+    ]
+
+
+def _existing(field, values):
+    values = list(values)
+    found = set()
+    for start in range(0, len(values), LOOKUP_CHUNK):
+        found.update(
+            User.objects.filter(**{f"{field}__in": values[start:start + LOOKUP_CHUNK]})
+            .values_list(field, flat=True)
+        )
+    return found
+
+
+def validate_rows(rows):
+    """
+    Check every row without a query per row: field rules first, then
+    duplicates within the file and against existing users through one
+    indexed IN lookup per column. Returns (valid rows, errors) where errors
+    holds {"row": <1-based data row>, "errors": {field: [messages]}}.
+    """
+    username_field = User._meta.get_field("username")
+    errors = {}
+    seen = {"username": set(), "email": set()}
+    for number, row in enumerate(rows, 1):
+        row["email"] = User.objects.normalize_email(row["email"])
+        problems = {}
+        for field in REQUIRED_COLUMNS:
+            if not row[field]:
+                problems[field] = ["This field is required."]
+        if row["username"]:
+            try:
+                username_field.clean(row["username"], None)
+            except ValidationError as exc:
+                problems["username"] = exc.messages
+        if row["email"]:
+            try:
+                validate_email(row["email"])
+            except ValidationError as exc:
+                problems["email"] = exc.messages
+        if row["password"]:
+            try:
+                validate_password(row["password"], User(username=row["username"], email=row["email"],
+                                                        first_name=row["first_name"], last_name=row["last_name"]))
+            except ValidationError as exc:
+                problems["password"] = exc.messages
+        for field in ("username", "email"):
+            if row[field] and field not in problems:
+                if row[field] in seen[field]:
+                    problems[field] = [f"Duplicate {field} in the file."]
+                seen[field].add(row[field])
+        if problems:
+            errors[number] = problems
+
+    existing = {field: _existing(field, values) for field, values in seen.items()}
+    for number, row in enumerate(rows, 1):
+        for field in ("username", "email"):
+            if row[field] in existing[field]:
+                errors.setdefault(number, {})[field] = [f"A user with that {field} already exists."]
+
+    valid = [row for number, row in enumerate(rows, 1) if number not in errors]
+    return valid, [{"row": number, "errors": errors[number]} for number in sorted(errors)]
+
+
+def hash_passwords(passwords, workers=1):
+    """
+    make_password() for each password (None gives an unusable password),
+    spread across `workers` processes if more than one: PBKDF2 is
+    CPU-bound, so this scales with cores where threads would not beyond
+    what the GIL allows.
+    """
+    if workers <= 1 or len(passwords) < 2:
+        return [hashers.make_password(password) for password in passwords]
+    # spawn rather than fork, in case the caller runs threads. Only Django's own functions are sent to the workers: unpickling
+    # anything from this module would import models before setup.
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=django.setup) as pool:
+        chunksize = max(1, min(64, len(passwords) // (workers * 4)))
+        return list(pool.map(hashers.make_password, passwords, chunksize=chunksize))
+
+
+def provision_staff(rows, workers=1, dry_run=False, batch_size=1000):
+    """
+    Validate `rows` (from read_staff_csv) and create a User for every valid
+    one in a single transaction. Invalid rows are skipped and reported.
+    Returns {"created": count, "errors": [...]}.
+    """
+    valid, errors = validate_rows(rows)
+    if dry_run or not valid:
+        return {"created": 0, "errors": errors}
+
+    encoded = hash_passwords([row["password"] or None for row in valid], workers)
+    users = [
+        User(username=row["username"], email=row["email"], first_name=row["first_name"],
+             last_name=row["last_name"], password=password)
+        for row, password in zip(valid, encoded)
+    ]
+    try:
+        with transaction.atomic():
+            User.objects.bulk_create(users, batch_size=batch_size)
+    except IntegrityError as exc:
+        raise ProvisioningError(f"Some users were created concurrently; nothing was saved ({exc}).")
+    return {"created": len(users), "errors": errors}
@@ -0,0 +1,234 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import DatabaseError, IntegrityError
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import RevokedToken
+
+DEFAULT_CAPACITY = 100_000
+DEFAULT_ERROR_RATE = 0.001
+DEFAULT_SYNC_INTERVAL = 2
+DEFAULT_REBUILD_INTERVAL = 60 * 60
+# Revocations are re-read this far behind the last sync, so a row committed
+# late by a slow transaction is still picked up.
+SYNC_OVERLAP = timedelta(seconds=30)
+
+# Claim linking an access token to the refresh token it was minted from
+# (see MyTokenObtainPairSerializer.get_token), so revoking a refresh token
+# also revokes every access token issued from it.
+SESSION_CLAIM = "sid"
+
+# A user's tokens are revoked by one row keyed "user:<id>": every token of
+# that user issued (by its "iat" claim) before the row's revoked_at.
+USER_KEY_PREFIX = "user:"
+
+
+class BloomFilter:
+    """
+    Fixed-size set of strings that may answer "present" for an absent key
+    (at about `error_rate` once `capacity` keys are added) but never
+    "absent" for a present one.
+    """
+
+    def __init__(self, capacity, error_rate=DEFAULT_ERROR_RATE):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: k positions from two 64-bit halves of one digest.
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevocationList:
+    """
+    This process's view of the RevokedToken table. Checks against the
+    in-memory Bloom filter, so a token that was never revoked (nearly all of
+    them) costs no query. Only a filter hit is confirmed in the database,
+    and remembered with its revocation time.
+
+    The filter is brought up to date with revocations made by other workers
+    at most every AUTH_REVOCATION_SYNC_INTERVAL seconds, reading only rows
+    added since the last sync. It is rebuilt from scratch every
+    AUTH_REVOCATION_REBUILD_INTERVAL seconds, which drops pruned entries
+    (a Bloom filter cannot remove keys), and sized for what it then holds.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.bloom = None
+        self.synced_at = None
+        self.next_sync = 0
+        self.next_rebuild = 0
+        self.confirmed = {}
+
+    def _setting(self, name, default):
+        return getattr(settings, name, default)
+
+    def rebuild(self):
+        now = timezone.now()
+        jtis = list(RevokedToken.objects.filter(expires_at__gt=now).values_list("jti", flat=True))
+        capacity = max(self._setting("AUTH_REVOCATION_CAPACITY", DEFAULT_CAPACITY), len(jtis) * 2)
+        bloom = BloomFilter(capacity, self._setting("AUTH_REVOCATION_ERROR_RATE", DEFAULT_ERROR_RATE))
+        for jti in jtis:
+            bloom.add(jti)
+        self.bloom, self.synced_at, self.confirmed = bloom, now, {}
+        self.next_rebuild = time.monotonic() + self._setting("AUTH_REVOCATION_REBUILD_INTERVAL",
+                                                             DEFAULT_REBUILD_INTERVAL)
+
+    def sync(self):
+        now = timezone.now()
+        added = RevokedToken.objects.filter(revoked_at__gte=self.synced_at - SYNC_OVERLAP)
+        for jti in added.values_list("jti", flat=True):
+            self.bloom.add(jti)
+            # A user revoked again has a later revoked_at; re-read it.
+            self.confirmed.pop(jti, None)
+        self.synced_at = now
+        if self.bloom.count > self.bloom.capacity:
+            self.next_rebuild = 0  # past capacity the error rate climbs; resize
+
+    def refresh(self, force=False):
+        """
+        Sync (or rebuild) if due. Only one thread refreshes at a time; the
+        others carry on with the current filter.
+        """
+        now = time.monotonic()
+        if not force and self.bloom is not None and now < self.next_sync:
+            return
+        if not self.lock.acquire(blocking=self.bloom is None or force):
+            return
+        try:
+            if self.bloom is None or time.monotonic() >= self.next_rebuild:
+                self.rebuild()
+            else:
+                self.sync()
+            self.next_sync = time.monotonic() + self._setting("AUTH_REVOCATION_SYNC_INTERVAL",
+                                                              DEFAULT_SYNC_INTERVAL)
+        finally:
+            self.lock.release()
+
+    def add(self, jti, revoked_at):
+        """
+        Record a revocation made by this process, effective immediately here.
+        """
+        if self.bloom is not None:
+            self.bloom.add(jti)
+        self.confirmed[jti] = revoked_at
+
+    def revoked_at(self, jti):
+        """
+        When `jti` was revoked, or None if it is not.
+        """
+        self.refresh()
+        if jti not in self.bloom:
+            return None
+        if jti in self.confirmed:
+            return self.confirmed[jti]
+        try:
+            revoked_at = RevokedToken.objects.filter(jti=jti).values_list("revoked_at", flat=True).first()
+        except DatabaseError:
+            return timezone.now()  # fail closed: the filter says it may be revoked
+        if revoked_at is not None:
+            self.confirmed[jti] = revoked_at
+        return revoked_at
+
+    def is_revoked(self, jti):
+        return self.revoked_at(jti) is not None
+
+
+_revocations = RevocationList()
+
+
+def get_revocation_list():
+    return _revocations
+
+
+def token_ids(token):
+    """
+    The ids a token is revoked by: its own jti and, for access tokens, the
+    jti of the refresh token it was minted from.
+    """
+    ids = [token[api_settings.JTI_CLAIM]] if api_settings.JTI_CLAIM in token else []
+    if SESSION_CLAIM in token and token[SESSION_CLAIM] not in ids:
+        ids.append(token[SESSION_CLAIM])
+    return ids
+
+
+def user_key(user_id):
+    return f"{USER_KEY_PREFIX}{user_id}"
+
+
+def is_revoked(token):
+    revocations = get_revocation_list()
+    if any(revocations.is_revoked(jti) for jti in token_ids(token)):
+        return True
+    if api_settings.USER_ID_CLAIM not in token:
+        return False
+    revoked_at = revocations.revoked_at(user_key(token[api_settings.USER_ID_CLAIM]))
+    # Tokens without "iat" cannot be dated, so count as issued before.
+    return revoked_at is not None and token.get("iat", 0) < revoked_at.timestamp()
+
+
+def revoke(jti, expires_at, user_id=None):
+    """
+    Revoke the token `jti` until `expires_at`. Revoking it again is a no-op.
+    """
+    try:
+        revoked, _ = RevokedToken.objects.get_or_create(
+            jti=jti, defaults={"expires_at": expires_at, "user_id": user_id})
+    except IntegrityError:
+        revoked = RevokedToken.objects.get(jti=jti)  # revoked concurrently
+    get_revocation_list().add(jti, revoked.revoked_at)
+
+
+def revoke_user(user_id):
+    """
+    Revoke every token issued to the user so far, e.g. when the account is
+    deactivated or deleted. Tokens issued later are not affected.
+    """
+    now = timezone.now()
+    lifetime = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+    key = user_key(user_id)
+    try:
+        RevokedToken.objects.update_or_create(
+            jti=key, defaults={"expires_at": now + lifetime, "user_id": user_id, "revoked_at": now})
+    except IntegrityError:
+        # Revoked concurrently; make sure the later time wins.
+        RevokedToken.objects.filter(jti=key, revoked_at__lt=now).update(expires_at=now + lifetime, revoked_at=now)
+    get_revocation_list().add(key, now)
+
+
+def revoke_token(token):
+    """
+    Revoke a validated token object until its own expiry.
+    """
+    expires_at = datetime.fromtimestamp(token["exp"], tz=dt_timezone.utc)
+    revoke(token[api_settings.JTI_CLAIM], expires_at, token.get(api_settings.USER_ID_CLAIM))
+
+
+def prune_expired(now=None):
+    """
+    Delete revocations of tokens that have expired anyway.
+    """
+    deleted, _ = RevokedToken.objects.filter(expires_at__lte=now or timezone.now()).delete()
+    return deleted
@@ -1,7 +1,11 @@
 from rest_framework import serializers
 from rest_framework.validators import UniqueValidator
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.password_validation import validate_password
+from . import revocation
 from .models import User
 
 
@@ -15,10 +19,24 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
 
         token["username"] = user.username
         token["first_name"] = user.first_name
+        # Copied into every access token minted from this refresh token, so
+        # revoking the refresh token revokes them too.
+        token[revocation.SESSION_CLAIM] = token[api_settings.JTI_CLAIM]
 
         return token
 
 
+class RevocationAwareTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    TOKEN_REFRESH_SERIALIZER: refuses refresh tokens that were revoked.
+    """
+
+    def validate(self, attrs):
+        if revocation.is_revoked(self.token_class(attrs["refresh"])):
+            raise InvalidToken("Token has been revoked.")
+        return super().validate(attrs)
+
+
 class RegistrationSerializer(serializers.ModelSerializer):
     email = serializers.EmailField(required=True, validators=[
                                    UniqueValidator(queryset=User.objects.all())])
@@ -34,19 +52,20 @@ class RegistrationSerializer(serializers.ModelSerializer):
                   'first_name', 'last_name',)
 
     def create(self, validated_data):
-
+        # The register view hashes the password off the request thread and
+        # passes the result in as `encoded_password`.
+        encoded_password = validated_data.pop('encoded_password', None)
         user = User.objects.create(
             username=validated_data['username'],
             email=validated_data['email'],
             first_name=validated_data['first_name'],
             last_name=validated_data['last_name'],
+            password=encoded_password or make_password(validated_data['password']),
 
             # If added new columns through the User model, add them in this
             # create method. Example below:
 
             # is_student=validated_data['is_student']
         )
-        user.set_password(validated_data['password'])
-        user.save()
 
         return user
@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import revocation
+from .authentication import forget_user
+from .models import User
+
+
+# Drop this process's cached copy straight away; other processes pick the
+# change up when their copy expires (AUTH_USER_CACHE_TTL).
+@receiver([post_save, post_delete], sender=User)
+def user_changed(sender, instance, raw=False, **kwargs):
+    forget_user(instance.pk)
+
+
+# ClaimsJWTAuthentication never loads the user, so a deactivated or deleted
+# user's tokens are revoked outright. Saves that may have changed is_active
+# of an inactive user revoke again, which only moves the cut-off forward;
+# QuerySet.update() sends no signal and should be followed by revoke_user().
+@receiver(post_save, sender=User)
+def user_deactivated(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or created or instance.is_active:
+        return
+    if update_fields is None or "is_active" in update_fields:
+        revocation.revoke_user(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    revocation.revoke_user(instance.pk)
@@ -1,3 +1,290 @@
-from django.test import TestCase
+import io
+import tempfile
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import MD5PasswordHasher, check_password, make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from cars.models import Car
+from . import hashing, provisioning, revocation
+from .authentication import ClaimsJWTAuthentication, ClaimsUser
+from .models import RevokedToken, User
+from .serializers import MyTokenObtainPairSerializer
+
+
+# Keeps the revocation filter from re-syncing in the middle of a query count.
+@override_settings(AUTH_REVOCATION_SYNC_INTERVAL=3600)
+class ClaimsJWTAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="nurse", first_name="Pat", email="nurse@example.com")
+
+    def setUp(self):
+        cache.clear()
+        self.token = MyTokenObtainPairSerializer.get_token(self.user).access_token
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+
+    def test_authenticated_requests_do_not_load_the_user(self):
+        Car.objects.create(user=self.user, make="Ford", model="Focus", year=2012)
+        self.client.get("/api/cars/")  # the first request also loads the reference data
+        # Only the view's own query; none to authenticate.
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/cars/")
+        self.assertEqual([car["make"] for car in response.data], ["Ford"])
+
+        response = self.client.post("/api/cars/", {"make": "Kia", "model": "Rio", "year": 2020}, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Car.objects.get(make="Kia").user_id, self.user.pk)
+
+    def test_claims_and_cached_full_user(self):
+        user = ClaimsJWTAuthentication().get_user(self.token)
+        with self.assertNumQueries(0):
+            self.assertEqual((user.id, user.username, user.first_name), (self.user.pk, "nurse", "Pat"))
+        with self.assertNumQueries(1):
+            self.assertEqual(user.email, "nurse@example.com")
+        # Cached across requests until the user changes.
+        with self.assertNumQueries(0):
+            self.assertFalse(ClaimsUser(self.token).is_staff)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.user.save(update_fields=["email"])
+        with self.assertRaises(AuthenticationFailed):
+            ClaimsUser(self.token).email
+
+    def test_rejects_missing_token(self):
+        self.client.credentials()
+        self.assertEqual(self.client.get("/api/cars/").status_code, 401)
+
+
+class AsyncLoginTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="nurse", first_name="Pat",
+                                       password=MD5PasswordHasher().encode("s3cure-Pass", "salt"))
+
+    def setUp(self):
+        self.client = APIClient()
+
+    @override_settings(PASSWORD_HASHERS=[
+        "django.contrib.auth.hashers.PBKDF2PasswordHasher",
+        "django.contrib.auth.hashers.MD5PasswordHasher",
+    ])
+    def test_login_issues_tokens_and_upgrades_hash(self):
+        response = self.client.post("/api/auth/login/", {"username": "nurse", "password": "s3cure-Pass"},
+                                    format="json")
+        self.assertEqual(response.status_code, 200)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['access']}")
+        self.assertEqual(self.client.get("/api/cars/").status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+
+        for username, password in (("nurse", "wrong"), ("nobody", "s3cure-Pass")):
+            response = self.client.post("/api/auth/login/", {"username": username, "password": password},
+                                        format="json")
+            self.assertEqual(response.status_code, 401)
+        response = self.client.post("/api/auth/login/", {"username": "nurse"}, format="json")
+        self.assertEqual(response.json(), {"password": ["This field is required."]})
+
+    def test_login_rejects_non_string_credentials(self):
+        for payload in ({"username": "nobody", "password": ["s3cure-Pass"]},
+                        {"username": {"$ne": ""}, "password": "s3cure-Pass"},
+                        {"username": "nurse", "password": 12345}):
+            response = self.client.post("/api/auth/login/", payload, format="json")
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(list(response.json().values()), [["Not a valid string."]])
+
+    def test_hashing_stats_are_for_admins(self):
+        self.assertEqual(self.client.get("/api/auth/hashing/").status_code, 401)
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get("/api/auth/hashing/").status_code, 403)
+        admin = User.objects.create(username="admin", is_staff=True)
+        self.client.force_authenticate(admin)
+        self.assertEqual(self.client.get("/api/auth/hashing/").json()["pending"], 0)
+
+    def test_register(self):
+        payload = {"username": "medic", "password": "Harder-2-Guess", "email": "medic@example.com",
+                   "first_name": "Sam", "last_name": "Lee"}
+        response = self.client.post("/api/auth/register/", payload, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn("password", response.json())
+        self.assertTrue(User.objects.get(username="medic").check_password("Harder-2-Guess"))
+
+        response = self.client.post("/api/auth/register/", payload, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("email", response.json())
+
+    def test_full_executor_refuses_work(self):
+        executor = hashing.HashingExecutor(workers=1, max_pending=0)
+        with self.assertRaises(hashing.HashingBusy):
+            executor.submit(make_password, "x")
+        self.assertEqual(executor.stats()["rejected"], 1)
+
+
+class TokenRevocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="nurse", first_name="Pat")
+
+    def setUp(self):
+        self.refresh = MyTokenObtainPairSerializer.get_token(self.user)
+        self.client = APIClient()
+
+    def get_cars(self, access):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {access}")
+        return self.client.get("/api/cars/")
+
+    def test_bloom_filter(self):
+        bloom = revocation.BloomFilter(1000, 0.01)
+        for i in range(1000):
+            bloom.add(f"revoked-{i}")
+        self.assertTrue(all(f"revoked-{i}" in bloom for i in range(1000)))
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_logout_revokes_refresh_token_and_its_access_tokens(self):
+        access, sibling = self.refresh.access_token, RefreshToken(str(self.refresh)).access_token
+        self.assertEqual(self.get_cars(access).status_code, 200)
+
+        response = self.client.post("/api/auth/logout/", {"refresh": str(self.refresh)}, format="json")
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.get_cars(access).status_code, 401)
+        self.assertEqual(self.get_cars(sibling).status_code, 401)
+        self.client.credentials()
+        response = self.client.post("/api/auth/login/refresh/", {"refresh": str(self.refresh)}, format="json")
+        self.assertEqual(response.status_code, 401)
+
+        other = MyTokenObtainPairSerializer.get_token(self.user).access_token
+        self.assertEqual(self.get_cars(other).status_code, 200)
+
+    def test_revocations_from_other_workers_and_pruning(self):
+        worker = revocation.RevocationList()
+        worker.refresh()
+        token = self.refresh.access_token
+        with self.assertNumQueries(0):
+            self.assertFalse(worker.is_revoked(token["jti"]))
+
+        # Revoked by another process: visible here at the next sync.
+        RevokedToken.objects.create(jti=token["jti"], expires_at=timezone.now() + timedelta(days=1))
+        worker.refresh(force=True)
+        self.assertTrue(worker.is_revoked(token["jti"]))
+
+        RevokedToken.objects.create(jti="expired", expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(revocation.prune_expired(), 1)
+        self.assertTrue(RevokedToken.objects.filter(jti=token["jti"]).exists())
+
+    def test_admin_revokes_any_token(self):
+        admin = User.objects.create(username="admin", is_staff=True)
+        self.client.force_authenticate(admin)
+        stolen = self.refresh.access_token
+        response = self.client.post("/api/auth/revoke/", {"token": str(stolen)}, format="json")
+        self.assertEqual(response.status_code, 204)
+        self.client.force_authenticate(None)
+        self.assertEqual(self.get_cars(stolen).status_code, 401)
+
+    def test_deactivating_or_deleting_a_user_revokes_their_tokens(self):
+        # Drop this test's revocations from the process-wide filter afterwards.
+        self.addCleanup(setattr, revocation.get_revocation_list(), "bloom", None)
+        issued = timezone.now() - timedelta(seconds=5)
+        deactivated = issued + timedelta(seconds=2)
+        access, refresh = self.refresh.access_token, RefreshToken(str(self.refresh))
+        access.set_iat(at_time=issued)
+        refresh.set_iat(at_time=issued)
+        self.assertEqual(self.get_cars(access).status_code, 200)
+
+        self.user.save(update_fields=["first_name"])  # unrelated saves revoke nothing
+        self.assertEqual(self.get_cars(access).status_code, 200)
+        self.user.is_active = False
+        with mock.patch.object(revocation.timezone, "now", return_value=deactivated):
+            self.user.save()
+        self.assertEqual(self.get_cars(access).status_code, 401)
+        self.client.credentials()
+        response = self.client.post("/api/auth/login/refresh/", {"refresh": str(refresh)}, format="json")
+        self.assertEqual(response.status_code, 401)
+
+        # Once reactivated, tokens issued afterwards work again.
+        self.user.is_active = True
+        self.user.save()
+        later = MyTokenObtainPairSerializer.get_token(self.user).access_token
+        self.assertEqual(self.get_cars(later).status_code, 200)
+        self.assertEqual(self.get_cars(access).status_code, 401)
+
+        # Another worker sees the revocation of a deleted user.
+        worker = revocation.RevocationList()
+        worker.refresh()
+        self.user.delete()
+        worker.refresh(force=True)
+        self.assertIsNotNone(worker.revoked_at(revocation.user_key(later["user_id"])))
+        self.assertTrue(revocation.is_revoked(later))
+
+
+class StaffProvisioningTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(username="admin", email="admin@example.com", is_staff=True)
+
+    def staff_csv(self, count, extra=""):
+        lines = ["username,email,first_name,last_name,password"]
+        lines += [f"staff{i},staff{i}@Example.COM,Pat,Doe," for i in range(count)]
+        return "\n".join(lines) + "\n" + extra
+
+    def test_endpoint_creates_valid_rows_and_reports_the_rest(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        extra = (
+            "staff0,other@example.com,,,\n"          # duplicate username in the file
+            "newbie,admin@example.com,,,\n"          # email already registered
+            "bad name!,bad-email,,,\n"
+            "nurse,nurse@example.com,Pat,Doe,Harder-2-Guess\n"
+        )
+        # Uniqueness is checked with one IN query per column, not per row.
+        with self.assertNumQueries(2):
+            response = client.post("/api/auth/provision/?dry_run=1", self.staff_csv(50, extra),
+                                   content_type="text/csv")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [51, 52, 53])
+        self.assertEqual(set(response.data["errors"][2]["errors"]), {"username", "email"})
+
+        response = client.post("/api/auth/provision/", self.staff_csv(50, extra), content_type="text/csv")
+        self.assertEqual((response.status_code, response.data["created"]), (201, 51))
+        staff = User.objects.get(username="staff7")
+        self.assertEqual(staff.email, "staff7@example.com")
+        self.assertFalse(staff.has_usable_password())
+        self.assertTrue(User.objects.get(username="nurse").check_password("Harder-2-Guess"))
+
+        client.force_authenticate(None)
+        self.assertEqual(client.post("/api/auth/provision/", "", content_type="text/csv").status_code, 401)
+
+    def test_endpoint_limits_passwords_hashed_per_request(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        lines = ["username,email,password"]
+        lines += [f"medic{i},medic{i}@example.com,Harder-2-Guess-{i}"
+                  for i in range(provisioning.MAX_PROVISION_PASSWORDS + 1)]
+        body = "\n".join(lines) + "\n"
+        response = client.post("/api/auth/provision/", body, content_type="text/csv")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("provision_staff command", response.data["detail"])
+        self.assertFalse(User.objects.filter(username__startswith="medic").exists())
+        # Validating them hashes nothing.
+        response = client.post("/api/auth/provision/?dry_run=1", body, content_type="text/csv")
+        self.assertEqual((response.status_code, response.data["errors"]), (200, []))
+
+    def test_command_and_parallel_hashing(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv") as source:
+            source.write(self.staff_csv(3))
+            source.flush()
+            call_command("provision_staff", source.name, workers=1, stdout=io.StringIO())
+        self.assertEqual(User.objects.filter(username__startswith="staff").count(), 3)
+
+        with self.assertRaises(provisioning.ProvisioningError):
+            provisioning.read_staff_csv("name,mail\n")
+        encoded = provisioning.hash_passwords(["Harder-2-Guess", None], workers=2)
+        self.assertTrue(check_password("Harder-2-Guess", encoded[0]))
+        self.assertTrue(encoded[1].startswith("!"))
@@ -1,9 +1,13 @@
 from django.urls import path
 from rest_framework_simplejwt.views import TokenRefreshView
-from .views import RegisterView, MyTokenObtainPairView
+from .views import hashing_stats, login, logout, provision, register, revoke
 
 urlpatterns = [
-    path('login/', MyTokenObtainPairView.as_view(), name='token_obtain_pair'),
+    path('login/', login, name='token_obtain_pair'),
     path('login/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
-    path('register/', RegisterView.as_view(), name='register'),
+    path('register/', register, name='register'),
+    path('logout/', logout, name='logout'),
+    path('revoke/', revoke, name='revoke'),
+    path('provision/', provision, name='provision'),
+    path('hashing/', hashing_stats, name='hashing_stats'),
 ]
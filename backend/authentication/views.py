@@ -1,16 +1,206 @@
+import json
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken, UntypedToken
+
+from . import hashing, revocation
+from .provisioning import (MAX_PROVISION_PASSWORDS, MAX_PROVISION_ROWS, ProvisioningError, provision_staff,
+                           read_staff_csv)
 from .serializers import MyTokenObtainPairSerializer, RegistrationSerializer
-from rest_framework import generics
-from rest_framework.permissions import AllowAny
-from rest_framework_simplejwt.views import TokenObtainPairView
 User = get_user_model()
 
+# Login and registration are plain async views rather than DRF views (which
+# are sync only): under ASGI the password hashing is awaited on the bounded
+# hashing executor, so a login storm does not tie up the threads that serve
+# ticket reads.
+
+
+def _request_data(request):
+    """
+    The JSON or form body as a dict, or None if it is malformed.
+    """
+    if request.content_type == 'application/json':
+        try:
+            data = json.loads(request.body or b'{}')
+        except ValueError:
+            return None
+        return data if isinstance(data, dict) else None
+    return request.POST
+
+
+def _bad_request_body():
+    return JsonResponse({'detail': 'Request body must be a JSON object.'}, status=400)
+
+
+def _busy():
+    response = JsonResponse({'detail': 'Too many logins in progress, try again shortly.'}, status=503)
+    response['Retry-After'] = '1'
+    return response
+
+
+@csrf_exempt
+@require_POST
+async def login(request):
+    """
+    Exchange a username and password for a refresh/access token pair, as
+    SimpleJWT's TokenObtainPairView does, with the claims added by
+    MyTokenObtainPairSerializer.
+    """
+    data = _request_data(request)
+    if data is None:
+        return _bad_request_body()
+    errors = {field: ['This field is required.'] for field in (User.USERNAME_FIELD, 'password')
+              if not data.get(field)}
+    errors.update({field: ['Not a valid string.'] for field in (User.USERNAME_FIELD, 'password')
+                   if field not in errors and not isinstance(data[field], str)})
+    if errors:
+        return JsonResponse(errors, status=400)
+
+    password = data['password']
+    user = await User._default_manager.filter(**{User.USERNAME_FIELD: data[User.USERNAME_FIELD]}).afirst()
+    try:
+        if user is None:
+            # Hash anyway, so response time does not reveal which usernames exist.
+            await hashing.make_password(password)
+            valid = upgrade = False
+        else:
+            valid, upgrade = await hashing.check_password(password, user.password)
+    except hashing.HashingBusy:
+        return _busy()
+    if not valid or not api_settings.USER_AUTHENTICATION_RULE(user):
+        return JsonResponse({'detail': 'No active account found with the given credentials'}, status=401)
+
+    if upgrade:
+        # Stored with an outdated hasher or iteration count: re-hash when
+        # there is room, or at a later login.
+        try:
+            user.password = await hashing.make_password(password)
+            await User._default_manager.filter(pk=user.pk).aupdate(password=user.password)
+        except hashing.HashingBusy:
+            pass
+    if api_settings.UPDATE_LAST_LOGIN:
+        await sync_to_async(update_last_login)(None, user)
+
+    refresh = MyTokenObtainPairSerializer.get_token(user)
+    return JsonResponse({'refresh': str(refresh), 'access': str(refresh.access_token)})
+
+
+@csrf_exempt
+@require_POST
+async def register(request):
+    """
+    Create an account. Responds like a DRF CreateAPIView with
+    RegistrationSerializer.
+    """
+    data = _request_data(request)
+    if data is None:
+        return _bad_request_body()
+    serializer = RegistrationSerializer(data=data)
+    if not await sync_to_async(serializer.is_valid)():
+        return JsonResponse(serializer.errors, status=400)
+    try:
+        encoded = await hashing.make_password(serializer.validated_data['password'])
+    except hashing.HashingBusy:
+        return _busy()
+    await sync_to_async(serializer.save)(encoded_password=encoded)
+    return JsonResponse(serializer.data, status=201)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def hashing_stats(request):
+    """
+    Password hashing executor load: pending (queued plus running) and
+    rejected hashes.
+    """
+    return Response(hashing.get_executor().stats())
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def logout(request):
+    """
+    Revoke the access token the request was made with and, if given in
+    {"refresh": "<token>"}, the refresh token, which also revokes every
+    other access token minted from it.
+    """
+    raw = request.data.get('refresh')
+    if raw:
+        try:
+            refresh = RefreshToken(raw)
+        except TokenError as exc:
+            return Response({'refresh': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+        if str(refresh.get(api_settings.USER_ID_CLAIM)) != str(request.user.id):
+            return Response({'refresh': ['Token belongs to another user.']}, status=status.HTTP_400_BAD_REQUEST)
+        revocation.revoke_token(refresh)
+    revocation.revoke_token(request.auth)
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
 
-class MyTokenObtainPairView(TokenObtainPairView):
-    serializer_class = MyTokenObtainPairSerializer
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def revoke(request):
+    """
+    Revoke any token, e.g. a stolen one: {"token": "<access or refresh token>"},
+    or {"jti": "<jti>"} when only its id is known, which keeps the
+    revocation for the longest token lifetime.
+    """
+    raw = request.data.get('token')
+    if raw:
+        try:
+            token = UntypedToken(raw)
+        except TokenError as exc:
+            return Response({'token': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST)
+        revocation.revoke_token(token)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    jti = request.data.get('jti')
+    if not jti:
+        return Response({'detail': 'Give a token or a jti.'}, status=status.HTTP_400_BAD_REQUEST)
+    lifetime = max(api_settings.ACCESS_TOKEN_LIFETIME, api_settings.REFRESH_TOKEN_LIFETIME)
+    revocation.revoke(str(jti), timezone.now() + lifetime)
+    return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class RegisterView(generics.CreateAPIView):
-    queryset = User.objects.all()
-    permission_classes = (AllowAny,)
-    serializer_class = RegistrationSerializer
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def provision(request):
+    """
+    Create accounts from a staff CSV, uploaded as the multipart field
+    `file` or sent as a text/csv body. ?dry_run=1 only validates. Invalid
+    rows are skipped and reported by their 1-based data row number. Rows
+    with a password are hashed in the request, so only a few are accepted.
+    """
+    upload = request.FILES.get('file') if request.content_type.startswith('multipart/') else None
+    raw = upload.read() if upload else request.body
+    try:
+        rows = read_staff_csv(raw.decode('utf-8-sig'))
+    except UnicodeDecodeError:
+        return Response({'detail': 'The file must be UTF-8 encoded.'}, status=status.HTTP_400_BAD_REQUEST)
+    except ProvisioningError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    if len(rows) > MAX_PROVISION_ROWS:
+        return Response({'detail': f'At most {MAX_PROVISION_ROWS} rows per request; '
+                                   f'use the provision_staff command for larger files.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    dry_run = request.query_params.get('dry_run') in ('1', 'true')
+    if not dry_run and sum(1 for row in rows if row['password']) > MAX_PROVISION_PASSWORDS:
+        return Response({'detail': f'At most {MAX_PROVISION_PASSWORDS} rows with a password per request; '
+                                   f'leave passwords empty or use the provision_staff command.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        result = provision_staff(rows, dry_run=dry_run)
+    except ProvisioningError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_409_CONFLICT)
+    return Response(result, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK)
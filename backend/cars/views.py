@@ -20,11 +20,11 @@ def get_all_cars(request):
 @permission_classes([IsAuthenticated])
 def user_cars(request):
     print(
-        'User ', f"{request.user.id} {request.user.email} {request.user.username}")
+        'User ', f"{request.user.id} {request.user.username}")
     if request.method == 'POST':
         serializer = CarSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save(user=request.user)
+            serializer.save(user_id=request.user.id)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     elif request.method == 'GET':
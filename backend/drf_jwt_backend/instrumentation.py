@@ -0,0 +1,318 @@
+"""
+Per-request SQL instrumentation, without DEBUG.
+
+SQLInstrumentationMiddleware records every statement a request runs: how
+many, the total time spent in the database and the slowest few. Each
+response gets a Server-Timing header (shown by browser dev tools), e.g.
+
+    Server-Timing: db;dur=12.4;desc="7 queries", app;dur=30.1
+
+and the figures are aggregated per route and method in this process, with
+the slowest statements normalized (literals and IN lists replaced by "?"),
+served to staff at /api/sql-stats/.
+
+Unlike connection.queries under DEBUG, nothing is kept per statement beyond
+the few slowest of the running request, so memory does not grow with
+traffic. Queries a streaming response makes while its content is sent are
+not counted. Statements are recorded through one execute wrapper installed on
+every database connection as it connects; the request being recorded is
+found through a context variable, so queries that async views run through
+sync_to_async are counted too.
+
+Settings:
+    SQL_INSTRUMENTATION_SLOWEST   slowest statements kept per request and
+                                  per route (default 5)
+    SQL_SERVER_TIMING             add the Server-Timing header (default True)
+    SQL_EXPLAIN_THRESHOLD_MS      capture the plan of SELECTs slower than
+                                  this, once per statement and route, after
+                                  the response is built (default None: off)
+"""
+import contextvars
+import functools
+import heapq
+import re
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, connections
+from django.db.backends.signals import connection_created
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+
+DEFAULT_SLOWEST = 5
+UNMATCHED_ROUTE = "<unmatched>"
+
+_recording = contextvars.ContextVar("sql_recording", default=None)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.\"])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%s|\?")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_VALUES_LIST = re.compile(r"\bVALUES\s*\([^()]*\)(?:\s*,\s*\([^()]*\))*", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize(sql):
+    """
+    The statement with its literals and placeholders replaced by "?" and
+    IN and VALUES lists collapsed, so the same statement with different
+    arguments (or a different number of them) reads the same.
+    """
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _PLACEHOLDER.sub("?", sql)
+    sql = _IN_LIST.sub("IN (...)", sql)
+    sql = _VALUES_LIST.sub("VALUES (...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class Recording:
+    """
+    The statements of one request: count, total time and the `keep` slowest,
+    as (seconds, sequence, sql, params, alias). Params are only kept when
+    EXPLAIN capture is on.
+    """
+
+    def __init__(self, keep, explain_threshold=None):
+        self.keep = keep
+        self.explain_threshold = explain_threshold
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = []
+
+    def add(self, sql, params, many, alias, duration):
+        self.count += 1
+        self.duration += duration
+        if self.keep <= 0:
+            return
+        keep_params = (self.explain_threshold is not None and duration >= self.explain_threshold and not many)
+        entry = (duration, self.count, sql, params if keep_params else None, alias)
+        if len(self.slowest) < self.keep:
+            heapq.heappush(self.slowest, entry)
+        elif duration > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, entry)
+
+    def statements(self):
+        return sorted(self.slowest, reverse=True)
+
+
+def _record(execute, sql, params, many, context):
+    recording = _recording.get()
+    if recording is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recording.add(sql, params, many, context["connection"].alias, time.perf_counter() - started)
+
+
+def install(connection, **kwargs):
+    if _record not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record)
+
+
+connection_created.connect(install, dispatch_uid="sql_instrumentation")
+
+
+class StatementStats:
+    def __init__(self, sql):
+        self.sql = sql
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.plan = None
+
+    def as_dict(self):
+        return {
+            "sql": self.sql,
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+            "plan": self.plan,
+        }
+
+
+class RouteStats:
+    def __init__(self, route, method):
+        self.route = route
+        self.method = method
+        self.requests = 0
+        self.queries = 0
+        self.max_queries = 0
+        self.duration = 0.0
+        self.statements = {}
+
+    def as_dict(self):
+        requests = self.requests or 1
+        return {
+            "route": self.route,
+            "method": self.method,
+            "requests": self.requests,
+            "queries": self.queries,
+            "queries_per_request": round(self.queries / requests, 2),
+            "max_queries": self.max_queries,
+            "db_ms": round(self.duration * 1000, 3),
+            "db_ms_per_request": round(self.duration * 1000 / requests, 3),
+            "slowest": [stats.as_dict() for stats in
+                        sorted(self.statements.values(), key=lambda stats: stats.max, reverse=True)],
+        }
+
+
+class RouteTable:
+    """
+    Per-process aggregate of recorded requests by route pattern and method.
+    Each route keeps at most `keep` distinct statements, the slowest seen;
+    a statement's count and times cover the requests in which it was among
+    the slowest.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+
+    def add(self, route, method, recording):
+        """
+        Fold a finished request in. Returns the statements that should have
+        their plan captured: [(StatementStats, sql, params, alias)].
+        """
+        explain = []
+        with self.lock:
+            stats = self.routes.get((route, method))
+            if stats is None:
+                stats = self.routes[(route, method)] = RouteStats(route, method)
+            stats.requests += 1
+            stats.queries += recording.count
+            stats.max_queries = max(stats.max_queries, recording.count)
+            stats.duration += recording.duration
+            for duration, _, sql, params, alias in recording.statements():
+                key = normalize(sql)
+                statement = stats.statements.get(key)
+                if statement is None:
+                    statement = stats.statements[key] = StatementStats(key)
+                statement.count += 1
+                statement.total += duration
+                statement.max = max(statement.max, duration)
+                if params is not None and statement.plan is None:
+                    statement.plan = []  # claimed; filled in by capture_plans()
+                    explain.append((statement, sql, params, alias))
+            if len(stats.statements) > recording.keep:
+                fastest = sorted(stats.statements.values(), key=lambda statement: statement.max)
+                for statement in fastest[:len(stats.statements) - recording.keep]:
+                    del stats.statements[statement.sql]
+        return explain
+
+    def rows(self):
+        with self.lock:
+            rows = [stats.as_dict() for stats in self.routes.values()]
+        return sorted(rows, key=lambda row: row["db_ms"], reverse=True)
+
+    def reset(self):
+        with self.lock:
+            self.routes = {}
+
+
+_route_table = RouteTable()
+
+
+def get_route_table():
+    return _route_table
+
+
+def capture_plans(explain):
+    """
+    Run EXPLAIN for statements picked by RouteTable.add(). Unrecorded, and
+    only SELECTs: explaining a write runs it on some databases.
+    """
+    for statement, sql, params, alias in explain:
+        if not sql.lstrip().upper().startswith("SELECT"):
+            statement.plan = None
+            continue
+        connection = connections[alias]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f"{connection.ops.explain_query_prefix()} {sql}", params)
+                statement.plan = [" ".join(str(column) for column in row) for row in cursor.fetchall()]
+        except (DatabaseError, ValueError) as exc:
+            statement.plan = [f"EXPLAIN failed: {exc}"]
+
+
+class SQLInstrumentationMiddleware:
+    """
+    Records the SQL of each request; see the module docstring. Place it near
+    the top of MIDDLEWARE so the queries of other middleware count too.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def _start(self):
+        threshold = _setting("SQL_EXPLAIN_THRESHOLD_MS", None)
+        recording = Recording(_setting("SQL_INSTRUMENTATION_SLOWEST", DEFAULT_SLOWEST),
+                              None if threshold is None else threshold / 1000)
+        # Connections made before this module was imported never sent
+        # connection_created to it.
+        for connection in connections.all(initialized_only=True):
+            install(connection)
+        return recording, _recording.set(recording), time.perf_counter()
+
+    def _finish(self, request, response, recording, started):
+        match = getattr(request, "resolver_match", None)
+        route = match.route if match else UNMATCHED_ROUTE
+        explain = get_route_table().add(route, request.method, recording)
+        if _setting("SQL_SERVER_TIMING", True):
+            timing = (f'db;dur={recording.duration * 1000:.1f};desc="{recording.count} queries", '
+                      f'app;dur={(time.perf_counter() - started) * 1000:.1f}')
+            existing = response.get("Server-Timing")
+            response["Server-Timing"] = f"{existing}, {timing}" if existing else timing
+        return explain
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        recording, token, started = self._start()
+        try:
+            response = self.get_response(request)
+        finally:
+            _recording.reset(token)
+        capture_plans(self._finish(request, response, recording, started))
+        return response
+
+    async def __acall__(self, request):
+        recording, token, started = self._start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recording.reset(token)
+        explain = self._finish(request, response, recording, started)
+        if explain:
+            await sync_to_async(capture_plans)(explain)
+        return response
+
+
+@api_view(["GET", "DELETE"])
+@permission_classes([IsAdminUser])
+def sql_stats(request):
+    """
+    Queries and database time per route and method in this process, busiest
+    first, with the slowest statements of each. DELETE resets the table.
+    """
+    if request.method == "DELETE":
+        get_route_table().reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+    return Response(get_route_table().rows())
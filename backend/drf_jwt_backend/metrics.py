@@ -0,0 +1,503 @@
+"""
+Prometheus metrics at /metrics, aggregated over every worker process on the
+host without an external service.
+
+MetricsMiddleware counts requests by URL pattern, method and status, and
+observes their latency and response size into histograms. Each process
+writes its samples to its own memory-mapped file in METRICS_DIR (no locking
+between processes; a write is a dict lookup and an 8-byte store), and the
+/metrics view sums the files of all processes when scraped. Each file is
+named by process id and start time, so a process never reuses the file of
+an earlier one with the same id. Counters and histograms of processes that
+have exited are folded into an archive file at the next scrape, so totals
+do not drop when a worker is recycled and the directory does not grow; the
+in-flight gauge only counts live processes.
+
+Run the reset_metrics command once before starting the server processes,
+as with prometheus_client's multiprocess mode: a fresh server starts its
+counters from zero, which Prometheus reads as a counter reset.
+
+App-level gauges (tickets per status and priority, open tickets per
+priority, jobs per status) are read from the database at scrape time: the
+ticket counters and a count per status of the job table, both cheap to
+aggregate.
+
+Settings:
+    METRICS_DIR   directory for the per-process files, created if missing.
+                  Required when several processes serve requests: without
+                  it each process keeps its files in a private temporary
+                  directory, so /metrics reports only the process that
+                  serves the scrape.
+"""
+import atexit
+import bisect
+import contextlib
+import json
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+
+try:
+    import fcntl
+except ImportError:  # Windows: files of exited processes are not archived
+    fcntl = None
+
+from tickets import counters, reference
+from tickets.escalation import ESCALATION_STEPS
+from tickets.jobs import queue_depth
+from .instrumentation import UNMATCHED_ROUTE
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+COUNTER, GAUGE, HISTOGRAM = "counter", "gauge", "histogram"
+
+# Any other request method is labelled "other", so clients cannot create
+# series at will.
+HTTP_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS", "TRACE", "CONNECT"})
+
+# name -> (type, help, histogram buckets). Gauges here are summed over live
+# processes only.
+METRICS = {
+    "http_requests_total": (COUNTER, "Requests by URL pattern, method and status.", None),
+    "http_request_duration_seconds": (
+        HISTOGRAM, "Request latency by URL pattern and method.",
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    "http_response_size_bytes": (
+        HISTOGRAM, "Response body size by URL pattern and method; streamed responses are not measured.",
+        (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000),
+    ),
+    "http_requests_in_progress": (GAUGE, "Requests being served.", None),
+}
+
+FILE_PREFIX, FILE_SUFFIX = "metrics-", ".db"
+ARCHIVE_FILE = "metrics-archive.db"
+LOCK_FILE = ".archive.lock"
+
+_HEADER = struct.Struct("<Q")
+_LENGTH = struct.Struct("<I")
+_VALUE = struct.Struct("<d")
+INITIAL_FILE_SIZE = 1 << 20
+
+
+class MmapValues:
+    """
+    A file of named float64 values, written by one process and read by any.
+    Layout: the used length (uint64), then entries of key length (uint32),
+    key (UTF-8, padded so the value is 8-byte aligned) and value (float64).
+    An entry is written in full before the used length covers it, so readers
+    never see a partial one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, "x+b")  # never another process's file
+        self.file.truncate(INITIAL_FILE_SIZE)
+        self.capacity = INITIAL_FILE_SIZE
+        self.map = mmap.mmap(self.file.fileno(), self.capacity)
+        self.used = _HEADER.size
+        _HEADER.pack_into(self.map, 0, self.used)
+        self.offsets = {}
+
+    def _append(self, key):
+        encoded = key.encode()
+        padded = len(encoded) + (-(len(encoded) + _LENGTH.size) % 8)
+        size = _LENGTH.size + padded + _VALUE.size
+        if self.used + size > self.capacity:
+            self.capacity = max(self.capacity * 2, self.used + size)
+            self.map.close()
+            self.file.truncate(self.capacity)
+            self.map = mmap.mmap(self.file.fileno(), self.capacity)
+        _LENGTH.pack_into(self.map, self.used, len(encoded))
+        self.map[self.used + _LENGTH.size:self.used + _LENGTH.size + len(encoded)] = encoded
+        offset = self.used + _LENGTH.size + padded
+        _VALUE.pack_into(self.map, offset, 0.0)
+        self.used += size
+        _HEADER.pack_into(self.map, 0, self.used)
+        self.offsets[key] = offset
+        return offset
+
+    def add(self, key, amount):
+        with self.lock:
+            offset = self.offsets.get(key)
+            if offset is None:
+                offset = self._append(key)
+            _VALUE.pack_into(self.map, offset, _VALUE.unpack_from(self.map, offset)[0] + amount)
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+
+def _entry(key, value):
+    encoded = key.encode()
+    padding = -(len(encoded) + _LENGTH.size) % 8
+    return _LENGTH.pack(len(encoded)) + encoded + b"\0" * padding + _VALUE.pack(value)
+
+
+def write_values(path, items):
+    """
+    Replace `path` with a file of (key, value) items that read_values()
+    can read, atomically.
+    """
+    body = b"".join(_entry(key, value) for key, value in items)
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as target:
+        target.write(_HEADER.pack(_HEADER.size + len(body)) + body)
+    os.replace(temporary, path)
+
+
+def read_values(path):
+    """
+    Yield (key, value) from a file written by MmapValues, possibly by a
+    process that is still writing it.
+    """
+    with open(path, "rb") as source:
+        header = source.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            return
+        data = header + source.read(_HEADER.unpack(header)[0] - _HEADER.size)
+    used = len(data)
+    position = _HEADER.size
+    while position + _LENGTH.size <= used:
+        length = _LENGTH.unpack_from(data, position)[0]
+        padded = length + (-(length + _LENGTH.size) % 8)
+        offset = position + _LENGTH.size + padded
+        if offset + _VALUE.size > used:
+            return
+        yield data[position + _LENGTH.size:position + _LENGTH.size + length].decode(), \
+            _VALUE.unpack_from(data, offset)[0]
+        position = offset + _VALUE.size
+
+
+_private_dir = None
+
+
+def _remove_private_dir(path, pid):
+    if os.getpid() == pid:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def metrics_dir():
+    configured = getattr(settings, "METRICS_DIR", None)
+    if configured:
+        return configured
+    # Not shared: another process must not find, count or archive these.
+    global _private_dir
+    pid = os.getpid()
+    if _private_dir is None or _private_dir[0] != pid:
+        path = tempfile.mkdtemp(prefix="drf_jwt_backend-metrics-")
+        atexit.register(_remove_private_dir, path, pid)
+        _private_dir = (pid, path)
+    return _private_dir[1]
+
+
+def reset(directory=None):
+    """
+    Delete every process's metrics files. Run before the server processes
+    start, never while they run.
+    """
+    directory = directory or metrics_dir()
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return 0
+    removed = 0
+    for filename in names:
+        if filename.startswith(FILE_PREFIX):
+            try:
+                os.remove(os.path.join(directory, filename))
+            except FileNotFoundError:
+                continue
+            removed += 1
+    return removed
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """
+    This process's MmapValues, reopened after a fork or a METRICS_DIR change.
+    """
+    global _store
+    directory, pid = metrics_dir(), os.getpid()
+    store = _store
+    if store is None or store.pid != pid or store.directory != directory:
+        with _store_lock:
+            store = _store
+            if store is None or store.pid != pid or store.directory != directory:
+                os.makedirs(directory, exist_ok=True)
+                store = MmapValues(os.path.join(directory, f"{FILE_PREFIX}{pid}-{time.time_ns()}{FILE_SUFFIX}"))
+                store.pid, store.directory = pid, directory
+                _store = store
+    return store
+
+
+_keys = {}
+
+
+def _key(name, labels, sample=""):
+    # Series are few (routes x methods x statuses), so their encoded keys
+    # are kept rather than built for every request.
+    cache_key = (name, sample, *labels.items())
+    key = _keys.get(cache_key)
+    if key is None:
+        key = _keys[cache_key] = json.dumps([name, sample, labels], separators=(",", ":"))
+    return key
+
+
+def inc(name, labels, amount=1):
+    get_store().add(_key(name, labels), amount)
+
+
+def observe(name, labels, value):
+    buckets = METRICS[name][2]
+    store = get_store()
+    # Per-bucket counts; made cumulative when exposed.
+    index = bisect.bisect_left(buckets, value)
+    store.add(_key(name, labels, str(buckets[index]) if index < len(buckets) else "+Inf"), 1)
+    store.add(_key(name, labels, "sum"), value)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _process_files(directory):
+    """
+    [(filename, pid)] of the per-process files in `directory`.
+    """
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    files = []
+    for filename in names:
+        if not (filename.startswith(FILE_PREFIX) and filename.endswith(FILE_SUFFIX)):
+            continue
+        try:
+            pid = int(filename[len(FILE_PREFIX):-len(FILE_SUFFIX)].split("-")[0])
+        except ValueError:
+            continue  # the archive
+        files.append((filename, pid))
+    return files
+
+
+@contextlib.contextmanager
+def _directory_lock(directory, shared=False):
+    if fcntl is None or not os.path.isdir(directory):
+        yield
+        return
+    with open(os.path.join(directory, LOCK_FILE), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        yield
+
+
+def archive_exited(directory):
+    """
+    Fold the counters and histograms of processes that have exited into
+    the archive file and delete their files. Scrapes may run this at the
+    same time, so it holds a lock on the directory.
+    """
+    if fcntl is None or all(_alive(pid) for _, pid in _process_files(directory)):
+        return
+    with _directory_lock(directory):
+        exited = [filename for filename, pid in _process_files(directory) if not _alive(pid)]
+        if not exited:
+            return  # archived by a concurrent scrape
+        archive = os.path.join(directory, ARCHIVE_FILE)
+        totals = defaultdict(float)
+        if os.path.exists(archive):
+            for key, value in read_values(archive):
+                totals[key] += value
+        for filename in exited:
+            try:
+                values = list(read_values(os.path.join(directory, filename)))
+            except (OSError, UnicodeDecodeError, struct.error):
+                continue
+            for key, value in values:
+                name = json.loads(key)[0]
+                if name in METRICS and METRICS[name][0] != GAUGE:
+                    totals[key] += value
+        write_values(archive, totals.items())
+        for filename in exited:
+            try:
+                os.remove(os.path.join(directory, filename))
+            except FileNotFoundError:
+                pass
+
+
+def collect():
+    """
+    {(name, sample, labels as a tuple of pairs): value} summed over the
+    archive and the files of every process.
+    """
+    totals = defaultdict(float)
+    directory = metrics_dir()
+    archive_exited(directory)
+    # Shared, so a file is not archived between being listed and read.
+    with _directory_lock(directory, shared=True):
+        files = _process_files(directory)
+        if os.path.exists(os.path.join(directory, ARCHIVE_FILE)):
+            files.append((ARCHIVE_FILE, None))  # no gauges in it
+        contents = []
+        for filename, pid in files:
+            try:
+                contents.append((pid, list(read_values(os.path.join(directory, filename)))))
+            except (OSError, UnicodeDecodeError, struct.error):
+                continue  # being written
+    for pid, values in contents:
+        alive = None
+        for key, value in values:
+            name, sample, labels = json.loads(key)
+            if name not in METRICS:
+                continue
+            if METRICS[name][0] == GAUGE:
+                if alive is None:
+                    alive = pid is not None and _alive(pid)
+                if not alive:
+                    continue
+            totals[name, sample, tuple(sorted(labels.items()))] += value
+    return totals
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    value = float(value)
+    if value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def exposition(totals, app_gauges=()):
+    """
+    Prometheus text format for collect() totals and app gauges given as
+    (name, help, [(labels dict, value)]).
+    """
+    by_name = defaultdict(list)
+    for (name, sample, labels), value in totals.items():
+        by_name[name].append((labels, sample, value))
+    lines = []
+    for name in sorted(by_name):
+        kind, help_text, buckets = METRICS[name]
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+        if kind != HISTOGRAM:
+            for labels, _, value in sorted(by_name[name]):
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+            continue
+        series = defaultdict(dict)
+        for labels, sample, value in by_name[name]:
+            series[labels][sample] = value
+        for labels in sorted(series):
+            samples = series[labels]
+            cumulative = 0
+            for bound in [str(bucket) for bucket in buckets] + ["+Inf"]:
+                cumulative += samples.get(bound, 0)
+                lines.append(f"{name}_bucket{_labels(labels + (('le', bound),))} {_number(cumulative)}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(samples.get('sum', 0))}")
+            lines.append(f"{name}_count{_labels(labels)} {_number(cumulative)}")
+    for name, help_text, samples in app_gauges:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+        for labels, value in samples:
+            lines.append(f"{name}{_labels(tuple(sorted(labels.items())))} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def app_gauges():
+    by_bucket = defaultdict(int)
+    for row in counters.ticket_stats(("status", "priority")):
+        priority = reference.priority(row["priority"]) if row["priority"] else None
+        by_bucket[row["status"], str(priority.level) if priority else "none"] += row["count"]
+    open_tickets = defaultdict(int)
+    for (status, level), count in by_bucket.items():
+        if status in ESCALATION_STEPS:
+            open_tickets[level] += count
+    jobs = queue_depth()
+    return [
+        ("tickets", "Tickets by status and priority level.",
+         [({"status": status, "priority": level}, count) for (status, level), count in sorted(by_bucket.items())]),
+        ("tickets_open", "Tickets not yet archived, by priority level.",
+         [({"priority": level}, count) for level, count in sorted(open_tickets.items())]),
+        ("jobs", "Background jobs by status.",
+         [({"status": status}, jobs[status]) for status in ("queued", "running", "done", "failed")]),
+        ("jobs_oldest_due_seconds", "How long the oldest due job has waited for a worker.",
+         [({}, jobs["oldest_due_seconds"])]),
+    ]
+
+
+def metrics(request):
+    return HttpResponse(exposition(collect(), app_gauges()), content_type=CONTENT_TYPE)
+
+
+class MetricsMiddleware:
+    """
+    Records each request into the metrics store. Place it first in
+    MIDDLEWARE so the latency covers the other middleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def _finish(self, request, response, started):
+        match = getattr(request, "resolver_match", None)
+        method = request.method if request.method in HTTP_METHODS else "other"
+        labels = {"route": match.route if match else UNMATCHED_ROUTE, "method": method}
+        observe("http_request_duration_seconds", labels, time.perf_counter() - started)
+        if not response.streaming:
+            observe("http_response_size_bytes", labels, len(response.content))
+        inc("http_requests_total", dict(labels, status=str(response.status_code)))
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        inc("http_requests_in_progress", {})
+        try:
+            response = self.get_response(request)
+        finally:
+            inc("http_requests_in_progress", {}, -1)
+        self._finish(request, response, started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        inc("http_requests_in_progress", {})
+        try:
+            response = await self.get_response(request)
+        finally:
+            inc("http_requests_in_progress", {}, -1)
+        self._finish(request, response, started)
+        return response
@@ -45,6 +45,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so request latency covers all the other middleware.
+    'drf_jwt_backend.metrics.MetricsMiddleware',
+    # Early, so the queries made by the other middleware are counted too.
+    'drf_jwt_backend.instrumentation.SQLInstrumentationMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -126,7 +130,8 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': ('rest_framework_simplejwt.authentication.JWTAuthentication',)
+    # Trusts the token's claims instead of loading the User on every request.
+    'DEFAULT_AUTHENTICATION_CLASSES': ('authentication.authentication.ClaimsJWTAuthentication',)
 }
 
 SIMPLE_JWT = {
@@ -146,6 +151,7 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
 
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
+    'TOKEN_REFRESH_SERIALIZER': 'authentication.serializers.RevocationAwareTokenRefreshSerializer',
     'TOKEN_TYPE_CLAIM': 'token_type',
 
     'JTI_CLAIM': 'jti',
@@ -17,11 +17,15 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from drf_jwt_backend.instrumentation import sql_stats
+from drf_jwt_backend.metrics import metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/auth/', include('authentication.urls')),
     path('api/cars/', include('cars.urls')),
     path('api/tickets/', include('tickets.urls')
-    )
+    ),
+    path('api/sql-stats/', sql_stats),
+    path('metrics', metrics),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
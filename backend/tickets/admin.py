@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import PriorityLevel, MainDepartment, SubDepartment, Ticket
+from .models import PriorityLevel, MainDepartment, SubDepartment, Ticket, Job
 
 @admin.register(PriorityLevel)
 class PriorityLevelAdmin(admin.ModelAdmin):
@@ -25,10 +25,20 @@ class TicketAdmin(admin.ModelAdmin):
     date_hierarchy = 'created_at'
 
     def thumbnail(self, obj):
-        if obj.image:
+        # The small derivative, not the full upload, so the changelist does
+        # not download every original photo.
+        image = obj.image_thumbnail or obj.image
+        if image:
             return format_html(
-                '<img src="{}" style="max-height: 50px; max-width: 50px;" />',
-                obj.image.url
+                '<img src="{}" style="max-height: 50px; max-width: 50px;" loading="lazy" />',
+                image.url
             )
         return ""
     thumbnail.short_description = "Image"
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'priority', 'attempts', 'run_at', 'finished_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('locked_by', 'locked_at', 'started_at', 'finished_at', 'last_error')
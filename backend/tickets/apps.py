@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class TicketsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tickets'
+
+    def ready(self):
+        from django.core.signals import request_started
+
+        from . import reference, signals, tasks  # noqa: F401  (connects the Ticket signal handlers, registers the jobs)
+
+        request_started.connect(reference.warm, dispatch_uid=reference.WARM_UID)
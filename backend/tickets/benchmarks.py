@@ -0,0 +1,280 @@
+"""
+API micro-benchmarks at several dataset sizes.
+
+For each scale the ticket table is topped up with tickets.loadgen, then every
+case is requested through the Django test client (the full middleware and
+authentication stack, without a network hop):
+
+    - latency percentiles over up to `requests` timed requests, or as many
+      as fit in `max_seconds` (at least MIN_SAMPLES);
+    - queries and peak Python memory (tracemalloc) of a few further
+      requests, measured separately since both instruments slow requests
+      down.
+
+Results are plain dicts, saved as JSON by the benchmark_api command and
+compared against a saved baseline with compare().
+"""
+import platform
+import random
+import time
+import tracemalloc
+from itertools import count
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from authentication.models import User
+from authentication.serializers import MyTokenObtainPairSerializer
+from . import loadgen, views
+from .models import Ticket
+
+RESULTS_VERSION = 1
+DEFAULT_SCALES = (10_000, 100_000, 1_000_000)
+MIN_SAMPLES = 3
+
+BENCHMARK_USERNAME = "benchmark-login"
+BENCHMARK_PASSWORD = "Shift-change-2024"
+
+# compare() ignores differences smaller than these, whatever the threshold:
+# at sub-millisecond latencies the relative noise alone exceeds it.
+LATENCY_FLOOR = 0.002
+MEMORY_FLOOR = 64 * 1024
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summarize(latencies):
+    return {
+        "samples": len(latencies),
+        "mean": sum(latencies) / len(latencies) if latencies else 0.0,
+        "p50": percentile(latencies, 0.5),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "max": max(latencies, default=0.0),
+    }
+
+
+class Case:
+    """
+    One benchmarked request. `request(client)` sends it and returns the
+    response, or None when the case has run out of work (update_ticket and
+    delete_ticket work on the tickets create_ticket made).
+    """
+
+    def __init__(self, name, request, expected_status):
+        self.name = name
+        self.request = request
+        self.expected_status = expected_status
+
+    def send(self, client):
+        response = self.request(client)
+        if response is not None and response.status_code != self.expected_status:
+            raise RuntimeError(f"{self.name} returned {response.status_code}, expected {self.expected_status}: "
+                               f"{response.content[:200]!r}")
+        return response
+
+
+class Suite:
+    """
+    The benchmark cases, sharing state between them: tickets made by
+    create_ticket are the ones update_ticket and delete_ticket touch, so the
+    table stays at the scale being measured.
+    """
+
+    def __init__(self, seed=0, label="run"):
+        self.label = label
+        self.rng = random.Random(seed)
+        self.ids = count()
+        self.created = []
+        self.factory = APIRequestFactory()
+        self.login_user, _ = User.objects.get_or_create(username=BENCHMARK_USERNAME)
+        # Hashed once here so login measures checking a password, not setup.
+        self.login_user.password = make_password(BENCHMARK_PASSWORD)
+        self.login_user.save(update_fields=["password"])
+        # The heaviest user_tickets list.
+        busiest = Ticket.objects.values("user_id").annotate(tickets=Count("id")).order_by("-tickets").first()
+        self.busiest = User.objects.get(pk=busiest["user_id"]) if busiest else self.login_user
+        self.busiest_token = f"Bearer {MyTokenObtainPairSerializer.get_token(self.busiest).access_token}"
+        self.sub_department_ids = [sub_department.pk for sub_department in loadgen.ensure_reference_data()]
+
+    def cases(self):
+        return [
+            Case("get_all_tickets", lambda client: client.get("/api/tickets/all/"), 200),
+            Case("get_all_tickets_page", lambda client: client.get("/api/tickets/all/?page_size=50"), 200),
+            Case("user_tickets", self.user_tickets, 200),
+            Case("create_ticket", self.create_ticket, 201),
+            Case("update_ticket", self.update_ticket, 200),
+            Case("delete_ticket", self.delete_ticket, 204),
+            Case("login", self.login, 200),
+            Case("register", self.register, 201),
+        ]
+
+    def ticket_payload(self):
+        return {
+            "title": "Benchmark ticket",
+            "issue": "Infusion pump alarm keeps sounding",
+            "sub_department": self.rng.choice(self.sub_department_ids),
+        }
+
+    def user_tickets(self, client):
+        # Not routed in tickets.urls, so called directly; the bearer token
+        # still goes through authentication.
+        request = self.factory.get("/api/tickets/user/", HTTP_AUTHORIZATION=self.busiest_token)
+        response = views.user_tickets(request)
+        response.render()
+        return response
+
+    def create_ticket(self, client):
+        response = client.post("/api/tickets/create/", self.ticket_payload(), content_type="application/json",
+                               HTTP_AUTHORIZATION=self.busiest_token)
+        if response.status_code == 201:
+            self.created.append(response.json()["id"])
+        return response
+
+    def update_ticket(self, client):
+        if not self.created:
+            return None
+        pk = self.created[next(self.ids) % len(self.created)]
+        payload = dict(self.ticket_payload(), status=self.rng.choice(["1", "2", "3"]))
+        return client.put(f"/api/tickets/update/{pk}/", payload, content_type="application/json")
+
+    def delete_ticket(self, client):
+        if not self.created:
+            return None
+        return client.delete(f"/api/tickets/{self.created.pop()}/")
+
+    def login(self, client):
+        return client.post("/api/auth/login/", {"username": BENCHMARK_USERNAME, "password": BENCHMARK_PASSWORD},
+                           content_type="application/json")
+
+    def register(self, client):
+        username = f"benchmark-{self.label}-{next(self.ids)}"
+        return client.post("/api/auth/register/", {
+            "username": username, "password": BENCHMARK_PASSWORD, "email": f"{username}@example.com",
+            "first_name": "Pat", "last_name": "Doe",
+        }, content_type="application/json")
+
+
+def measure(case, client, requests, max_seconds):
+    case.send(client)  # warm-up: caches, imports, first-request work
+    latencies = []
+    deadline = time.perf_counter() + max_seconds
+    while len(latencies) < requests and (len(latencies) < MIN_SAMPLES or time.perf_counter() < deadline):
+        started = time.perf_counter()
+        if case.send(client) is None:
+            break
+        latencies.append(time.perf_counter() - started)
+
+    result = summarize(latencies)
+    # Counted over a few requests, taking the fewest: now and then one also
+    # does periodic work (e.g. a revocation list sync) that is not its own.
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    try:
+        for _ in range(MIN_SAMPLES):
+            tracemalloc.reset_peak()
+            baseline, _ = tracemalloc.get_traced_memory()
+            with CaptureQueriesContext(connection) as queries:
+                response = case.send(client)
+            _, peak = tracemalloc.get_traced_memory()
+            if response is None:
+                break
+            result["queries"] = min(result.get("queries", len(queries)), len(queries))
+            result["peak_memory"] = max(result.get("peak_memory", 0), peak - baseline)
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+    return result
+
+
+def describe(name, result):
+    line = (f"  {name:<22} p50 {result['p50'] * 1000:9.1f}ms  p95 {result['p95'] * 1000:9.1f}ms  "
+            f"p99 {result['p99'] * 1000:9.1f}ms  n={result['samples']}")
+    if "queries" in result:
+        line += f"  {result['queries']} queries  peak {result['peak_memory'] / 2 ** 20:.1f}MiB"
+    return line
+
+
+def fill_to(scale, seed=0):
+    """
+    Top the ticket table up to `scale` tickets; returns how many there are,
+    which is more than `scale` if the table already held more.
+    """
+    existing = Ticket.objects.count()
+    if existing < scale:
+        # Seeded by the target, so each top-up adds different tickets.
+        loadgen.generate(scale - existing, seed=seed + scale, image_ratio=0)
+    return max(existing, scale)
+
+
+def run(scales=DEFAULT_SCALES, requests=50, max_seconds=10, seed=0, cases=None, log=None):
+    """
+    Benchmark every case (or those named in `cases`) at each scale, smallest
+    first, against the current database, which is filled as it goes.
+    Progress is reported through `log(message)`.
+    """
+    log = log or (lambda message: None)
+    results = {
+        "version": RESULTS_VERSION,
+        "created_at": timezone.now().isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "machine": platform.machine(),
+        },
+        "settings": {"requests": requests, "max_seconds": max_seconds, "seed": seed},
+        "scales": {},
+    }
+    for scale in sorted(scales):
+        started = time.monotonic()
+        tickets = fill_to(scale, seed)
+        log(f"{tickets} tickets (filled in {time.monotonic() - started:.0f}s)")
+        suite = Suite(seed, label=str(scale))
+        client = Client()
+        measured = {}
+        for case in suite.cases():
+            if cases and case.name not in cases:
+                continue
+            measured[case.name] = measure(case, client, requests, max_seconds)
+            log(describe(case.name, measured[case.name]))
+        results["scales"][str(scale)] = {"tickets": tickets, "cases": measured}
+    return results
+
+
+def compare(baseline, current, threshold=0.2):
+    """
+    Regressions of `current` against `baseline` results, as messages:
+    latency (p50, p95) or peak memory up by more than `threshold`, or more
+    queries per request. Scales and cases missing from either are skipped.
+    """
+    regressions = []
+    for scale, measured in current["scales"].items():
+        before_cases = baseline["scales"].get(scale, {}).get("cases", {})
+        for name, after in measured["cases"].items():
+            before = before_cases.get(name)
+            if before is None:
+                continue
+            for stat in ("p50", "p95"):
+                if after[stat] > before[stat] * (1 + threshold) and after[stat] - before[stat] > LATENCY_FLOOR:
+                    regressions.append(f"{scale} {name}: {stat} {before[stat] * 1000:.1f}ms -> "
+                                       f"{after[stat] * 1000:.1f}ms")
+            if "queries" in before and after.get("queries", 0) > before["queries"]:
+                regressions.append(f"{scale} {name}: queries {before['queries']} -> {after['queries']}")
+            if ("peak_memory" in before and after.get("peak_memory", 0) > before["peak_memory"] * (1 + threshold)
+                    and after["peak_memory"] - before["peak_memory"] > MEMORY_FLOOR):
+                regressions.append(f"{scale} {name}: peak memory {before['peak_memory'] // 1024}KiB -> "
+                                   f"{after['peak_memory'] // 1024}KiB")
+    return regressions
@@ -0,0 +1,126 @@
+from django.db import transaction
+from django.utils import timezone
+
+from . import escalation, search
+from .counters import ticket_bucket
+from .inserts import bulk_create_with_pks
+from .models import Ticket
+from .serializers import TicketSerializer
+from .signals import bulk_write, tickets_bulk_created, tickets_bulk_deleted, tickets_bulk_updated
+
+MAX_BULK_ITEMS = 1000
+
+
+class BulkPayloadError(ValueError):
+    """
+    The payload is not shaped like {"create": [...], "update": [...], "delete": [...]}.
+    """
+
+
+def _as_id(value):
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _referenced_ids(items, field):
+    ids = {_as_id(item.get(field)) for item in items}
+    ids.discard(None)
+    return ids
+
+
+def _parse(payload):
+    if not isinstance(payload, dict):
+        raise BulkPayloadError("Expected an object with create, update and/or delete lists.")
+    creates = payload.get("create") or []
+    updates = payload.get("update") or []
+    deletes = payload.get("delete") or []
+    if not all(isinstance(part, list) for part in (creates, updates, deletes)):
+        raise BulkPayloadError("create, update and delete must be lists.")
+    if len(creates) + len(updates) + len(deletes) > MAX_BULK_ITEMS:
+        raise BulkPayloadError(f"At most {MAX_BULK_ITEMS} items per request.")
+    if not all(isinstance(item, dict) for item in creates + updates):
+        raise BulkPayloadError("create and update items must be objects.")
+    return creates, updates, deletes
+
+
+def apply_bulk(payload, user_id):
+    """
+    Validate and apply a batch of ticket creates, updates and deletes.
+
+    Validation resolves foreign keys from the reference cache. All valid
+    items are written in a single transaction using bulk_create/bulk_update
+    and one DELETE; invalid items are skipped and reported. Returns
+    per-item results in the order the items were given.
+    """
+    creates, updates, deletes = _parse(payload)
+    results = {"create": [], "update": [], "delete": []}
+    now = timezone.now()
+
+    new_tickets = []
+    for index, item in enumerate(creates):
+        serializer = TicketSerializer(data=item)
+        if not serializer.is_valid():
+            results["create"].append({"index": index, "status": 400, "errors": serializer.errors})
+            continue
+        ticket = Ticket(user_id=user_id, **serializer.validated_data)
+        escalation.schedule(ticket, now)
+        new_tickets.append(ticket)
+        results["create"].append({"index": index, "status": 201, "ticket": ticket})
+
+    existing = Ticket.objects.in_bulk(_referenced_ids(updates, "id"))
+    changed_tickets = []
+    seen_ids = set()
+    changed_fields = {"updated_at", "escalation_due_at"}
+    previous_buckets = {}
+    reindex_ids = []
+    for index, item in enumerate(updates):
+        ticket = existing.get(_as_id(item.get("id")))
+        if ticket is None or ticket.pk in seen_ids:
+            results["update"].append({"index": index, "status": 404, "id": item.get("id")})
+            continue
+        seen_ids.add(ticket.pk)
+        serializer = TicketSerializer(ticket, data=item, partial=True)
+        if not serializer.is_valid():
+            results["update"].append({"index": index, "status": 400, "errors": serializer.errors})
+            continue
+        previous_buckets[ticket.pk] = ticket_bucket(ticket)
+        for field, value in serializer.validated_data.items():
+            setattr(ticket, field, value)
+            changed_fields.add(field)
+        ticket.updated_at = now
+        escalation.schedule(ticket, now)
+        if search.text_changed(ticket):
+            reindex_ids.append(ticket.pk)
+        changed_tickets.append(ticket)
+        results["update"].append({"index": index, "status": 200, "ticket": ticket})
+
+    delete_ids = {_as_id(value) for value in deletes} - {None}
+    doomed = list(Ticket.objects.filter(pk__in=delete_ids))
+    found = {ticket.pk for ticket in doomed}
+    for value in deletes:
+        status = 204 if _as_id(value) in found else 404
+        results["delete"].append({"id": value, "status": status})
+
+    with transaction.atomic():
+        if new_tickets:
+            with bulk_write():
+                bulk_create_with_pks(Ticket, new_tickets)
+            tickets_bulk_created(new_tickets)
+        if changed_tickets:
+            Ticket.objects.bulk_update(changed_tickets, sorted(changed_fields))
+            tickets_bulk_updated([t.pk for t in changed_tickets], previous_buckets, reindex_ids)
+        if doomed:
+            with bulk_write():
+                Ticket.objects.filter(pk__in=found).delete()
+            tickets_bulk_deleted(doomed)
+
+    for section in ("create", "update"):
+        written = [result for result in results[section] if "ticket" in result]
+        serialized = TicketSerializer([result["ticket"] for result in written], many=True).data
+        for result, data in zip(written, serialized):
+            result["ticket"] = data
+    return results
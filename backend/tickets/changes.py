@@ -0,0 +1,110 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Min
+from django.utils import timezone
+
+from .inserts import bulk_create_with_pks
+from .models import TicketChange
+
+# Sequence numbers are assigned when a change is inserted but become
+# visible when its transaction commits, so with concurrent writers change
+# N+1 can be readable while N is not yet. The feed therefore stops at the
+# first missing sequence number until that gap is this old: by then the
+# missing change has either committed or was rolled back for good (and
+# some databases skip numbers anyway). A change whose transaction commits
+# within this many seconds of being written is never skipped.
+DEFAULT_SETTLE_SECONDS = 30
+# Rows read past the last settled change by current_sequence().
+SETTLE_SCAN_LIMIT = 10_000
+
+
+def _settled_before():
+    return timezone.now() - timedelta(seconds=getattr(settings, "TICKET_CHANGE_SETTLE_SECONDS",
+                                                      DEFAULT_SETTLE_SECONDS))
+
+
+def record_changes(ticket_ids, operation):
+    """
+    Append one change-feed entry per ticket id.
+
+    Single-row saves and deletes are recorded by the signal handlers in
+    tickets.signals. Code that writes through bulk_create, bulk_update or
+    QuerySet.update bypasses those signals and must call this itself.
+
+    Returns the created entries; their ids are the assigned sequence numbers.
+    """
+    return bulk_create_with_pks(
+        TicketChange, [TicketChange(ticket_id=ticket_id, operation=operation) for ticket_id in ticket_ids]
+    )
+
+
+def current_sequence():
+    """
+    Return the latest change sequence number that clients can safely sync
+    from (no earlier change can still appear), or 0 if nothing was recorded.
+    """
+    settled_before = _settled_before()
+    seq = (
+        TicketChange.objects.filter(changed_at__lte=settled_before)
+        .order_by("-changed_at", "-id").values_list("id", flat=True).first()
+    )
+    if seq is None:
+        seq = (TicketChange.objects.aggregate(seq=Min("id"))["seq"] or 1) - 1
+    recent = TicketChange.objects.filter(id__gt=seq).order_by("id").values_list("id", flat=True)
+    for next_seq in recent[:SETTLE_SCAN_LIMIT]:
+        if next_seq != seq + 1:
+            break
+        seq = next_seq
+    return seq
+
+
+class ChangeFeedExpired(Exception):
+    """
+    Raised when the requested sequence predates the oldest retained change,
+    so deltas can no longer be computed and the client must resync.
+    """
+
+
+def changes_since(since, limit):
+    """
+    Collapse up to `limit` changes after sequence `since` into the set of
+    ticket ids to upsert and the set of ticket ids to delete.
+
+    Only the newest operation per ticket matters: a ticket created and then
+    deleted inside the window is reported as deleted only. Changes after a
+    missing sequence number are held back until the gap settles (see
+    DEFAULT_SETTLE_SECONDS), and has_more is then False.
+
+    Returns a tuple (last_seq, has_more, upserted_ids, deleted_ids).
+    """
+    # Also for since=0: replaying a pruned feed from the start would leave
+    # out every ticket whose only entries were pruned.
+    oldest = TicketChange.objects.aggregate(seq=Min("id"))["seq"]
+    if oldest is not None and since < oldest - 1:
+        raise ChangeFeedExpired(since)
+
+    rows = list(
+        TicketChange.objects.filter(id__gt=since)
+        .order_by("id")
+        .values_list("id", "ticket_id", "operation", "changed_at")[:limit + 1]
+    )
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    settled_before = _settled_before()
+    expected = since + 1
+    for index, (seq, _, _, changed_at) in enumerate(rows):
+        if seq != expected and changed_at > settled_before:
+            rows, has_more = rows[:index], False
+            break
+        expected = seq + 1
+
+    latest = {}
+    for seq, ticket_id, operation, _ in rows:
+        latest[ticket_id] = operation
+
+    upserted = [tid for tid, op in latest.items() if op != TicketChange.DELETED]
+    deleted = [tid for tid, op in latest.items() if op == TicketChange.DELETED]
+    last_seq = rows[-1][0] if rows else since
+    return last_seq, has_more, upserted, deleted
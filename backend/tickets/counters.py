@@ -0,0 +1,151 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from . import reference
+from .models import Ticket, TicketCounter
+
+GROUP_FIELDS = ("status", "sub_department", "main_department", "priority")
+
+
+def bucket(status, sub_department_id, priority_id):
+    return (status, sub_department_id, priority_id or 0)
+
+
+def ticket_bucket(ticket):
+    """
+    The bucket a ticket counts towards with its current field values.
+    """
+    return bucket(ticket.status, ticket.sub_department_id, ticket.PriorityLevel_id)
+
+
+def loaded_bucket(ticket):
+    """
+    The bucket a ticket counted towards when it was loaded, or None if it was
+    not loaded from the database.
+    """
+    if not hasattr(ticket, "_loaded_values"):
+        return None
+    return bucket(
+        ticket.loaded_value("status"),
+        ticket.loaded_value("sub_department_id"),
+        ticket.loaded_value("PriorityLevel_id"),
+    )
+
+
+def apply_deltas(deltas):
+    """
+    Add each delta in a {bucket: delta} mapping to its counter row with a
+    single UPDATE ... SET count = count + delta, creating missing rows.
+    """
+    for key, delta in deltas.items():
+        if not delta:
+            continue
+        status, sub_department_id, priority_id = key
+        rows = TicketCounter.objects.filter(
+            status=status, sub_department_id=sub_department_id, priority_id=priority_id
+        )
+        if rows.update(count=F("count") + delta):
+            continue
+        try:
+            with transaction.atomic():
+                TicketCounter.objects.create(
+                    status=status, sub_department_id=sub_department_id,
+                    priority_id=priority_id, count=delta,
+                )
+        except IntegrityError:
+            # Another writer created the row first.
+            rows.update(count=F("count") + delta)
+
+
+def transition_deltas(moves):
+    """
+    Build counter deltas from an iterable of (old_bucket, new_bucket) pairs;
+    None stands for "not counted" on either side.
+    """
+    deltas = Counter()
+    for old, new in moves:
+        if old == new:
+            continue
+        if old is not None:
+            deltas[old] -= 1
+        if new is not None:
+            deltas[new] += 1
+    return deltas
+
+
+def actual_counts():
+    """
+    Count every bucket from the ticket table in one grouped query.
+    """
+    rows = Ticket.objects.values_list("status", "sub_department_id", "PriorityLevel_id").annotate(n=Count("id"))
+    return {bucket(status, sub_department_id, priority_id): n
+            for status, sub_department_id, priority_id, n in rows.order_by()}
+
+
+def stored_counts():
+    rows = TicketCounter.objects.exclude(count=0).values_list(
+        "status", "sub_department_id", "priority_id", "count"
+    )
+    return {(status, sub_department_id, priority_id): count
+            for status, sub_department_id, priority_id, count in rows}
+
+
+def reconcile(apply=True):
+    """
+    Rebuild the counters from scratch. Returns the drift found as a
+    {bucket: stored - actual} mapping of the buckets that disagreed.
+    """
+    with transaction.atomic():
+        actual = actual_counts()
+        stored = stored_counts()
+        drift = {
+            key: stored.get(key, 0) - actual.get(key, 0)
+            for key in set(actual) | set(stored)
+            if stored.get(key, 0) != actual.get(key, 0)
+        }
+        if apply and drift:
+            TicketCounter.objects.all().delete()
+            TicketCounter.objects.bulk_create([
+                TicketCounter(status=status, sub_department_id=sub_department_id,
+                              priority_id=priority_id, count=count)
+                for (status, sub_department_id, priority_id), count in actual.items()
+            ])
+    return drift
+
+
+def ticket_stats(group_by=GROUP_FIELDS):
+    """
+    Ticket counts rolled up over the requested GROUP_FIELDS. Reads the
+    counter rows only (names come from the reference cache), so the cost
+    depends on the number of buckets, never on the number of tickets.
+    """
+    sub_departments = {
+        pk: (sub_department.name, sub_department.main_department_id, sub_department.main_department.name)
+        for pk, sub_department in reference.get_reference().sub_departments.items()
+    }
+    totals = Counter()
+    labels = {}
+    for (status, sub_department_id, priority_id), count in stored_counts().items():
+        name, main_id, main_name = sub_departments.get(sub_department_id, (None, None, None))
+        row = {
+            "status": status,
+            "sub_department": sub_department_id,
+            "sub_department_name": name,
+            "main_department": main_id,
+            "main_department_name": main_name,
+            "priority": priority_id or None,
+        }
+        key = tuple(row[field] for field in group_by)
+        totals[key] += count
+        labels[key] = {
+            k: v for k, v in row.items()
+            if k in group_by or k.replace("_name", "") in group_by
+        }
+    return [dict(labels[key], count=count) for key, count in sorted(totals.items(), key=_sort_key)]
+
+
+def _sort_key(item):
+    key, _ = item
+    return tuple("" if value is None else str(value) for value in key)
@@ -0,0 +1,197 @@
+import heapq
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import reference
+from .counters import bucket
+from .models import Ticket
+
+# Status a ticket moves to when its escalation deadline passes. These are the
+# kanban board columns; "open" is the model default and behaves like "1".
+ESCALATION_STEPS = {
+    "open": "2",
+    "1": "2",
+    "2": "3",
+    "3": "archived",
+}
+
+# Seconds a ticket spends in each step, keyed by its sub-department's
+# PriorityLevel.level. Override with TICKET_ESCALATION_INTERVALS.
+DEFAULT_ESCALATION_INTERVALS = {
+    3: 15 * 60,
+    2: 60 * 60,
+    1: 4 * 60 * 60,
+}
+
+
+def escalation_interval(level):
+    intervals = getattr(settings, "TICKET_ESCALATION_INTERVALS", DEFAULT_ESCALATION_INTERVALS)
+    return timedelta(seconds=intervals.get(level, intervals[min(intervals)]))
+
+
+def next_deadline(status, level, start):
+    """
+    Return when a ticket that entered `status` at `start` escalates, or None
+    if `status` is terminal.
+    """
+    if status not in ESCALATION_STEPS:
+        return None
+    return start + escalation_interval(level)
+
+
+def sub_department_level(ticket):
+    sub_department = reference.sub_department(ticket.sub_department_id)
+    priority = sub_department.priority if sub_department else None
+    return priority.level if priority else None
+
+
+def schedule(ticket, now=None):
+    """
+    Set `escalation_due_at` on an unsaved ticket whose status is new or changed.
+    Called from the Ticket pre_save handler.
+    """
+    if not ticket._state.adding and ticket.status == ticket.loaded_value("status"):
+        return
+    ticket.escalation_due_at = next_deadline(
+        ticket.status, sub_department_level(ticket), now or timezone.now()
+    )
+
+
+def backfill_deadlines(now=None):
+    """
+    Give escalatable tickets without a deadline one, measured from their last
+    update. Runs one UPDATE per (status, priority level) pair.
+    """
+    now = now or timezone.now()
+    levels = getattr(settings, "TICKET_ESCALATION_INTERVALS", DEFAULT_ESCALATION_INTERVALS)
+    total = 0
+    for status in ESCALATION_STEPS:
+        pending = Ticket.objects.filter(status=status, escalation_due_at__isnull=True)
+        for level in levels:
+            total += pending.filter(sub_department__priority__level=level).update(
+                escalation_due_at=F("updated_at") + escalation_interval(level)
+            )
+        total += pending.filter(sub_department__priority__isnull=True).update(
+            escalation_due_at=F("updated_at") + escalation_interval(None)
+        )
+    return total
+
+
+class EscalationScheduler:
+    """
+    Deadline-ordered escalation engine.
+
+    The scheduler keeps a min-heap of (due, ticket id, status, level) for the
+    deadlines falling inside a short horizon. It rebuilds the heap from the
+    indexed `escalation_due_at` column on start and every `refresh` seconds,
+    so it survives restarts and picks up tickets written by other processes,
+    while each refresh only reads the rows due soon. Due entries are applied
+    in batched UPDATEs grouped by (status, level) rather than one timer or
+    write per ticket.
+    """
+
+    def __init__(self, horizon=300, refresh=5, batch_size=1000, max_loaded=50000, stdout=None):
+        self.horizon = timedelta(seconds=horizon)
+        self.refresh = refresh
+        self.batch_size = batch_size
+        self.max_loaded = max_loaded
+        self.stdout = stdout
+        self.heap = []
+        self.next_reload = None
+
+    def reload(self, now):
+        rows = (
+            Ticket.objects.filter(escalation_due_at__lte=now + self.horizon)
+            .order_by("escalation_due_at")
+            .values_list("escalation_due_at", "id", "status", "sub_department__priority__level")
+            [:self.max_loaded]
+        )
+        self.heap = list(rows)
+        heapq.heapify(self.heap)
+        self.next_reload = now + timedelta(seconds=self.refresh)
+
+    def pop_due(self, now):
+        due = []
+        while self.heap and self.heap[0][0] <= now and len(due) < self.batch_size:
+            due.append(heapq.heappop(self.heap))
+        return due
+
+    def escalate(self, entries, now):
+        """
+        Advance every due entry to its next status. Returns the number of
+        tickets actually escalated; entries whose ticket changed since the
+        heap was loaded are skipped.
+        """
+        groups = defaultdict(list)
+        for due, ticket_id, status, level in entries:
+            groups[(status, level)].append(ticket_id)
+
+        from .signals import tickets_bulk_updated
+
+        escalated = []
+        previous_buckets = {}
+        with transaction.atomic():
+            for (status, level), ids in groups.items():
+                next_status = ESCALATION_STEPS.get(status)
+                if next_status is None:
+                    continue
+                rows = (
+                    Ticket.objects.select_for_update()
+                    .filter(pk__in=ids, status=status, escalation_due_at__lte=now)
+                    .values_list("id", "sub_department_id", "PriorityLevel_id")
+                )
+                ids = []
+                for ticket_id, sub_department_id, priority_id in rows:
+                    ids.append(ticket_id)
+                    previous_buckets[ticket_id] = bucket(status, sub_department_id, priority_id)
+                if not ids:
+                    continue
+                Ticket.objects.filter(pk__in=ids).update(
+                    status=next_status,
+                    escalation_due_at=next_deadline(next_status, level, now),
+                    updated_at=now,
+                )
+                escalated.extend(ids)
+            if escalated:
+                tickets_bulk_updated(escalated, previous_buckets)
+        return len(escalated)
+
+    def tick(self, now=None):
+        """
+        Apply every deadline that has passed, reloading the heap first when
+        the refresh interval has elapsed. Returns the number of tickets
+        escalated.
+        """
+        now = now or timezone.now()
+        if self.next_reload is None or now >= self.next_reload:
+            self.reload(now)
+        total = 0
+        while True:
+            entries = self.pop_due(now)
+            if not entries:
+                break
+            total += self.escalate(entries, now)
+        if not self.heap and total:
+            # The loaded window was drained; more may be due beyond it.
+            self.next_reload = now
+        return total
+
+    def seconds_until_next(self, now):
+        if not self.heap:
+            return self.refresh
+        wait = (self.heap[0][0] - now).total_seconds()
+        return max(0.0, min(wait, self.refresh))
+
+    def run_forever(self):
+        while True:
+            now = timezone.now()
+            escalated = self.tick(now)
+            if escalated and self.stdout:
+                self.stdout.write(f"Escalated {escalated} ticket(s) at {now.isoformat()}")
+            time.sleep(self.seconds_until_next(timezone.now()))
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from . import reference
+
+
+class Subscription:
+    """
+    One connected client. Events are delivered to an asyncio.Queue owned by
+    the client's event loop; `filters` maps an event field to the set of
+    values the client wants (an empty mapping receives everything).
+    """
+
+    def __init__(self, loop, filters=None, max_pending=1000):
+        self.loop = loop
+        self.filters = filters or {}
+        self.queue = asyncio.Queue(maxsize=max_pending)
+        self.dropped = 0
+
+    def matches(self, event):
+        for field, wanted in self.filters.items():
+            if event.get(field) not in wanted:
+                return False
+        return True
+
+    def deliver(self, event):
+        # Runs on the subscriber's loop. A client that stops reading loses
+        # events rather than growing memory without bound; it can catch up
+        # through the change feed using the last `seq` it saw.
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class InProcessBroker:
+    """
+    Fan-out broker for single-node deployments: every subscriber of this
+    process receives every matching event published in this process.
+
+    publish() may be called from any thread (request threads, management
+    commands); delivery is handed to each subscriber's event loop.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+
+    def subscribe(self, filters=None):
+        subscription = Subscription(asyncio.get_running_loop(), filters)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def publish(self, event):
+        with self._lock:
+            subscriptions = [s for s in self._subscriptions if s.matches(event)]
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, event)
+            except RuntimeError:
+                # The subscriber's loop has shut down.
+                self.unsubscribe(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscriptions)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """
+    Return the process-wide broker configured by TICKET_EVENTS_BROKER
+    (a dotted path, defaulting to the in-process broker).
+    """
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, "TICKET_EVENTS_BROKER", "tickets.events.InProcessBroker")
+                _broker = import_string(path)()
+    return _broker
+
+
+def has_subscribers():
+    """
+    Whether anyone can receive ticket events, so writers can skip serializing
+    tickets for events nobody would get. Brokers that cannot tell (e.g. ones
+    fanning out to other processes) are assumed to have subscribers.
+    """
+    subscriber_count = getattr(get_broker(), "subscriber_count", None)
+    return subscriber_count is None or subscriber_count() > 0
+
+
+def build_event(operation, ticket, seq=None, data=None):
+    """
+    Build the event payload for a ticket write. The routing fields are the
+    ones clients can filter on; `ticket` carries the serialized ticket for
+    creates and updates so clients can apply it without a refetch.
+    """
+    return {
+        "type": operation,
+        "seq": seq,
+        "id": ticket.pk,
+        "status": ticket.status,
+        "sub_department": ticket.sub_department_id,
+        "main_department": getattr(reference.sub_department(ticket.sub_department_id), "main_department_id", None),
+        "priority": ticket.PriorityLevel_id,
+        "ticket": data,
+    }
+
+
+def publish_on_commit(event):
+    """
+    Publish once the surrounding transaction commits, so clients never see
+    a write that is later rolled back.
+    """
+    transaction.on_commit(lambda: get_broker().publish(event))
+
+
+def encode_event(event):
+    return json.dumps(event, separators=(",", ":"), default=str)
@@ -0,0 +1,164 @@
+import csv
+import json
+
+from asgiref.sync import sync_to_async
+from django.utils import timezone
+
+from .models import Ticket
+from .serializers import media_url
+
+# (output column, values_list lookup). Mirrors TicketSerializer's fields, plus
+# updated_at for incremental BI loads; the names are resolved by the export
+# query's joins, so no row triggers a further query.
+EXPORT_COLUMNS = [
+    ("id", "id"),
+    ("title", "title"),
+    ("issue", "issue"),
+    ("sub_department", "sub_department_id"),
+    ("sub_department_name", "sub_department__name"),
+    ("main_department_name", "sub_department__main_department__name"),
+    ("PriorityLevel", "PriorityLevel_id"),
+    ("priority_level_description", "PriorityLevel__description"),
+    ("status", "status"),
+    ("created_at", "created_at"),
+    ("updated_at", "updated_at"),
+    ("image_thumbnail", "image_thumbnail"),
+    ("image_preview", "image_preview"),
+]
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Lines are grouped into chunks of about this many characters so streaming
+# does not pay a write per row.
+CHUNK_CHARS = 64 * 1024
+
+
+def export_rows(queryset=None, chunk_size=2000):
+    """
+    Yield ticket rows as tuples in EXPORT_COLUMNS order.
+
+    QuerySet.iterator() streams the result through a server-side cursor
+    where the backend has one, or fetchmany() batches otherwise, so only
+    `chunk_size` rows are held in memory at a time.
+    """
+    if queryset is None:
+        queryset = Ticket.objects.all()
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS]
+    return queryset.order_by("id").values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+def _isoformat(value):
+    # Same representation as DRF's DateTimeField.
+    value = timezone.localtime(value) if timezone.is_aware(value) else value
+    text = value.isoformat()
+    return text[:-6] + "Z" if text.endswith("+00:00") else text
+
+
+def _datetime_indexes():
+    return [index for index, (name, _) in enumerate(EXPORT_COLUMNS) if name in ("created_at", "updated_at")]
+
+
+def _file_indexes():
+    return [(index, name) for index, (name, _) in enumerate(EXPORT_COLUMNS)
+            if name in ("image_thumbnail", "image_preview")]
+
+
+def _prepare(row, dates, files):
+    row = list(row)
+    for index in dates:
+        if row[index] is not None:
+            row[index] = _isoformat(row[index])
+    for index, name in files:
+        row[index] = media_url(name, row[index])
+    return row
+
+
+class _LineBuffer:
+    """
+    File-like object that csv.writer writes into; hands back what was written.
+    """
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, value):
+        self.parts.append(value)
+
+    def drain(self):
+        text = "".join(self.parts)
+        self.parts = []
+        return text
+
+
+def _chunked(lines):
+    chunk = []
+    size = 0
+    for line in lines:
+        chunk.append(line)
+        size += len(line)
+        if size >= CHUNK_CHARS:
+            yield "".join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield "".join(chunk)
+
+
+def csv_stream(rows):
+    """
+    Yield CSV text, header first, in chunks of roughly CHUNK_CHARS.
+    """
+    dates = _datetime_indexes()
+    files = _file_indexes()
+    buffer = _LineBuffer()
+    writer = csv.writer(buffer)
+
+    def lines():
+        writer.writerow([name for name, _ in EXPORT_COLUMNS])
+        yield buffer.drain()
+        for row in rows:
+            writer.writerow(_prepare(row, dates, files))
+            yield buffer.drain()
+
+    return _chunked(lines())
+
+
+def ndjson_stream(rows):
+    """
+    Yield newline-delimited JSON, one object per ticket, in chunks of roughly
+    CHUNK_CHARS.
+    """
+    names = [name for name, _ in EXPORT_COLUMNS]
+    dates = _datetime_indexes()
+    files = _file_indexes()
+
+    def lines():
+        for row in rows:
+            row = _prepare(row, dates, files)
+            yield json.dumps(dict(zip(names, row)), ensure_ascii=False, separators=(",", ":")) + "\n"
+
+    return _chunked(lines())
+
+
+def export_stream(fmt, rows):
+    if fmt == "csv":
+        return csv_stream(rows)
+    if fmt == "ndjson":
+        return ndjson_stream(rows)
+    raise ValueError(f"Unsupported export format: {fmt}")
+
+
+async def iterate_async(iterator):
+    """
+    Yield the chunks of a sync iterator from an async one, each produced in
+    the request's sync thread (which owns its database connection). An ASGI
+    server can then send every chunk as it is made; given a sync iterator,
+    Django's ASGI handler would first consume it whole into memory.
+    """
+    iterator = iter(iterator)
+    done = object()
+    while (chunk := await sync_to_async(next)(iterator, done)) is not done:
+        yield chunk
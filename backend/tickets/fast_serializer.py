@@ -0,0 +1,133 @@
+from json.encoder import encode_basestring, encode_basestring_ascii
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import ISO_8601, serializers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+
+from .models import Ticket
+from .serializers import TicketSerializer
+
+# Columns fetched for the fast path. Every TicketSerializer field reads only
+# these (the name fields resolve their ids through the reference cache), and
+# updated_at keys the fragment cache. Model instances expose the same
+# attributes, so the plan serializes either.
+ROW_COLUMNS = (
+    "id",
+    "title",
+    "issue",
+    "sub_department_id",
+    "PriorityLevel_id",
+    "status",
+    "created_at",
+    "updated_at",
+    "image_thumbnail",
+    "image_preview",
+)
+
+_encode_string = encode_basestring_ascii if JSONRenderer.ensure_ascii else encode_basestring
+
+
+def ticket_rows(queryset):
+    """
+    Fetch tickets as named row tuples instead of model instances.
+    """
+    return queryset.values_list(*ROW_COLUMNS, named=True)
+
+
+def _column(serializer_field):
+    attname = Ticket._meta.get_field(serializer_field.source).attname
+    if attname not in ROW_COLUMNS:
+        raise ImproperlyConfigured(f"TicketSerializer field {serializer_field.field_name!r} reads "
+                                   f"{attname!r}, which is not in ROW_COLUMNS.")
+    return attname
+
+
+def _json_value(value):
+    if value is None:
+        return "null"
+    if isinstance(value, str):
+        return _encode_string(value)
+    if isinstance(value, int) and not isinstance(value, bool):
+        return int.__repr__(value)
+    raise TypeError(f"No fast JSON encoding for {type(value).__name__}")
+
+
+def compile_plan(serializer=None):
+    """
+    Turn the serializer's fields into a list of (JSON key prefix, getter)
+    steps, where each getter maps a row to the field's representation.
+
+    Only the field types TicketSerializer uses are supported; anything else
+    raises ImproperlyConfigured, so adding a field to the serializer cannot
+    silently make the two paths disagree.
+    """
+    serializer = serializer or TicketSerializer()
+    plan = []
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        prefix = ("," if plan else "{") + _encode_string(name) + ":"
+
+        if isinstance(field, serializers.SerializerMethodField):
+            method = getattr(serializer, field.method_name)
+            plan.append((prefix, method))
+        elif isinstance(field, serializers.PrimaryKeyRelatedField):
+            plan.append((prefix, _attribute(_column(field))))
+        elif isinstance(field, serializers.DateTimeField):
+            plan.append((prefix, _datetime(_column(field), field)))
+        elif isinstance(field, (serializers.CharField, serializers.IntegerField)):
+            plan.append((prefix, _converted(_column(field), field.to_representation)))
+        else:
+            raise ImproperlyConfigured(f"No fast path for {type(field).__name__} field {name!r}.")
+    return plan
+
+
+def _attribute(attname):
+    def get(row):
+        return getattr(row, attname)
+    return get
+
+
+def _converted(attname, convert):
+    def get(row):
+        value = getattr(row, attname)
+        return None if value is None else convert(value)
+    return get
+
+
+def _datetime(attname, field):
+    """
+    DateTimeField.to_representation with the timezone lookup hoisted out of
+    the per-row work; any non-ISO output format uses the field as is.
+    """
+    output_format = getattr(field, "format", api_settings.DATETIME_FORMAT)
+    field_timezone = field.timezone if hasattr(field, "timezone") else field.default_timezone()
+    if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+        return _converted(attname, field.to_representation)
+    convert = field.to_representation
+
+    def get(row):
+        value = getattr(row, attname)
+        if not value:
+            return None
+        if value.tzinfo is None:
+            return convert(value)
+        text = value.astimezone(field_timezone).isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    return get
+
+
+def render_rows(rows, plan=None):
+    """
+    Render each row as the JSON bytes JSONRenderer would produce for
+    TicketSerializer(ticket).data, without building the intermediate dicts.
+    """
+    plan = plan or compile_plan()
+    rendered = []
+    for row in rows:
+        text = "".join([prefix + _json_value(get(row)) for prefix, get in plan]) + "}"
+        if "\u2028" in text or "\u2029" in text:
+            text = text.replace("\u2028", "\\u2028").replace("\u2029", "\\u2029")
+        rendered.append(text.encode())
+    return rendered
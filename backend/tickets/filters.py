@@ -0,0 +1,88 @@
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from . import reference
+
+TICKET_FILTER_PARAMS = (
+    "status",
+    "sub_department",
+    "main_department",
+    "priority",
+    "created_after",
+    "created_before",
+    "updated_after",
+    "updated_before",
+)
+
+
+def _parse_ids(name, raw):
+    """
+    Parse a comma separated list of primary keys, e.g. "3" or "3,7,9".
+    """
+    try:
+        return [int(value) for value in raw.split(",") if value.strip()]
+    except ValueError:
+        raise ValidationError({name: "Expected a comma separated list of ids."})
+
+
+def _parse_moment(name, raw):
+    """
+    Parse an ISO 8601 date or datetime into an aware datetime.
+    """
+    moment = parse_datetime(raw)
+    if moment is None:
+        day = parse_date(raw)
+        if day is None:
+            raise ValidationError({name: "Expected an ISO 8601 date or datetime."})
+        moment = timezone.datetime.combine(day, timezone.datetime.min.time())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def filter_tickets(queryset, params):
+    """
+    Apply the server-side ticket filters supported by the list endpoints.
+
+    Supported query parameters:
+        - status: one or more comma separated statuses
+        - sub_department: one or more SubDepartment ids
+        - main_department: one or more MainDepartment ids
+        - priority: one or more PriorityLevel ids
+        - created_after / created_before: ISO date or datetime bounds
+        - updated_after / updated_before: ISO date or datetime bounds
+
+    Every filter maps onto a column covered by one of the Ticket indexes.
+    The main department is resolved to its sub-department ids up front so the
+    ticket query never has to join through SubDepartment.
+    """
+    statuses = params.get("status")
+    if statuses:
+        queryset = queryset.filter(status__in=[s for s in statuses.split(",") if s])
+
+    sub_departments = params.get("sub_department")
+    if sub_departments:
+        queryset = queryset.filter(sub_department_id__in=_parse_ids("sub_department", sub_departments))
+
+    main_departments = params.get("main_department")
+    if main_departments:
+        ids = _parse_ids("main_department", main_departments)
+        sub_department_ids = reference.get_reference().sub_department_ids(ids)
+        queryset = queryset.filter(sub_department_id__in=sub_department_ids)
+
+    priorities = params.get("priority")
+    if priorities:
+        queryset = queryset.filter(PriorityLevel_id__in=_parse_ids("priority", priorities))
+
+    for name, lookup in (
+        ("created_after", "created_at__gte"),
+        ("created_before", "created_at__lt"),
+        ("updated_after", "updated_at__gte"),
+        ("updated_before", "updated_at__lt"),
+    ):
+        raw = params.get(name)
+        if raw:
+            queryset = queryset.filter(**{lookup: _parse_moment(name, raw)})
+
+    return queryset
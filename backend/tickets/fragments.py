@@ -0,0 +1,142 @@
+import json
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.compat import LONG_SEPARATORS, SHORT_SEPARATORS
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from . import reference
+from .fast_serializer import render_rows
+
+DEFAULT_FRAGMENT_CACHE_SIZE = 100_000
+
+# One encoder configured like JSONRenderer's compact output, reused for every
+# fragment instead of building a new one per json.dumps() call.
+_encoder = JSONRenderer.encoder_class(
+    ensure_ascii=JSONRenderer.ensure_ascii,
+    allow_nan=not JSONRenderer.strict,
+    separators=SHORT_SEPARATORS if JSONRenderer.compact else LONG_SEPARATORS,
+)
+
+
+def render_json(value):
+    """
+    Render a value exactly as DRF's JSONRenderer renders it in a response.
+    """
+    text = _encoder.encode(value)
+    if "\u2028" in text or "\u2029" in text:
+        text = text.replace("\u2028", "\\u2028").replace("\u2029", "\\u2029")
+    return text.encode()
+
+
+class FragmentCache:
+    """
+    LRU cache of each ticket's rendered JSON, keyed by (id, updated_at,
+    reference data version).
+
+    Every write to a ticket moves updated_at, and every write to the
+    priority/department hierarchy moves the reference version, so a hit is
+    always current; stale entries are never read again and age out.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def fragments(self, tickets):
+        """
+        Return the rendered JSON of each ticket, in order, serializing only
+        the tickets that have no current entry. Accepts model instances or
+        fast_serializer rows.
+        """
+        version = reference.get_reference().version
+        keys = [(ticket.id, ticket.updated_at, version) for ticket in tickets]
+        found = [None] * len(keys)
+        missing = []
+        with self.lock:
+            for index, key in enumerate(keys):
+                fragment = self.entries.get(key)
+                if fragment is None:
+                    missing.append(index)
+                else:
+                    self.entries.move_to_end(key)
+                    found[index] = fragment
+            self.hits += len(keys) - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            rendered = render_rows([tickets[index] for index in missing])
+            with self.lock:
+                for index, fragment in zip(missing, rendered):
+                    found[index] = fragment
+                    self.entries[keys[index]] = fragment
+                while len(self.entries) > self.maxsize:
+                    self.entries.popitem(last=False)
+        return found
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+
+_cache = None
+
+
+def get_fragment_cache():
+    global _cache
+    if _cache is None:
+        _cache = FragmentCache(getattr(settings, "TICKET_FRAGMENT_CACHE_SIZE", DEFAULT_FRAGMENT_CACHE_SIZE))
+    return _cache
+
+
+class FragmentResponse(Response):
+    """
+    Response whose JSON body is joined from pre-rendered ticket fragments.
+
+    `envelope` optionally wraps the ticket list in an object, with the list
+    placed under `results`. Renderers other than plain JSON (the browsable
+    API, indented JSON) fall back to rendering `data`, which is parsed from
+    the body on first access.
+    """
+
+    def __init__(self, fragments, many=True, envelope=None, status=None):
+        super().__init__(status=status)
+        if many:
+            body = b"[" + b",".join(fragments) + b"]"
+        else:
+            body = fragments[0]
+        if envelope is not None:
+            body = b"{" + b",".join(
+                render_json(name) + b":" + (body if name == "results" else render_json(value))
+                for name, value in envelope.items()
+            ) + b"}"
+        self.body = body
+
+    @property
+    def data(self):
+        if self._data is None and getattr(self, "body", None) is not None:
+            self._data = json.loads(self.body)
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+
+    @property
+    def rendered_content(self):
+        renderer = getattr(self, "accepted_renderer", None)
+        if type(renderer) is not JSONRenderer or "indent" in (self.accepted_media_type or ""):
+            return super().rendered_content
+        self["Content-Type"] = renderer.media_type
+        return self.body
+
+
+def ticket_response(tickets, many=True, envelope=None, status=None):
+    tickets = list(tickets) if many else [tickets]
+    return FragmentResponse(get_fragment_cache().fragments(tickets), many=many, envelope=envelope, status=status)
@@ -0,0 +1,120 @@
+import io
+import os
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from .jobs import enqueue_for_ticket
+from .models import Ticket
+
+# (field, bounding box, JPEG quality) of each derivative kept next to the
+# original upload. The thumbnail covers the 50px admin and kanban card
+# images at 2x pixel density.
+DERIVATIVES = (
+    ("image_thumbnail", (128, 128), 80),
+    ("image_preview", (800, 800), 85),
+)
+
+
+def store_derivative(field, original_name, content):
+    """
+    Save derivative bytes under the field's upload_to, named after the
+    original, and return the stored name.
+    """
+    model_field = Ticket._meta.get_field(field)
+    stem = os.path.splitext(os.path.basename(original_name))[0]
+    name = model_field.generate_filename(None, f"{stem}.jpg")
+    return model_field.storage.save(name, ContentFile(content), max_length=model_field.max_length)
+
+
+def render_derivatives(source):
+    """
+    Decode an uploaded image once and return {field: JPEG bytes} for every
+    derivative. JPEG originals are decoded at reduced scale (draft mode),
+    which is most of the work for multi-megapixel phone photos.
+    """
+    with Image.open(source) as image:
+        largest = max(size for _, size, _ in DERIVATIVES)
+        image.draft("RGB", largest)
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, "white")
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+
+        rendered = {}
+        # Largest first, so each smaller size is scaled from the previous
+        # result instead of the full original.
+        for field, size, quality in sorted(DERIVATIVES, key=lambda d: d[1], reverse=True):
+            image.thumbnail(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+            buffer = io.BytesIO()
+            image.save(buffer, "JPEG", quality=quality, optimize=True)
+            rendered[field] = buffer.getvalue()
+        return rendered
+
+
+def derive(image_name):
+    """
+    Render and store the derivatives of a stored image; returns
+    {field: stored name}.
+    """
+    storage = Ticket._meta.get_field("image").storage
+    with storage.open(image_name, "rb") as source:
+        rendered = render_derivatives(source)
+    return {field: store_derivative(field, image_name, content) for field, content in rendered.items()}
+
+
+def delete_unused(names):
+    """
+    Delete derivative files, given as (field, name), that no ticket refers
+    to any more. Generated load data shares derivatives between tickets.
+    """
+    for field, name in names:
+        if not Ticket.objects.filter(**{field: name}).exists():
+            Ticket._meta.get_field(field).storage.delete(name)
+
+
+def image_changed(ticket):
+    """
+    True when the ticket's image was replaced or cleared since it was loaded,
+    or a new ticket has one.
+    """
+    if ticket._state.adding:
+        return bool(ticket.image)
+    if ticket.image and not ticket.image._committed:
+        return True
+    return (ticket.image.name or "") != (ticket.loaded_value("image") or "")
+
+
+def refresh_derivatives(ticket):
+    """
+    Called from the Ticket pre_save handler. A replaced image's derivatives
+    are cleared with the save, and their files deleted once it commits; new
+    ones are rendered by the "tickets.image_derivatives" job that
+    queue_derivatives() queues once the image file has been stored.
+    """
+    ticket._derivatives_pending = image_changed(ticket)
+    ticket._replaced_derivatives = []
+    if ticket._derivatives_pending:
+        for field, _, _ in DERIVATIVES:
+            if getattr(ticket, field):
+                ticket._replaced_derivatives.append((field, getattr(ticket, field).name))
+            setattr(ticket, field, None)
+
+
+def queue_derivatives(ticket):
+    """
+    Called from the Ticket post_save handler, when the image name is final.
+    """
+    if getattr(ticket, "_derivatives_pending", False) and ticket.image:
+        enqueue_for_ticket("tickets.image_derivatives", ticket, {"ticket_id": ticket.pk, "image": ticket.image.name})
+    replaced = getattr(ticket, "_replaced_derivatives", [])
+    if replaced:
+        # After the save, so the ticket no longer counts as a user.
+        transaction.on_commit(lambda: delete_unused(replaced))
+    ticket._derivatives_pending = False
+    ticket._replaced_derivatives = []
@@ -0,0 +1,209 @@
+import csv
+import json
+import time
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from authentication.models import User
+from . import escalation
+from .inserts import bulk_create_with_pks
+from .models import PriorityLevel, SubDepartment, Ticket, TicketImportCheckpoint
+from .signals import bulk_write, tickets_bulk_created
+
+
+class RowError(ValueError):
+    """
+    An input row that cannot be turned into a ticket.
+    """
+
+
+def read_rows(path, fmt):
+    """
+    Stream the input file as dicts, one row at a time. An NDJSON line that
+    is not a JSON object is yielded as a RowError, so it is skipped and
+    reported like any other bad row and still counts towards the checkpoint.
+    """
+    if fmt == "csv":
+        with open(path, newline="", encoding="utf-8") as source:
+            yield from csv.DictReader(source)
+    elif fmt == "ndjson":
+        with open(path, encoding="utf-8") as source:
+            for line in source:
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError as exc:
+                    yield RowError(f"invalid JSON: {exc}")
+                    continue
+                yield row if isinstance(row, dict) else RowError("expected a JSON object")
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+class ReferenceLookup:
+    """
+    Name/id lookup maps for sub-departments and priority levels, loaded once
+    for the whole import instead of queried per row.
+    """
+
+    def __init__(self):
+        self.sub_departments = {}
+        for sub_department in SubDepartment.objects.select_related("main_department", "priority"):
+            self.sub_departments[str(sub_department.pk)] = sub_department
+            self.sub_departments[sub_department.name.lower()] = sub_department
+        self.priorities = {}
+        for priority in PriorityLevel.objects.all():
+            self.priorities[f"id:{priority.pk}"] = priority
+            self.priorities[str(priority.level)] = priority
+            self.priorities[priority.description.lower()] = priority
+            self.priorities[priority.get_level_display().lower()] = priority
+
+    def sub_department(self, value):
+        try:
+            return self.sub_departments[str(value).strip().lower()]
+        except KeyError:
+            raise RowError(f"unknown sub_department {value!r}")
+
+    def priority(self, value, sub_department):
+        """
+        Resolve a priority level by level number, description or label;
+        an empty value falls back to the sub-department's priority.
+        """
+        if value in (None, ""):
+            return sub_department.priority
+        try:
+            return self.priorities[str(value).strip().lower()]
+        except KeyError:
+            raise RowError(f"unknown priority {value!r}")
+
+
+def _moment(row, field):
+    raw = row.get(field)
+    if not raw:
+        return None
+    if not isinstance(raw, str):
+        raise RowError(f"invalid {field} {raw!r}")
+    try:
+        moment = parse_datetime(raw)
+    except (TypeError, ValueError):
+        moment = None  # well formed but not a real date, e.g. month 13
+    if moment is None:
+        raise RowError(f"invalid {field} {raw!r}")
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+class TicketImporter:
+    """
+    Batched, resumable ticket import.
+
+    Rows are parsed and resolved against in-memory lookup maps, then inserted
+    with one bulk_create per batch. Each batch commits together with its
+    checkpoint, so an interrupted import can be re-run and continues after
+    the last committed row.
+    """
+
+    def __init__(self, source, batch_size=5000, default_user=None, run_hooks=True, stdout=None, stderr=None):
+        self.source = source
+        self.batch_size = batch_size
+        self.default_user = default_user
+        self.run_hooks = run_hooks
+        self.stdout = stdout
+        self.stderr = stderr
+        self.lookup = ReferenceLookup()
+        self.users = {}
+        self.imported = 0
+        self.skipped = 0
+
+    def _resolve_users(self, rows):
+        # Other values (e.g. an NDJSON list) are reported by build_ticket.
+        wanted = {row["user"] for row in rows
+                  if isinstance(row, dict) and row.get("user") and isinstance(row["user"], str)} - set(self.users)
+        if wanted:
+            self.users.update(User.objects.in_bulk(wanted, field_name="username"))
+
+    def build_ticket(self, row, now):
+        if isinstance(row, RowError):
+            raise row
+        for field in ("title", "issue", "sub_department"):
+            if not row.get(field):
+                raise RowError(f"missing {field}")
+        sub_department = self.lookup.sub_department(row["sub_department"])
+        username = row.get("user")
+        if username and not isinstance(username, str):
+            raise RowError(f"invalid user {username!r}")
+        user = self.users.get(username) if username else self.default_user
+        if user is None:
+            raise RowError(f"unknown user {username!r}" if username else "no user given and no --user default")
+
+        created_at = _moment(row, "created_at") or now
+        updated_at = _moment(row, "updated_at") or created_at
+        ticket = Ticket(
+            user=user,
+            first_name=row.get("first_name") or "",
+            last_name=row.get("last_name") or "",
+            email=row.get("email") or "",
+            title=row["title"],
+            issue=row["issue"],
+            sub_department=sub_department,
+            PriorityLevel=self.lookup.priority(row.get("PriorityLevel") or row.get("priority"), sub_department),
+            status=row.get("status") or "open",
+            created_at=created_at,
+            updated_at=updated_at,
+        )
+        priority = sub_department.priority
+        ticket.escalation_due_at = escalation.next_deadline(
+            ticket.status, priority.level if priority else None, updated_at
+        )
+        return ticket
+
+    def import_batch(self, checkpoint, offset, rows):
+        now = timezone.now()
+        self._resolve_users(rows)
+        tickets = []
+        for number, row in enumerate(rows, start=offset + 1):
+            try:
+                tickets.append(self.build_ticket(row, now))
+            except RowError as exc:
+                self.skipped += 1
+                if self.stderr and self.skipped <= 20:
+                    self.stderr.write(f"Row {number}: {exc}; skipped.")
+
+        with transaction.atomic():
+            if self.run_hooks:
+                # The hooks need the new primary keys.
+                with bulk_write():
+                    bulk_create_with_pks(Ticket, tickets)
+                tickets_bulk_created(tickets)
+            else:
+                Ticket.objects.bulk_create(tickets)
+            checkpoint.rows_done = offset + len(rows)
+            checkpoint.save(update_fields=["rows_done", "updated_at"])
+        self.imported += len(tickets)
+
+    def run(self, rows, restart=False):
+        checkpoint, _ = TicketImportCheckpoint.objects.get_or_create(source=self.source)
+        if restart:
+            checkpoint.rows_done = 0
+        offset = checkpoint.rows_done
+        if offset and self.stdout:
+            self.stdout.write(f"Resuming after row {offset}.")
+
+        rows = islice(rows, offset, None)
+        started = time.monotonic()
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            self.import_batch(checkpoint, offset, batch)
+            offset += len(batch)
+            if self.stdout:
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"{offset} row(s) read, {self.imported} imported, {self.skipped} skipped "
+                    f"({self.imported / elapsed if elapsed else 0:,.0f} rows/s)"
+                )
+        return time.monotonic() - started
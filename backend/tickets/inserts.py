@@ -0,0 +1,20 @@
+from django.db import connections, router
+
+
+def bulk_create_with_pks(model, objs):
+    """
+    bulk_create `objs`, leaving every one of them with its primary key set,
+    which the change feed, counters, search index and push events need.
+
+    Backends that cannot return rows from a multi-row INSERT (MySQL) leave
+    the keys unset after bulk_create, so there the objects are inserted one
+    at a time instead. Those inserts send model signals; callers inserting
+    tickets wrap this in signals.bulk_write() and report the batch through
+    the tickets_bulk_* hooks as usual.
+    """
+    connection = connections[router.db_for_write(model)]
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objs)
+    for obj in objs:
+        obj.save(force_insert=True)
+    return objs
@@ -0,0 +1,315 @@
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, F, Min
+from django.utils import timezone
+
+from . import escalation
+from .models import Job
+
+# name -> callable(**payload), filled by @task.
+REGISTRY = {}
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_RETRY_DELAY = 10
+MAX_RETRY_DELAY = 60 * 60
+# A running job whose worker has not reported in for this many seconds is
+# assumed lost (killed worker) and handed out again. Live workers refresh
+# the locks of the jobs they hold every heartbeat interval, however long
+# the jobs run.
+DEFAULT_LOCK_TIMEOUT = 10 * 60
+DEFAULT_HEARTBEAT_INTERVAL = 60
+DEFAULT_RETENTION = 7 * 24 * 60 * 60
+
+
+def task(name):
+    """
+    Register the decorated function as the job `name`. It is called with
+    the job's payload as keyword arguments, outside any transaction: a job
+    that writes opens its own, as short as it can be.
+    """
+    def decorator(func):
+        REGISTRY[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, priority=0, delay=0, max_attempts=DEFAULT_MAX_ATTEMPTS):
+    """
+    Queue the job `name` to run `delay` seconds from now. Inside a
+    transaction the job only becomes visible to workers once it commits.
+    """
+    if name not in REGISTRY:
+        raise ValueError(f"No job registered as {name!r}.")
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        priority=priority,
+        max_attempts=max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def ticket_priority(ticket):
+    """
+    Job priority for work on `ticket`: its sub-department's priority level,
+    so Level 3 departments are served first.
+    """
+    return escalation.sub_department_level(ticket) or 0
+
+
+def enqueue_for_ticket(name, ticket, payload=None, **kwargs):
+    return enqueue(name, payload, priority=ticket_priority(ticket), **kwargs)
+
+
+def retry_delay(attempts):
+    """
+    Seconds before retrying a job that has failed `attempts` times:
+    exponential from TICKET_JOB_RETRY_DELAY, capped at an hour, with
+    jitter so jobs that failed together do not retry together.
+    """
+    base = getattr(settings, "TICKET_JOB_RETRY_DELAY", DEFAULT_RETRY_DELAY)
+    delay = min(base * 2 ** (attempts - 1), MAX_RETRY_DELAY)
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _claim_order(queryset):
+    return queryset.order_by("-priority", "run_at", "id")
+
+
+def claim(worker, limit=1, now=None):
+    """
+    Atomically mark up to `limit` due jobs as running under `worker` and
+    return them. Backends with SKIP LOCKED lock the rows they pick so
+    concurrent workers pass over them; elsewhere (SQLite, which serializes
+    writers anyway) each job is taken with a conditional UPDATE, and a job
+    another worker got first simply updates no rows.
+    """
+    now = now or timezone.now()
+    due = _claim_order(Job.objects.filter(status=Job.QUEUED, run_at__lte=now))
+    claimed = {
+        "status": Job.RUNNING,
+        "locked_by": worker,
+        "locked_at": now,
+        "started_at": now,
+        "attempts": F("attempts") + 1,
+    }
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(due.select_for_update(skip_locked=True).values_list("id", flat=True)[:limit])
+            Job.objects.filter(id__in=ids).update(**claimed)
+    else:
+        ids = []
+        for pk in due.values_list("id", flat=True)[:limit * 2]:
+            if Job.objects.filter(pk=pk, status=Job.QUEUED).update(**claimed):
+                ids.append(pk)
+                if len(ids) == limit:
+                    break
+    return list(_claim_order(Job.objects.filter(id__in=ids)))
+
+
+def run_job(job):
+    """
+    Run a claimed job and record the outcome. Returns True on success.
+    """
+    func = REGISTRY.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f"No job registered as {job.name!r}.")
+        func(**job.payload)
+    except Exception:
+        _failed(job, traceback.format_exc(), retry=func is not None)
+        return False
+    Job.objects.filter(pk=job.pk, locked_by=job.locked_by).update(
+        status=Job.DONE, finished_at=timezone.now(), locked_by="", locked_at=None, last_error="",
+    )
+    return True
+
+
+def _failed(job, error, retry=True):
+    now = timezone.now()
+    mine = Job.objects.filter(pk=job.pk, locked_by=job.locked_by)
+    if retry and job.attempts < job.max_attempts:
+        mine.update(
+            status=Job.QUEUED, run_at=now + timedelta(seconds=retry_delay(job.attempts)),
+            locked_by="", locked_at=None, last_error=error,
+        )
+    else:
+        mine.update(status=Job.FAILED, finished_at=now, locked_by="", locked_at=None, last_error=error)
+
+
+def heartbeat(worker, now=None):
+    """
+    Refresh the locks of the jobs `worker` is running, so requeue_stale()
+    leaves them alone. Returns how many there are.
+    """
+    return Job.objects.filter(status=Job.RUNNING, locked_by=worker).update(locked_at=now or timezone.now())
+
+
+def requeue_stale(timeout=None, now=None):
+    """
+    Hand out again the jobs whose worker died mid-run, or fail them if
+    they are out of attempts. Returns the number of jobs recovered.
+    """
+    now = now or timezone.now()
+    timeout = timeout or getattr(settings, "TICKET_JOB_LOCK_TIMEOUT", DEFAULT_LOCK_TIMEOUT)
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=now - timedelta(seconds=timeout))
+    error = "Worker stopped responding."
+    stale.filter(attempts__gte=F("max_attempts")).update(
+        status=Job.FAILED, finished_at=now, locked_by="", locked_at=None, last_error=error,
+    )
+    return stale.update(status=Job.QUEUED, run_at=now, locked_by="", locked_at=None, last_error=error)
+
+
+def prune_finished(retention=None, now=None):
+    """
+    Delete jobs that succeeded more than TICKET_JOB_RETENTION seconds ago.
+    Failed jobs are kept for inspection.
+    """
+    now = now or timezone.now()
+    retention = retention or getattr(settings, "TICKET_JOB_RETENTION", DEFAULT_RETENTION)
+    deleted, _ = Job.objects.filter(
+        status=Job.DONE, finished_at__lt=now - timedelta(seconds=retention)
+    ).delete()
+    return deleted
+
+
+class JobWorker:
+    """
+    Claims and runs jobs in a loop. Several workers, in one process each,
+    may share the queue.
+    """
+
+    def __init__(self, name=None, batch_size=10, poll_interval=1.0, maintenance_interval=60):
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.maintenance_interval = maintenance_interval
+        self.next_maintenance = 0
+        self.processed = 0
+        self.failed = 0
+        self.heartbeat_interval = getattr(settings, "TICKET_JOB_HEARTBEAT_INTERVAL", DEFAULT_HEARTBEAT_INTERVAL)
+
+    def _beat(self, stop):
+        try:
+            while not stop.wait(self.heartbeat_interval):
+                heartbeat(self.name)
+        finally:
+            connection.close()  # this thread's own connection
+
+    def _run_jobs(self, jobs):
+        stop = threading.Event()
+        beat = threading.Thread(target=self._beat, args=(stop,), name=f"{self.name} heartbeat", daemon=True)
+        beat.start()
+        try:
+            for job in jobs:
+                if not run_job(job):
+                    self.failed += 1
+                self.processed += 1
+        finally:
+            stop.set()
+            beat.join()
+
+    def run_once(self):
+        """
+        Claim one batch of due jobs and run them. Returns how many ran.
+        """
+        if time.monotonic() >= self.next_maintenance:
+            requeue_stale()
+            prune_finished()
+            self.next_maintenance = time.monotonic() + self.maintenance_interval
+        jobs = claim(self.name, self.batch_size)
+        if jobs:
+            self._run_jobs(jobs)
+        return len(jobs)
+
+    def run_until_empty(self):
+        while self.run_once():
+            pass
+        return self.processed
+
+    def run_forever(self, stop=None):
+        """
+        Poll for jobs until `stop` (a threading or multiprocessing Event) is
+        set, sleeping only while the queue has nothing due.
+        """
+        while not (stop and stop.is_set()):
+            if not self.run_once():
+                if stop:
+                    stop.wait(self.poll_interval)
+                else:
+                    time.sleep(self.poll_interval)
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def queue_depth(now=None):
+    """
+    Jobs per status and how long the oldest due job has waited for a
+    worker, in two aggregate queries.
+    """
+    now = now or timezone.now()
+    by_status = dict(Job.objects.values_list("status").annotate(count=Count("id")).order_by())
+    oldest_due = Job.objects.filter(status=Job.QUEUED, run_at__lte=now).aggregate(oldest=Min("run_at"))["oldest"]
+    return {
+        "queued": by_status.get(Job.QUEUED, 0),
+        "running": by_status.get(Job.RUNNING, 0),
+        "done": by_status.get(Job.DONE, 0),
+        "failed": by_status.get(Job.FAILED, 0),
+        "oldest_due_seconds": (now - oldest_due).total_seconds() if oldest_due else 0,
+    }
+
+
+def job_stats(window=3600, now=None):
+    """
+    Queue depth and, over the last `window` seconds, throughput and latency
+    per job name. Latency runs from enqueue to finish, so it includes time
+    spent waiting for a worker and any retries; run time is the last attempt
+    alone.
+    """
+    now = now or timezone.now()
+    since = now - timedelta(seconds=window)
+
+    finished = (
+        Job.objects.filter(status__in=[Job.DONE, Job.FAILED], finished_at__gte=since)
+        .values_list("name", "status", "created_at", "started_at", "finished_at")
+        .order_by("-finished_at")[:10000]
+    )
+    latencies = defaultdict(list)
+    run_times = defaultdict(list)
+    outcomes = defaultdict(lambda: {Job.DONE: 0, Job.FAILED: 0})
+    for name, status, created_at, started_at, finished_at in finished:
+        outcomes[name][status] += 1
+        latencies[name].append((finished_at - created_at).total_seconds())
+        if started_at:
+            run_times[name].append((finished_at - started_at).total_seconds())
+
+    jobs = {}
+    for name in sorted(outcomes):
+        jobs[name] = {
+            "done": outcomes[name][Job.DONE],
+            "failed": outcomes[name][Job.FAILED],
+            "per_minute": round(outcomes[name][Job.DONE] / (window / 60), 2),
+            "latency_p50": _percentile(latencies[name], 0.5),
+            "latency_p95": _percentile(latencies[name], 0.95),
+            "run_time_avg": sum(run_times[name]) / len(run_times[name]) if run_times[name] else None,
+        }
+    return {
+        **queue_depth(now),
+        "window_seconds": window,
+        "per_minute": round(sum(job["done"] for job in jobs.values()) / (window / 60), 2),
+        "jobs": jobs,
+    }
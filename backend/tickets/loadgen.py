@@ -0,0 +1,354 @@
+"""
+Deterministic synthetic ticket data for development and load testing.
+
+Tickets are generated lazily and inserted in batches, so memory use does not
+depend on how many are generated. Everything is drawn from one seeded
+random.Random: the same seed, counts and end date give the same tickets.
+The shape is meant to look like a real help desk rather than uniform noise:
+
+    - a few staff file most tickets (Zipf-like), most file a handful;
+    - sub-departments differ in volume, Level 3 departments the most;
+    - volume grows over the period, dips at weekends and follows the
+      working day;
+    - old tickets are mostly archived, recent ones mostly open or in
+      progress;
+    - a fraction carry an image attachment from a small shared pool.
+"""
+import bisect
+import io
+import itertools
+import random
+import time
+from datetime import datetime, time as dt_time, timedelta, timezone as dt_timezone
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+from PIL import Image, ImageDraw
+
+from authentication.models import User
+from . import escalation, images
+from .inserts import bulk_create_with_pks
+from .models import MainDepartment, PriorityLevel, SubDepartment, Ticket
+from .signals import bulk_write, tickets_bulk_created
+
+PRIORITY_LEVELS = {
+    3: "Level 3 (Highest)",
+    2: "Level 2 (Medium)",
+    1: "Level 1 (Lowest)",
+}
+
+# Main department -> priority level -> sub-department names.
+DEPARTMENTS = {
+    "Medical": {
+        3: ["Emergency Department (ED)", "Intensive Care Unit (ICU)", "Surgery (OR)"],
+        2: ["Neurology", "Psychiatry and Mental Health"],
+        1: ["Pediatrics", "Dermatology", "Pathology"],
+    },
+    "Administrative": {
+        3: ["Admissions and Registration"],
+        2: ["Quality Assurance", "Public Relations / Marketing"],
+        1: ["Billing and Finance", "Human Resources (HR)", "Medical Records"],
+    },
+    "Support/Ancillary": {
+        3: ["IT / Technology", "Security"],
+        2: ["Housekeeping / Environmental Services", "Transport Services"],
+        1: ["Pharmacy", "Laboratory Services"],
+    },
+}
+
+TITLES = [
+    "System Outage", "Performance Degradation", "Software Bug", "Data Sync Error",
+    "Request for Maintenance", "Minor Glitch", "Configuration Update", "Urgent Disruption",
+    "Connectivity Problem", "Access Rights Issue", "Printer Jam", "Password Reset",
+    "Monitor Offline", "Badge Reader Fault", "Label Printer Misaligned",
+]
+
+ISSUES = [
+    "Brief network disruption affecting critical systems.",
+    "Delayed scheduling tasks leading to minor backlog.",
+    "Intermittent errors in communication logs.",
+    "Slow retrieval times for medical records.",
+    "System mismatch in staff rosters and shift changes.",
+    "Error prompting for additional security checks.",
+    "Laboratory data not syncing promptly to central server.",
+    "Random UI glitch impacting front-desk efficiency.",
+    "Connectivity drop in outpatient monitoring tools.",
+    "Temporary meltdown in inventory ordering processes.",
+    "Prolonged backups in billing and finance queries.",
+    "Glitches in HR record updates causing incomplete data.",
+    "Latency in patient admission procedures.",
+    "Queue freeze observed in the pharmacy dispatch system.",
+    "Maintenance tasks failing to generate automated tickets.",
+    "Minor disruptions in imaging tool data flow.",
+    "Repetitive logouts observed under heavy usage.",
+    "Delayed cafeteria supply updates in distribution workflow.",
+    "Insufficient encryption on certain internal messages.",
+    "Systemic error in patient-lab test result merges.",
+]
+
+# Appended to some issues, so issue texts (and the search index) vary.
+DETAILS = [
+    "Started after the overnight update.", "Affects the whole floor.",
+    "Only on the workstation by the nurses' station.", "Happens every few minutes.",
+    "Users have restarted twice already.", "Blocking discharge paperwork.",
+    "Reported by the charge nurse.", "Seen on both day and night shifts.",
+]
+
+FIRST_NAMES = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda",
+    "William", "Elizabeth", "David", "Barbara", "Maria", "Wei", "Aisha", "Carlos",
+    "Priya", "Olga", "Kwame", "Yuki",
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Miller", "Davis", "Garcia",
+    "Wilson", "Anderson", "Taylor", "Thomas", "Nguyen", "Patel", "Kim", "Okafor",
+]
+
+USERNAME_PREFIX = "loadgen"
+
+# Relative ticket volume by sub-department priority level.
+LEVEL_WEIGHTS = {3: 3.0, 2: 1.5, 1: 1.0}
+WEEKDAY_WEIGHTS = [1.0, 1.0, 1.0, 1.0, 0.9, 0.45, 0.35]
+# Hour of day (UTC) -> relative volume: quiet nights, busy day shift.
+HOUR_WEIGHTS = [0.2, 0.15, 0.1, 0.1, 0.15, 0.3, 0.7, 1.2, 1.6, 1.7, 1.6, 1.4,
+                1.3, 1.5, 1.6, 1.4, 1.2, 1.0, 0.8, 0.6, 0.5, 0.4, 0.3, 0.25]
+
+# (status, weight) by ticket age: old tickets have been worked through.
+STATUS_MIX = [
+    (timedelta(days=2), [("open", 45), ("1", 25), ("2", 18), ("3", 10), ("archived", 2)]),
+    (timedelta(days=14), [("open", 10), ("1", 15), ("2", 25), ("3", 30), ("archived", 20)]),
+    (None, [("open", 2), ("1", 3), ("2", 5), ("3", 15), ("archived", 75)]),
+]
+
+IMAGE_POOL_SIZE = 8
+
+
+def ensure_reference_data():
+    """
+    Create the standard priority levels, departments and sub-departments
+    if missing. Returns the sub-departments, ordered by name.
+    """
+    with transaction.atomic():
+        priorities = {}
+        for level, description in PRIORITY_LEVELS.items():
+            priority, _ = PriorityLevel.objects.get_or_create(level=level, defaults={"description": description})
+            priorities[level] = priority
+        for main_name, levels in DEPARTMENTS.items():
+            main_department, _ = MainDepartment.objects.get_or_create(name=main_name)
+            for level, names in levels.items():
+                for name in names:
+                    # Names are unique: one loaded elsewhere (e.g. by
+                    # load_departments.py) under another department is kept.
+                    SubDepartment.objects.get_or_create(
+                        name=name, defaults={"main_department": main_department, "priority": priorities[level]},
+                    )
+    return list(SubDepartment.objects.select_related("priority").order_by("name", "id"))
+
+
+def ensure_users(count):
+    """
+    Return `count` generator-owned users (loadgen00001, ...), creating the
+    missing ones. They cannot log in.
+    """
+    usernames = [f"{USERNAME_PREFIX}{i:05d}" for i in range(1, count + 1)]
+    owned = User.objects.filter(username__startswith=USERNAME_PREFIX)
+    existing = set(owned.values_list("username", flat=True))
+    User.objects.bulk_create(
+        (User(username=username, email=f"{username}@example.com", password=UNUSABLE_PASSWORD_PREFIX)
+         for username in usernames if username not in existing),
+        batch_size=2000,
+    )
+    users = {user.username: user for user in owned.only("id", "username")}
+    return [users[username] for username in usernames]
+
+
+def ensure_image_pool(size=IMAGE_POOL_SIZE):
+    """
+    Store a few placeholder photos, with their derivatives, for tickets to
+    share. Returns [(image, thumbnail, preview) names]. Existing files are
+    reused.
+    """
+    fields = [Ticket._meta.get_field(name) for name in ("image", "image_thumbnail", "image_preview")]
+    storage = fields[0].storage
+    pool = []
+    for index in range(size):
+        names = tuple(field.generate_filename(None, f"loadgen_{index}.jpg") for field in fields)
+        if not all(storage.exists(name) for name in names):
+            picture = Image.new("RGB", (1600, 1200), (40 + index * 25, 90, 200 - index * 20))
+            ImageDraw.Draw(picture).rectangle((200, 150, 1400, 1050), outline="white", width=24)
+            buffer = io.BytesIO()
+            picture.save(buffer, "JPEG", quality=80)
+            for name in names:
+                storage.delete(name)
+            image = storage.save(names[0], ContentFile(buffer.getvalue()))
+            derived = images.derive(image)
+            names = (image, derived["image_thumbnail"], derived["image_preview"])
+        pool.append(names)
+    return pool
+
+
+def _cumulative(weights):
+    return list(itertools.accumulate(weights))
+
+
+# Ticket columns, by attname, in the order TicketGenerator.row() gives them.
+COLUMNS = (
+    "user_id", "first_name", "last_name", "email", "title", "issue", "sub_department_id",
+    "PriorityLevel_id", "image", "image_thumbnail", "image_preview", "status", "created_at",
+    "updated_at", "escalation_due_at",
+)
+# The datetimes come last.
+FIRST_DATETIME = COLUMNS.index("created_at")
+
+
+class TicketGenerator:
+    """
+    Yields unsaved Ticket instances with the distributions described in the
+    module docstring.
+    """
+
+    def __init__(self, users, sub_departments, end, months=12, seed=0, image_ratio=0.05, image_pool=()):
+        self.rng = random.Random(seed)
+        self.users = users
+        self.sub_departments = sub_departments
+        self.end = end
+        self.image_ratio = image_ratio if image_pool else 0
+        self.image_pool = list(image_pool)
+
+        # Zipf-like user activity, with the heavy users spread through the list.
+        ranks = list(range(1, len(users) + 1))
+        self.rng.shuffle(ranks)
+        self.user_weights = _cumulative(1 / rank for rank in ranks)
+        self.department_weights = _cumulative(
+            LEVEL_WEIGHTS.get(sub_department.priority.level if sub_department.priority else 1, 1.0)
+            * self.rng.lognormvariate(0, 0.5)
+            for sub_department in sub_departments
+        )
+
+        days = max(1, round(months * 30.44))
+        self.start = end - timedelta(days=days)
+        # Volume ramps up to 2x over the period, shaped by the weekday.
+        self.day_weights = _cumulative(
+            (1 + day / days) * WEEKDAY_WEIGHTS[(self.start + timedelta(days=day)).weekday()]
+            for day in range(days)
+        )
+        self.hour_weights = _cumulative(HOUR_WEIGHTS)
+        self.status_mix = [
+            (age, [status for status, _ in mix], _cumulative(weight for _, weight in mix))
+            for age, mix in STATUS_MIX
+        ]
+
+    def _pick(self, cumulative):
+        return bisect.bisect_right(cumulative, self.rng.random() * cumulative[-1])
+
+    def _status(self, age):
+        for limit, statuses, cumulative in self.status_mix:
+            if limit is None or age < limit:
+                return statuses[self._pick(cumulative)]
+
+    def row(self):
+        """
+        The next ticket as a tuple of column values, in COLUMNS order.
+        """
+        rng = self.rng
+        user = self.users[self._pick(self.user_weights)]
+        sub_department = self.sub_departments[self._pick(self.department_weights)]
+        created_at = (
+            self.start
+            + timedelta(days=self._pick(self.day_weights), hours=self._pick(self.hour_weights),
+                        seconds=rng.randrange(3600))
+        )
+        created_at = min(created_at, self.end - timedelta(seconds=1))
+        status = self._status(self.end - created_at)
+        # Worked on a while after being filed; most within a day or two.
+        updated_at = created_at
+        if status != "open":
+            updated_at = min(self.end, created_at + timedelta(hours=rng.expovariate(1 / 20)))
+
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        issue = rng.choice(ISSUES)
+        if rng.random() < 0.5:
+            issue = f"{issue} {rng.choice(DETAILS)}"
+        priority = sub_department.priority
+        image = rng.choice(self.image_pool) if rng.random() < self.image_ratio else ("", "", "")
+        return (
+            user.pk, first_name, last_name, f"{first_name.lower()}.{last_name.lower()}@example.com",
+            rng.choice(TITLES), issue, sub_department.pk, priority.pk if priority else None, *image, status,
+            created_at, updated_at,
+            escalation.next_deadline(status, priority.level if priority else None, updated_at),
+        )
+
+    def ticket(self):
+        return Ticket(**dict(zip(COLUMNS, self.row())))
+
+    def rows(self, count):
+        for _ in range(count):
+            yield self.row()
+
+    def tickets(self, count):
+        for _ in range(count):
+            yield self.ticket()
+
+
+def default_end():
+    """
+    Midnight UTC today: runs on the same day with the same seed match.
+    """
+    return datetime.combine(datetime.now(dt_timezone.utc).date(), dt_time(), tzinfo=dt_timezone.utc)
+
+
+def _batches(items, size):
+    while batch := list(itertools.islice(items, size)):
+        yield batch
+
+
+def _create_with_hooks(tickets):
+    with bulk_write():
+        bulk_create_with_pks(Ticket, tickets)
+    tickets_bulk_created(tickets)
+
+
+def _insert_rows(rows):
+    # A plain executemany: bulk_create spends most of its time preparing each
+    # value through its field, several times longer than the inserts take.
+    # The values are already in database form except for datetimes.
+    adapt = connection.ops.adapt_datetimefield_value
+    rows = [row[:FIRST_DATETIME] + tuple(map(adapt, row[FIRST_DATETIME:])) for row in rows]
+    quote = connection.ops.quote_name
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        quote(Ticket._meta.db_table),
+        ", ".join(quote(Ticket._meta.get_field(column).column) for column in COLUMNS),
+        ", ".join(["%s"] * len(COLUMNS)),
+    )
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def generate(count, users=500, months=12, seed=0, end=None, image_ratio=0.05, batch_size=5000,
+             run_hooks=False, progress=None):
+    """
+    Insert `count` generated tickets in batches of `batch_size`, one
+    transaction each. Without `run_hooks` the change feed, counters and
+    search index are not updated; reconcile and rebuild them afterwards.
+    Returns (tickets inserted, elapsed seconds).
+    """
+    started = time.monotonic()
+    generator = TicketGenerator(
+        ensure_users(users), ensure_reference_data(), end or default_end(), months=months, seed=seed,
+        image_ratio=image_ratio, image_pool=ensure_image_pool() if image_ratio else (),
+    )
+    if run_hooks:
+        batches = _batches(generator.tickets(count), batch_size)
+        insert = _create_with_hooks
+    else:
+        batches = _batches(generator.rows(count), batch_size)
+        insert = _insert_rows
+    inserted = 0
+    for batch in batches:
+        with transaction.atomic():
+            insert(batch)
+        inserted += len(batch)
+        if progress:
+            progress(inserted, time.monotonic() - started)
+    return inserted, time.monotonic() - started
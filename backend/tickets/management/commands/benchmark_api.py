@@ -0,0 +1,75 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from tickets import benchmarks
+
+CASES = ("get_all_tickets", "get_all_tickets_page", "user_tickets", "create_ticket", "update_ticket",
+         "delete_ticket", "login", "register")
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the ticket and authentication endpoints at several dataset "
+        "sizes: latency percentiles, queries per request and peak memory. Runs "
+        "in a throwaway database, created like the test runner's and destroyed "
+        "afterwards, so results do not depend on the data already present. "
+        "Optionally save the results as JSON and compare them with a saved "
+        "baseline; regressions make the command fail."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--scales", default=",".join(str(scale) for scale in benchmarks.DEFAULT_SCALES),
+                            help="Comma-separated ticket counts (default 10000,100000,1000000).")
+        parser.add_argument("--requests", type=int, default=50,
+                            help="Timed requests per case (default 50).")
+        parser.add_argument("--max-seconds", type=float, default=10,
+                            help="Time budget per case; slow cases stop early, after at least "
+                                 f"{benchmarks.MIN_SAMPLES} requests (default 10).")
+        parser.add_argument("--case", action="append", choices=CASES, dest="cases",
+                            help="Only run this case; repeatable. update_ticket and delete_ticket "
+                                 "use the tickets create_ticket made, so run it with them.")
+        parser.add_argument("--seed", type=int, default=0, help="Data generator seed (default 0).")
+        parser.add_argument("--output", help="Write the results to this JSON file.")
+        parser.add_argument("--compare", metavar="BASELINE",
+                            help="Compare with results saved by an earlier --output.")
+        parser.add_argument("--threshold", type=float, default=0.2,
+                            help="Relative latency or memory increase counted as a regression (default 0.2).")
+
+    def handle(self, *args, **options):
+        try:
+            scales = [int(scale) for scale in options["scales"].split(",") if scale.strip()]
+        except ValueError:
+            raise CommandError("--scales must be comma-separated integers.")
+        baseline = None
+        if options["compare"]:
+            try:
+                with open(options["compare"]) as source:
+                    baseline = json.load(source)
+            except (OSError, ValueError) as exc:
+                raise CommandError(f"Cannot read baseline {options['compare']}: {exc}")
+            if baseline.get("version") != benchmarks.RESULTS_VERSION:
+                raise CommandError(f"Baseline {options['compare']} is from an incompatible version.")
+
+        old_name = connection.settings_dict["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = benchmarks.run(
+                scales, requests=options["requests"], max_seconds=options["max_seconds"], seed=options["seed"],
+                cases=options["cases"], log=self.stdout.write,
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if options["output"]:
+            with open(options["output"], "w") as target:
+                json.dump(results, target, indent=2)
+            self.stdout.write(f"Results written to {options['output']}.")
+        if baseline is not None:
+            regressions = benchmarks.compare(baseline, results, options["threshold"])
+            for regression in regressions:
+                self.stderr.write(regression)
+            if regressions:
+                raise CommandError(f"{len(regressions)} regression(s) against {options['compare']}.")
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['compare']}."))
@@ -0,0 +1,107 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from authentication.models import User
+from tickets.fast_serializer import render_rows, ticket_rows
+from tickets.fragments import FragmentCache, FragmentResponse, render_json
+from tickets.models import MainDepartment, PriorityLevel, SubDepartment, Ticket
+from tickets.serializers import TicketSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare rendering the full ticket list through TicketSerializer with "
+        "the fast row serializer and with joining cached per-ticket fragments "
+        "when only a few tickets changed since the last request. Synthetic tickets are added inside a "
+        "transaction that is rolled back, so the database is left untouched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tickets", type=int, default=100_000,
+                            help="Tickets in the table during the run (default 100000).")
+        parser.add_argument("--changed", type=float, default=0.01,
+                            help="Fraction of tickets updated between requests (default 0.01).")
+        parser.add_argument("--repeat", type=int, default=3,
+                            help="Timed runs per measurement; the best is reported (default 3).")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._seed(options["tickets"])
+            self._run(options["changed"], options["repeat"])
+            transaction.set_rollback(True)
+
+    def _seed(self, wanted):
+        missing = wanted - Ticket.objects.count()
+        if missing <= 0:
+            return
+        user = User.objects.order_by("id").first() or User.objects.create(username="benchmark")
+        sub_department = SubDepartment.objects.select_related("priority").first()
+        if sub_department is None:
+            priority, _ = PriorityLevel.objects.get_or_create(level=2, defaults={"description": "Medium"})
+            main_department, _ = MainDepartment.objects.get_or_create(name="Medical")
+            sub_department = SubDepartment.objects.create(
+                name="Benchmark", main_department=main_department, priority=priority
+            )
+        now = timezone.now()
+        Ticket.objects.bulk_create(
+            (Ticket(user=user, first_name="Pat", last_name="Doe", email="pat@example.com",
+                    title=f"Benchmark ticket {i}", issue="Synthetic ticket for benchmarking.",
+                    sub_department=sub_department, PriorityLevel=sub_department.priority,
+                    created_at=now, updated_at=now)
+             for i in range(missing)),
+            batch_size=5000,
+        )
+        self.stdout.write(f"Added {missing} synthetic ticket(s).")
+
+    def _best(self, repeat, render, before=None):
+        timings = []
+        for _ in range(repeat):
+            if before:
+                before()
+            started = time.perf_counter()
+            body = render()
+            timings.append(time.perf_counter() - started)
+        return min(timings), body
+
+    def _run(self, changed, repeat):
+        ordered = Ticket.objects.order_by("-created_at", "-id")
+        tickets = list(ordered)
+        rows = list(ticket_rows(ordered))
+        cache = FragmentCache(len(rows))
+
+        serializer_time, expected = self._best(
+            repeat, lambda: render_json(TicketSerializer(tickets, many=True).data)
+        )
+        fast_time, body = self._best(repeat, lambda: b"[" + b",".join(render_rows(rows)) + b"]")
+        if body != expected:
+            self.stderr.write("Fast serializer output differs from TicketSerializer output!")
+        cold_time, _ = self._best(1, lambda: FragmentResponse(cache.fragments(rows)).body)
+
+        touched = set(random.sample([row.id for row in rows], int(len(rows) * changed)))
+        Ticket.objects.filter(pk__in=touched).update(updated_at=timezone.now())
+        rows = list(ticket_rows(ordered))
+        changed_keys = {(row.id, row.updated_at) for row in rows if row.id in touched}
+
+        def forget_changed():
+            # Every timed run should see the changed tickets as new.
+            for key in list(cache.entries):
+                if key[:2] in changed_keys:
+                    del cache.entries[key]
+
+        warm_time, body = self._best(repeat, lambda: FragmentResponse(cache.fragments(rows)).body,
+                                     before=forget_changed)
+        if body != render_json(TicketSerializer(ordered, many=True).data):
+            self.stderr.write("Fragment output differs from TicketSerializer output!")
+
+        self.stdout.write(f"Tickets:                     {len(rows)}")
+        self.stdout.write(f"Changed between requests:    {len(changed_keys)}")
+        self.stdout.write(f"TicketSerializer + render:   {serializer_time * 1000:,.0f} ms")
+        self.stdout.write(f"Fast serializer, no cache:   {fast_time * 1000:,.0f} ms")
+        self.stdout.write(f"Fragments, cold cache:       {cold_time * 1000:,.0f} ms")
+        self.stdout.write(f"Fragments, warm cache:       {warm_time * 1000:,.0f} ms")
+        if warm_time:
+            self.stdout.write(self.style.SUCCESS(f"Speedup (warm): {serializer_time / warm_time:,.1f}x"))
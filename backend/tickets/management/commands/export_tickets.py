@@ -0,0 +1,39 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from tickets.export import EXPORT_FORMATS, export_rows, export_stream
+from tickets.filters import TICKET_FILTER_PARAMS, filter_tickets
+from tickets.models import Ticket
+
+
+class Command(BaseCommand):
+    help = (
+        "Stream tickets to a CSV or NDJSON file (or stdout) with constant "
+        "memory. Accepts the same filters as /api/tickets/all/."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="csv")
+        parser.add_argument("--output", help="File to write; defaults to stdout.")
+        parser.add_argument("--chunk-size", type=int, default=2000,
+                            help="Rows fetched from the database per round trip (default 2000).")
+        for name in TICKET_FILTER_PARAMS:
+            parser.add_argument(f"--{name.replace('_', '-')}", dest=name)
+
+    def handle(self, *args, **options):
+        params = {name: options[name] for name in TICKET_FILTER_PARAMS if options.get(name)}
+        try:
+            tickets = filter_tickets(Ticket.objects.all(), params)
+        except ValidationError as exc:
+            raise CommandError(exc.detail)
+
+        chunks = export_stream(options["format"], export_rows(tickets, chunk_size=options["chunk_size"]))
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8", newline="") as out:
+                for chunk in chunks:
+                    out.write(chunk)
+        else:
+            for chunk in chunks:
+                sys.stdout.write(chunk)
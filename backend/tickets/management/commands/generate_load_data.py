@@ -0,0 +1,64 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tickets.counters import reconcile
+from tickets.loadgen import generate
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate realistic synthetic tickets for development and load "
+        "testing: many users, several months of history skewed by "
+        "department and priority, a mix of statuses and image attachments. "
+        "Streams in batches, so tens of millions of tickets use constant "
+        "memory. The same --seed and --end always give the same tickets."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tickets", type=int, default=100_000,
+                            help="Tickets to generate (default 100000).")
+        parser.add_argument("--users", type=int, default=500,
+                            help="Users the tickets are spread across (default 500).")
+        parser.add_argument("--months", type=float, default=12,
+                            help="Months of history before --end (default 12).")
+        parser.add_argument("--end", help="ISO date the history ends at (default: today, midnight UTC).")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed (default 0).")
+        parser.add_argument("--image-ratio", type=float, default=0.05,
+                            help="Fraction of tickets with an image attachment (default 0.05).")
+        parser.add_argument("--batch-size", type=int, default=5000,
+                            help="Tickets inserted per transaction (default 5000).")
+        parser.add_argument("--hooks", action="store_true",
+                            help="Record changes, count, index and publish each batch as it is "
+                                 "inserted. Without it, the counters are reconciled at the end; "
+                                 "run rebuild_ticket_search_index afterwards.")
+
+    def handle(self, *args, **options):
+        end = None
+        if options["end"]:
+            try:
+                end = datetime.fromisoformat(options["end"])
+            except ValueError:
+                raise CommandError(f"Invalid --end date {options['end']!r}.")
+            if end.tzinfo is None:
+                end = end.replace(tzinfo=dt_timezone.utc)
+
+        def report(inserted, elapsed):
+            self.stdout.write(f"{inserted:,} ticket(s) inserted ({inserted / elapsed if elapsed else 0:,.0f}/s)")
+
+        inserted, elapsed = generate(
+            options["tickets"],
+            users=options["users"],
+            months=options["months"],
+            seed=options["seed"],
+            end=end,
+            image_ratio=options["image_ratio"],
+            batch_size=options["batch_size"],
+            run_hooks=options["hooks"],
+            progress=report,
+        )
+        if not options["hooks"]:
+            reconcile()
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {inserted:,} ticket(s) in {elapsed:.1f}s ({inserted / elapsed if elapsed else 0:,.0f}/s)."
+        ))
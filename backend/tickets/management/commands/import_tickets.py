@@ -0,0 +1,58 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from authentication.models import User
+from tickets.importer import TicketImporter, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Import tickets from a CSV or NDJSON file in batches. Columns: title, "
+        "issue, sub_department (name or id), optional PriorityLevel/priority "
+        "(level, description or label), status, user (username), first_name, "
+        "last_name, email, created_at and updated_at. Re-running the same file "
+        "resumes after the last committed batch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or NDJSON file to import.")
+        parser.add_argument("--format", choices=["csv", "ndjson"],
+                            help="Input format; inferred from the file extension by default.")
+        parser.add_argument("--batch-size", type=int, default=5000,
+                            help="Rows inserted per transaction (default 5000).")
+        parser.add_argument("--user", help="Username owning rows that have no user column.")
+        parser.add_argument("--restart", action="store_true",
+                            help="Ignore the saved checkpoint and import from the first row.")
+        parser.add_argument("--no-hooks", action="store_true",
+                            help="Skip the change feed, counters, search index and push events for "
+                                 "speed; run reconcile_ticket_counters and "
+                                 "rebuild_ticket_search_index afterwards.")
+
+    def handle(self, *args, **options):
+        path = os.path.abspath(options["path"])
+        if not os.path.exists(path):
+            raise CommandError(f"{path} does not exist.")
+        fmt = options["format"] or ("ndjson" if path.endswith((".ndjson", ".jsonl")) else "csv")
+
+        default_user = None
+        if options["user"]:
+            try:
+                default_user = User.objects.get(username=options["user"])
+            except User.DoesNotExist:
+                raise CommandError(f"No user named {options['user']!r}.")
+
+        importer = TicketImporter(
+            source=path,
+            batch_size=options["batch_size"],
+            default_user=default_user,
+            run_hooks=not options["no_hooks"],
+            stdout=self.stdout,
+            stderr=self.stderr,
+        )
+        elapsed = importer.run(read_rows(path, fmt), restart=options["restart"])
+        rate = importer.imported / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {importer.imported} ticket(s), skipped {importer.skipped}, "
+            f"in {elapsed:.1f}s ({rate:,.0f} rows/s)."
+        ))
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tickets.changes import current_sequence
+from tickets.models import TicketChange
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete change-feed entries older than --days. Clients polling from a "
+        "pruned sequence get HTTP 410 and must resync."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=30,
+                            help="Keep changes recorded within this many days (default 30).")
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options["days"])
+        # Always keep the newest entry so the feed can still tell a stale
+        # sequence apart from an up-to-date one.
+        deleted, _ = TicketChange.objects.filter(
+            changed_at__lt=cutoff, id__lt=current_sequence()
+        ).delete()
+        self.stdout.write(f"Pruned {deleted} change(s) recorded before {cutoff.isoformat()}.")
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tickets.models import Ticket, TicketSearchTerm
+from tickets.search import index_tickets
+
+
+class Command(BaseCommand):
+    help = "Rebuild the ticket full-text search index from scratch, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=2000,
+                            help="Tickets indexed per transaction (default 2000).")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        TicketSearchTerm.objects.all().delete()
+        tickets = Ticket.objects.only("id", "title", "issue").order_by("id")
+        batch_size = options["batch_size"]
+        last_id = 0
+        total = 0
+        while True:
+            batch = list(tickets.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            index_tickets(batch, replace=False)
+            last_id = batch[-1].pk
+            total += len(batch)
+        elapsed = time.monotonic() - started
+        self.stdout.write(f"Indexed {total} ticket(s) in {elapsed:.1f}s.")
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from tickets.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount tickets per (status, sub-department, priority) bucket, report "
+        "any drift in the incrementally maintained counters and rewrite them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Report drift without rewriting the counters.")
+
+    def handle(self, *args, **options):
+        drift = reconcile(apply=not options["dry_run"])
+        if not drift:
+            self.stdout.write(self.style.SUCCESS("Counters match the ticket table."))
+            return
+        for (status, sub_department_id, priority_id), delta in sorted(drift.items(), key=str):
+            self.stdout.write(
+                f"status={status} sub_department={sub_department_id} priority={priority_id or None}: "
+                f"stored {'+' if delta > 0 else ''}{delta} vs actual"
+            )
+        action = "Reported" if options["dry_run"] else "Repaired"
+        self.stdout.write(self.style.WARNING(f"{action} drift in {len(drift)} bucket(s)."))
@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from drf_jwt_backend import metrics
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete the per-process files in METRICS_DIR. Run it once before the "
+        "server processes start (e.g. in the deploy or start script), never "
+        "while they are running."
+    )
+
+    def handle(self, *args, **options):
+        if not getattr(settings, "METRICS_DIR", None):
+            raise CommandError("METRICS_DIR is not set; each process keeps its metrics privately.")
+        removed = metrics.reset()
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} metrics file(s) from {settings.METRICS_DIR}."))
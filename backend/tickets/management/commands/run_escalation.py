@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from tickets.escalation import EscalationScheduler, backfill_deadlines
+
+
+class Command(BaseCommand):
+    help = (
+        "Run the ticket escalation scheduler. Tickets advance through the "
+        "kanban statuses when their escalation_due_at passes, at a pace set by "
+        "their sub-department's priority level."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true",
+                            help="Apply the deadlines that are already due, then exit.")
+        parser.add_argument("--backfill", action="store_true",
+                            help="First give escalatable tickets without a deadline one.")
+        parser.add_argument("--horizon", type=int, default=300,
+                            help="Seconds of upcoming deadlines kept in memory (default 300).")
+        parser.add_argument("--refresh", type=int, default=5,
+                            help="Seconds between reloads from the database (default 5).")
+        parser.add_argument("--batch-size", type=int, default=1000,
+                            help="Tickets escalated per transaction (default 1000).")
+
+    def handle(self, *args, **options):
+        if options["backfill"]:
+            self.stdout.write(f"Scheduled {backfill_deadlines()} ticket(s) without a deadline.")
+
+        scheduler = EscalationScheduler(
+            horizon=options["horizon"],
+            refresh=options["refresh"],
+            batch_size=options["batch_size"],
+            stdout=self.stdout,
+        )
+        if options["once"]:
+            self.stdout.write(f"Escalated {scheduler.tick()} ticket(s).")
+            return
+        self.stdout.write("Escalation scheduler running. Press Ctrl+C to stop.")
+        try:
+            scheduler.run_forever()
+        except KeyboardInterrupt:
+            pass
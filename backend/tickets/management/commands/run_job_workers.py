@@ -0,0 +1,80 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from tickets.jobs import JobWorker, job_stats
+
+
+def work(stop, batch_size, poll_interval):
+    """
+    Worker process body. SIGINT goes to the whole process group on Ctrl+C;
+    the parent turns it into `stop` so jobs in flight finish first.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    JobWorker(batch_size=batch_size, poll_interval=poll_interval).run_forever(stop)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background job workers: each process claims due jobs from the "
+        "Job table, highest priority first, and retries failures with backoff."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int, default=1,
+                            help="Worker processes (default 1).")
+        parser.add_argument("--batch-size", type=int, default=10,
+                            help="Jobs claimed at a time per worker (default 10).")
+        parser.add_argument("--poll-interval", type=float, default=1.0,
+                            help="Seconds between polls of an empty queue (default 1).")
+        parser.add_argument("--once", action="store_true",
+                            help="Run the jobs that are already due in this process, then exit.")
+        parser.add_argument("--stats", action="store_true",
+                            help="Print queue depth and the last hour's throughput and latency, then exit.")
+
+    def handle(self, *args, **options):
+        if options["stats"]:
+            self._print_stats(job_stats())
+            return
+        if options["once"]:
+            worker = JobWorker(batch_size=options["batch_size"])
+            worker.run_until_empty()
+            self.stdout.write(f"Ran {worker.processed} job(s), {worker.failed} failed.")
+            return
+
+        # Workers must not share the parent's database connections.
+        connections.close_all()
+        context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else None)
+        stop = context.Event()
+        processes = [
+            context.Process(target=work, args=(stop, options["batch_size"], options["poll_interval"]), daemon=True)
+            for _ in range(options["processes"])
+        ]
+        for process in processes:
+            process.start()
+        signal.signal(signal.SIGTERM, lambda *args: stop.set())
+        self.stdout.write(f"Running {len(processes)} job worker(s). Press Ctrl+C to stop.")
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            stop.set()
+            for process in processes:
+                process.join()
+
+    def _print_stats(self, stats):
+        self.stdout.write(
+            f"{stats['queued']} queued ({stats['oldest_due_seconds']:.0f}s oldest due), "
+            f"{stats['running']} running, {stats['failed']} failed, {stats['per_minute']} done/min"
+        )
+        for name, job in stats["jobs"].items():
+            p50 = "-" if job["latency_p50"] is None else f"{job['latency_p50']:.2f}s"
+            p95 = "-" if job["latency_p95"] is None else f"{job['latency_p95']:.2f}s"
+            self.stdout.write(
+                f"  {name}: {job['done']} done, {job['failed']} failed, "
+                f"{job['per_minute']}/min, latency p50 {p50} p95 {p95}"
+            )
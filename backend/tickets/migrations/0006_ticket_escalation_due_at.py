@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0005_ticketchange'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='escalation_due_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
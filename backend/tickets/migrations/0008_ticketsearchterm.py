@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0007_ticketcounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TicketSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.FloatField()),
+                ('ticket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='tickets.ticket')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('term', 'ticket'), name='ticket_search_term_unique')],
+            },
+        ),
+    ]
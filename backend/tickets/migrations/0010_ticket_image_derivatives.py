@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tickets', '0009_ticketimportcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ticket',
+            name='image_preview',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='tickets/previews/'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='image_thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='tickets/thumbnails/'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from authentication.models import User  # Ensure your custom User model is imported
 
 class PriorityLevel(models.Model):
@@ -86,9 +87,186 @@ class Ticket(models.Model):
         related_name="tickets"
     )
     image = models.ImageField(upload_to="tickets/", null=True, blank=True)
+    # Downscaled JPEG copies of `image`, generated when it is saved.
+    image_thumbnail = models.ImageField(upload_to="tickets/thumbnails/", null=True, blank=True, editable=False)
+    image_preview = models.ImageField(upload_to="tickets/previews/", null=True, blank=True, editable=False)
     status = models.CharField(max_length=50, default="open")
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    # Stamped by default and in save() rather than with auto_now_add/auto_now,
+    # so bulk inserts (imports, generated load data) can keep the values set
+    # on the instances.
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    updated_at = models.DateTimeField(default=timezone.now, editable=False)
+    # When the escalation scheduler should advance this ticket's status;
+    # null once the ticket has reached a terminal status.
+    escalation_due_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        # Each list filter leads with its own column and ends with the keyset
+        # ordering (created_at, id), so filtered pages are index range scans.
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="ticket_created_idx"),
+            models.Index(fields=["status", "created_at", "id"], name="ticket_status_created_idx"),
+            models.Index(fields=["sub_department", "created_at", "id"], name="ticket_subdept_created_idx"),
+            models.Index(fields=["PriorityLevel", "created_at", "id"], name="ticket_priority_created_idx"),
+            models.Index(fields=["updated_at", "id"], name="ticket_updated_idx"),
+        ]
 
     def __str__(self):
         return self.title
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if not self._state.adding and (update_fields is None or "updated_at" in update_fields):
+            self.updated_at = timezone.now()
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # Remember the values as loaded so save hooks can tell what changed
+        # without re-reading the row.
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def loaded_value(self, attname):
+        """
+        Return the value `attname` had when the ticket was loaded, or None
+        for tickets that were not loaded from the database.
+        """
+        return getattr(self, "_loaded_values", {}).get(attname)
+
+    def remember_loaded_values(self):
+        """
+        Snapshot the current field values after a save, so a later save of
+        the same instance compares against what is now in the database.
+        """
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields
+        }
+
+
+class TicketChange(models.Model):
+    """
+    Append-only log of ticket writes used for incremental client sync.
+    The auto-incrementing id doubles as the change sequence number, and
+    deletions are kept as tombstones so clients learn about them too.
+    """
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    OPERATION_CHOICES = [
+        (CREATED, "Created"),
+        (UPDATED, "Updated"),
+        (DELETED, "Deleted"),
+    ]
+    # Not a ForeignKey: tombstones must outlive the ticket they describe.
+    ticket_id = models.BigIntegerField(db_index=True)
+    operation = models.CharField(max_length=10, choices=OPERATION_CHOICES)
+    changed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"#{self.pk} ticket {self.ticket_id} {self.operation}"
+
+
+class TicketCounter(models.Model):
+    """
+    Number of tickets in one (status, sub-department, priority) bucket.
+    Maintained incrementally on every ticket write so dashboard statistics
+    read a few dozen rows instead of counting the ticket table.
+
+    The ids are plain integers rather than foreign keys so that a bucket can
+    briefly outlive its department during a cascade; priority 0 stands for
+    "no priority", keeping the unique constraint effective on every backend.
+    """
+    status = models.CharField(max_length=50)
+    sub_department_id = models.BigIntegerField()
+    priority_id = models.BigIntegerField(default=0)
+    count = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["status", "sub_department_id", "priority_id"],
+                name="ticket_counter_bucket_unique",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.status}/{self.sub_department_id}/{self.priority_id}: {self.count}"
+
+
+class TicketSearchTerm(models.Model):
+    """
+    One posting of the ticket search index: `term` occurs in the ticket's
+    title or issue text. `weight` is the term's saturated, title-boosted
+    frequency in that ticket, precomputed at index time so ranking only has
+    to multiply it by the term's inverse document frequency.
+    """
+    term = models.CharField(max_length=64)
+    ticket = models.ForeignKey(Ticket, on_delete=models.CASCADE, related_name="search_terms")
+    weight = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["term", "ticket"], name="ticket_search_term_unique"),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.ticket_id}"
+
+
+class TicketImportCheckpoint(models.Model):
+    """
+    Progress of a bulk ticket import. `rows_done` is advanced in the same
+    transaction as each imported batch, so a crashed import resumes exactly
+    after the last committed batch.
+    """
+    source = models.CharField(max_length=500, unique=True)
+    rows_done = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source}: {self.rows_done} row(s)"
+
+
+class Job(models.Model):
+    """
+    A unit of deferred work run by the `run_job_workers` command. Workers
+    claim the queued job with the highest priority whose `run_at` has
+    passed; failed jobs are re-queued with backoff until `max_attempts`.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    # Higher runs first; ticket jobs take their sub-department's priority level.
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField()
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Claim order: the next runnable job is the first queued row by
+            # priority, then due time.
+            models.Index(fields=["status", "-priority", "run_at"], name="job_claim_idx"),
+            models.Index(fields=["status", "finished_at"], name="job_finished_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.name} ({self.status})"
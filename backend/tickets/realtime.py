@@ -0,0 +1,161 @@
+"""
+Push delivery of ticket events to kanban boards and dashboards.
+
+Two transports share the same broker and filters:
+    - Server-Sent Events at /api/tickets/events/ (a plain async Django view)
+    - WebSocket at /ws/tickets/ (a bare ASGI app routed in drf_jwt_backend.asgi)
+
+Both must be served by an ASGI server (e.g. uvicorn or daphne): each idle
+connection is then a suspended coroutine rather than a worker thread, so one
+worker holds thousands of them.
+
+Clients authenticate with a SimpleJWT access token, either in the usual
+"Authorization: Bearer <token>" header or, because browsers cannot set
+headers on EventSource/WebSocket, in a `token` query parameter. Validating
+the token checks its signature, expiry and the in-memory revocation list;
+no database query is made for a token that was never revoked.
+"""
+import asyncio
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from authentication.authentication import ClaimsJWTAuthentication
+
+from .events import encode_event, get_broker
+
+KEEPALIVE_SECONDS = 15
+
+# Query parameter -> event field used for per-client filtering.
+FILTER_PARAMS = {
+    "status": "status",
+    "sub_department": "sub_department",
+    "main_department": "main_department",
+    "priority": "priority",
+}
+
+
+def parse_filters(params):
+    """
+    Build subscription filters from query parameters such as
+    ?main_department=1&priority=3,2. Unknown or malformed values are ignored.
+    """
+    filters = {}
+    for param, field in FILTER_PARAMS.items():
+        raw = params.get(param)
+        if not raw:
+            continue
+        values = set()
+        for value in raw.split(","):
+            value = value.strip()
+            if not value:
+                continue
+            values.add(value if field == "status" else _to_int(value))
+        values.discard(None)
+        if values:
+            filters[field] = values
+    return filters
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def validate_token(raw_token):
+    """
+    Return the validated access token, or None if it is missing, invalid or
+    revoked. May query the revocation table, so async code calls it through
+    sync_to_async.
+    """
+    if not raw_token:
+        return None
+    try:
+        return ClaimsJWTAuthentication().get_validated_token(raw_token)
+    except (InvalidToken, TokenError):
+        return None
+
+
+def _token_from_header(value):
+    parts = value.split()
+    if len(parts) == 2 and parts[0].lower() == "bearer":
+        return parts[1]
+    return None
+
+
+async def ticket_event_stream(request):
+    """
+    Server-Sent Events stream of ticket create/update/delete events.
+    Accepts the same status/sub_department/main_department/priority filters
+    as the list endpoint.
+    """
+    raw = _token_from_header(request.headers.get("Authorization", "")) or request.GET.get("token")
+    if await sync_to_async(validate_token)(raw) is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided or are invalid."},
+                            status=401)
+
+    broker = get_broker()
+    subscription = broker.subscribe(parse_filters(request.GET))
+
+    async def events():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    event = await subscription.get(KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                seq = event.get("seq")
+                prefix = f"id: {seq}\n" if seq is not None else ""
+                yield f"{prefix}event: {event['type']}\ndata: {encode_event(event)}\n\n"
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(events(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+async def ticket_event_websocket(scope, receive, send):
+    """
+    ASGI WebSocket endpoint pushing the same events as JSON text frames.
+    The connection is rejected with close code 4001 if the token is invalid.
+    """
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+
+    params = {key: values[-1] for key, values in parse_qs(scope.get("query_string", b"").decode()).items()}
+    headers = {key.decode("latin1").lower(): value.decode("latin1") for key, value in scope.get("headers", [])}
+    raw = _token_from_header(headers.get("authorization", "")) or params.get("token")
+    if await sync_to_async(validate_token)(raw) is None:
+        await send({"type": "websocket.close", "code": 4001})
+        return
+
+    await send({"type": "websocket.accept"})
+    broker = get_broker()
+    subscription = broker.subscribe(parse_filters(params))
+
+    async def pump():
+        while True:
+            event = await subscription.queue.get()
+            await send({"type": "websocket.send", "text": encode_event(event)})
+
+    async def wait_for_disconnect():
+        while True:
+            message = await receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+    pump_task = asyncio.ensure_future(pump())
+    try:
+        await wait_for_disconnect()
+    finally:
+        pump_task.cancel()
+        broker.unsubscribe(subscription)
@@ -0,0 +1,156 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.signals import request_started
+from django.db import DatabaseError, transaction
+
+from .models import MainDepartment, PriorityLevel, SubDepartment
+
+
+class ReferenceData:
+    """
+    Immutable snapshot of the priority/department hierarchy, with each
+    SubDepartment's main_department and priority relations pre-attached.
+
+    The instances are shared by every thread in the process and must be
+    treated as read-only.
+    """
+
+    def __init__(self, version):
+        self.version = version
+        self.priorities = PriorityLevel.objects.in_bulk()
+        self.main_departments = MainDepartment.objects.in_bulk()
+        self.sub_departments = SubDepartment.objects.in_bulk()
+        for sub_department in self.sub_departments.values():
+            sub_department.main_department = self.main_departments[sub_department.main_department_id]
+            sub_department.priority = self.priorities.get(sub_department.priority_id)
+
+    def fingerprint(self):
+        """
+        The fields tickets are rendered from, to tell whether a reload found
+        any change.
+        """
+        return (
+            sorted((pk, p.level, p.description) for pk, p in self.priorities.items()),
+            sorted((pk, m.name) for pk, m in self.main_departments.items()),
+            sorted((pk, s.name, s.main_department_id, s.priority_id) for pk, s in self.sub_departments.items()),
+        )
+
+    def by_model(self, model):
+        return {
+            PriorityLevel: self.priorities,
+            MainDepartment: self.main_departments,
+            SubDepartment: self.sub_departments,
+        }[model]
+
+    def sub_department_ids(self, main_department_ids):
+        wanted = set(main_department_ids)
+        return [pk for pk, sub_department in self.sub_departments.items()
+                if sub_department.main_department_id in wanted]
+
+
+REFERENCE_MODELS = (PriorityLevel, MainDepartment, SubDepartment)
+
+
+DEFAULT_MISS_RELOAD_INTERVAL = 1.0
+
+_lock = threading.Lock()
+_snapshot = None
+_version = 0
+_next_miss_reload = 0.0
+
+
+def get_reference():
+    """
+    Return the current snapshot, loading it on first use or after an
+    invalidation (three small queries).
+    """
+    global _snapshot
+    snapshot = _snapshot
+    if snapshot is None:
+        with _lock:
+            if _snapshot is None:
+                _snapshot = ReferenceData(_version)
+            snapshot = _snapshot
+    return snapshot
+
+
+def invalidate():
+    """
+    Drop the snapshot so the next reader reloads it; bumps the version that
+    caches derived from reference data (such as serialized tickets) key on.
+    """
+    global _snapshot, _version
+    with _lock:
+        _version += 1
+        _snapshot = None
+
+
+def invalidate_on_commit(**kwargs):
+    # Invalidate now and again after commit, so a reader that reloaded in
+    # between does not keep the pre-commit state.
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+def reload_after_miss():
+    """
+    Reload the snapshot because a key was not found in it (it may have been
+    created by another process). The version only moves if the rows differ,
+    so looking up keys that do not exist leaves derived caches alone, and
+    reloads happen at most every TICKET_REFERENCE_MISS_INTERVAL seconds, so
+    a client sending unknown keys cannot turn every request into three
+    queries. Returns the current snapshot.
+    """
+    global _snapshot, _version, _next_miss_reload
+    with _lock:
+        now = time.monotonic()
+        if _snapshot is not None and now < _next_miss_reload:
+            return _snapshot
+        _next_miss_reload = now + getattr(settings, "TICKET_REFERENCE_MISS_INTERVAL", DEFAULT_MISS_RELOAD_INTERVAL)
+        fresh = ReferenceData(_version)
+        if _snapshot is not None and fresh.fingerprint() != _snapshot.fingerprint():
+            _version += 1
+            fresh.version = _version
+        _snapshot = fresh
+        return fresh
+
+
+def lookup(model, pk):
+    """
+    Resolve a reference row by primary key from memory. An unknown key may
+    have been created by another process, so the snapshot is reloaded
+    before giving up (see reload_after_miss). Returns None if the row does
+    not exist.
+    """
+    if pk is None:
+        return None
+    found = get_reference().by_model(model).get(pk)
+    if found is None:
+        found = reload_after_miss().by_model(model).get(pk)
+    return found
+
+
+def sub_department(pk):
+    return lookup(SubDepartment, pk)
+
+
+def priority(pk):
+    return lookup(PriorityLevel, pk)
+
+
+def warm(**kwargs):
+    """
+    Load the snapshot once, when the first request starts. Connected from
+    TicketsConfig.ready(), where Django discourages querying directly; a
+    missing table (e.g. before migrate) just leaves loading to first use.
+    """
+    request_started.disconnect(warm, dispatch_uid=WARM_UID)
+    try:
+        get_reference()
+    except DatabaseError:
+        pass
+
+
+WARM_UID = "tickets.reference.warm"
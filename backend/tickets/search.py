@@ -0,0 +1,212 @@
+import base64
+import math
+import re
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+from rest_framework.exceptions import NotFound
+
+from .filters import TICKET_FILTER_PARAMS, filter_tickets
+from .models import Ticket, TicketCounter, TicketSearchTerm
+
+TERM_PATTERN = re.compile(r"[a-z0-9]+")
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 64
+MAX_QUERY_TERMS = 8
+TITLE_BOOST = 3
+# BM25 term-frequency saturation: repeated words count less and less.
+K1 = 1.2
+# Tickets ranked per query at most, taken from the rarest term's postings
+# with the highest weight; see search_tickets().
+DEFAULT_MAX_CANDIDATES = 10_000
+
+STOP_WORDS = frozenset("""
+    a an and are as at be by for from has have in is it its of on or that the
+    to was were will with this there their not but been into
+""".split())
+
+FACET_FIELDS = {
+    "sub_department": "sub_department_id",
+    "priority": "PriorityLevel_id",
+    "status": "status",
+}
+
+
+def tokenize(text):
+    """
+    Lower-case alphanumeric terms of `text`, without stop words.
+    """
+    return [
+        term[:MAX_TERM_LENGTH]
+        for term in TERM_PATTERN.findall((text or "").lower())
+        if len(term) >= MIN_TERM_LENGTH and term not in STOP_WORDS
+    ]
+
+
+def ticket_postings(ticket):
+    """
+    Build the index entries for one ticket: one per distinct term, weighted
+    by its saturated frequency with title occurrences boosted.
+    """
+    frequencies = Counter()
+    for term in tokenize(ticket.title):
+        frequencies[term] += TITLE_BOOST
+    for term in tokenize(ticket.issue):
+        frequencies[term] += 1
+    return [
+        TicketSearchTerm(term=term, ticket_id=ticket.pk, weight=tf * (K1 + 1) / (tf + K1))
+        for term, tf in frequencies.items()
+    ]
+
+
+def index_tickets(tickets, replace=True):
+    """
+    (Re)index the given tickets. Pass replace=False for tickets known to have
+    no postings yet, such as freshly bulk-created ones.
+    """
+    tickets = list(tickets)
+    with transaction.atomic():
+        if replace:
+            TicketSearchTerm.objects.filter(ticket_id__in=[t.pk for t in tickets]).delete()
+        TicketSearchTerm.objects.bulk_create(
+            [posting for ticket in tickets for posting in ticket_postings(ticket)],
+            batch_size=1000,
+        )
+
+
+def text_changed(ticket):
+    return (ticket.title != ticket.loaded_value("title")
+            or ticket.issue != ticket.loaded_value("issue"))
+
+
+def _encode_cursor(score, ticket_id):
+    raw = f"{score!r}|{ticket_id}"
+    return base64.urlsafe_b64encode(raw.encode("ascii")).decode("ascii")
+
+
+def _decode_cursor(encoded):
+    try:
+        score, ticket_id = base64.urlsafe_b64decode(encoded.encode("ascii")).decode("ascii").split("|")
+        return float(score), int(ticket_id)
+    except (TypeError, ValueError, UnicodeError):
+        raise NotFound("Invalid cursor")
+
+
+class SearchResult:
+    def __init__(self, ranked, facets, next_cursor, matches=None, truncated=False):
+        self.ranked = ranked          # [(ticket_id, score)] for this page
+        self.facets = facets          # {field: {value: count}}
+        self.next_cursor = next_cursor
+        self.truncated = truncated    # only the best MAX_CANDIDATES were ranked
+        self._matches = matches
+        self._total = None
+
+    @property
+    def total(self):
+        if self._total is None:
+            if self.facets.get("status") is not None:
+                self._total = sum(self.facets["status"].values())
+            else:
+                self._total = self._matches.count() if self._matches is not None else 0
+        return self._total
+
+
+def _empty_result():
+    return SearchResult([], {field: {} for field in FACET_FIELDS}, None)
+
+
+def _candidates(term, df):
+    """
+    Postings of `term` whose tickets are ranked: all of them, or the
+    MAX_CANDIDATES with the highest weight when the term is that common.
+    Returns (postings, truncated).
+    """
+    postings = TicketSearchTerm.objects.filter(term=term)
+    limit = getattr(settings, "TICKET_SEARCH_MAX_CANDIDATES", DEFAULT_MAX_CANDIDATES)
+    if df <= limit:
+        return postings, False
+    # The cut-off posting is looked up first rather than used as a LIMITed
+    # subquery, which MySQL does not support inside IN.
+    weight, ticket_id = postings.order_by("-weight", "-ticket_id").values_list("weight", "ticket_id")[limit - 1]
+    return postings.filter(Q(weight__gt=weight) | Q(weight=weight, ticket_id__gte=ticket_id)), True
+
+
+def search_tickets(query, params=None, page_size=20, cursor=None, facets=True):
+    """
+    Rank tickets matching every term of `query` by BM25-style relevance.
+
+    Candidates come from the postings of the query's rarest term; the other
+    terms are looked up for those tickets only, through the (term, ticket)
+    index, and the postings are grouped per ticket and scored as
+    sum(weight * idf). When even the rarest term matches more than
+    MAX_CANDIDATES tickets, only its highest-weighted postings are ranked,
+    so the work per query is bounded whatever the size of the index; the
+    result is then marked truncated and its counts cover those only.
+
+    Results are keyset paged on (score, ticket id). Facet counts by
+    sub-department, priority and status are read in one grouped query.
+    `params` accepts the list endpoint's filters.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return _empty_result()
+
+    document_frequency = dict(
+        TicketSearchTerm.objects.filter(term__in=terms)
+        .values("term").annotate(df=Count("id")).order_by()
+        .values_list("term", "df")
+    )
+    if len(document_frequency) < len(terms):
+        # A term that occurs nowhere can never be matched by every ticket.
+        return _empty_result()
+
+    documents = TicketCounter.objects.aggregate(n=Sum("count"))["n"] or 0
+    documents = max(documents, max(document_frequency.values()))
+    idf = {
+        term: math.log(1 + (documents - df + 0.5) / (df + 0.5))
+        for term, df in document_frequency.items()
+    }
+
+    rarest = min(document_frequency, key=document_frequency.get)
+    candidates, truncated = _candidates(rarest, document_frequency[rarest])
+    matches = (
+        TicketSearchTerm.objects.filter(term__in=terms, ticket_id__in=candidates.values("ticket_id"))
+        .values("ticket_id")
+        .annotate(
+            score=Sum(
+                Case(*[When(term=term, then=F("weight") * Value(weight)) for term, weight in idf.items()],
+                     output_field=FloatField()),
+            ),
+            hits=Count("id"),
+        )
+        .filter(hits=len(terms))
+    )
+    if params and any(params.get(name) for name in TICKET_FILTER_PARAMS):
+        matches = matches.filter(ticket_id__in=filter_tickets(Ticket.objects.all(), params).values("id"))
+
+    page = matches.order_by("-score", "-ticket_id")
+    if cursor:
+        score, ticket_id = _decode_cursor(cursor)
+        page = page.filter(Q(score__lt=score) | Q(score=score, ticket_id__lt=ticket_id))
+    ranked = [(row["ticket_id"], row["score"]) for row in page[:page_size + 1]]
+    next_cursor = None
+    if len(ranked) > page_size:
+        ranked = ranked[:page_size]
+        last_id, last_score = ranked[-1]
+        next_cursor = _encode_cursor(last_score, last_id)
+
+    facet_counts = {}
+    if facets:
+        facet_counts = {name: Counter() for name in FACET_FIELDS}
+        columns = list(FACET_FIELDS.values())
+        grouped = (
+            Ticket.objects.filter(pk__in=matches.values("ticket_id"))
+            .values_list(*columns).annotate(n=Count("id")).order_by()
+        )
+        for *values, count in grouped:
+            for name, value in zip(FACET_FIELDS, values):
+                facet_counts[name][value] += count
+        facet_counts = {name: dict(counts) for name, counts in facet_counts.items()}
+    return SearchResult(ranked, facet_counts, next_cursor, matches=matches, truncated=truncated)
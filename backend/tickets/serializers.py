@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from . import reference
 from .models import PriorityLevel, MainDepartment, SubDepartment, Ticket
 
 
@@ -19,11 +20,73 @@ class SubDepartmentSerializer(serializers.ModelSerializer):
         model = SubDepartment
         fields = ["id", "name", "priority"]
 
+def media_url(field, value):
+    """
+    URL of a Ticket file field's value, given as a FieldFile or as the
+    stored name (as in values() rows); None when empty.
+    """
+    name = getattr(value, "name", value)
+    return Ticket._meta.get_field(field).storage.url(name) if name else None
+
+
+class ReferencePrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Primary key field that resolves priority levels and departments from the
+    in-process reference cache, so validating a ticket costs no queries.
+    Other models fall back to a query.
+    """
+
+    def to_internal_value(self, data):
+        model = self.get_queryset().model
+        if model not in reference.REFERENCE_MODELS:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            found = reference.lookup(model, int(data))
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if found is None:
+            self.fail("does_not_exist", pk_value=data)
+        return found
+
+
 class TicketSerializer(serializers.ModelSerializer):
-    sub_department_name = serializers.CharField(source="sub_department.name", read_only=True)
-    main_department_name = serializers.CharField(source="sub_department.main_department.name", read_only=True)
-    priority_level_description = serializers.CharField(source="PriorityLevel.description", read_only=True)
-    
+    serializer_related_field = ReferencePrimaryKeyRelatedField
+
+    # Names come from the reference cache rather than the ticket's relations,
+    # so serializing tickets needs no joins and no per-ticket queries.
+    sub_department_name = serializers.SerializerMethodField()
+    main_department_name = serializers.SerializerMethodField()
+    priority_level_description = serializers.SerializerMethodField()
+    image_thumbnail = serializers.SerializerMethodField()
+    image_preview = serializers.SerializerMethodField()
+
+    def get_sub_department_name(self, ticket):
+        sub_department = reference.sub_department(ticket.sub_department_id)
+        return sub_department.name if sub_department else None
+
+    def get_main_department_name(self, ticket):
+        sub_department = reference.sub_department(ticket.sub_department_id)
+        return sub_department.main_department.name if sub_department else None
+
+    def get_priority_level_description(self, ticket):
+        priority = reference.priority(ticket.PriorityLevel_id)
+        return priority.description if priority else None
+
+    def get_image_thumbnail(self, ticket):
+        return media_url("image_thumbnail", ticket.image_thumbnail)
+
+    def get_image_preview(self, ticket):
+        return media_url("image_preview", ticket.image_preview)
+
+    def validate(self, attrs):
+        # New tickets without an explicit priority inherit their
+        # sub-department's.
+        if self.instance is None and "PriorityLevel" not in attrs and "sub_department" in attrs:
+            attrs["PriorityLevel"] = attrs["sub_department"].priority
+        return attrs
+
     class Meta:
         model = Ticket
         fields = [
@@ -37,4 +100,6 @@ class TicketSerializer(serializers.ModelSerializer):
             "priority_level_description",
             "status",
             "created_at",
+            "image_thumbnail",
+            "image_preview",
         ]
@@ -0,0 +1,141 @@
+import threading
+from contextlib import contextmanager
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import counters, escalation, images, reference, search
+from .changes import record_changes
+from .events import build_event, has_subscribers, publish_on_commit
+from .models import MainDepartment, PriorityLevel, SubDepartment, Ticket, TicketChange
+from .serializers import TicketSerializer
+
+_state = threading.local()
+
+
+@contextmanager
+def bulk_write():
+    """
+    Silence the per-instance handlers below for the current thread, for bulk
+    operations that report their writes through the tickets_bulk_* hooks
+    instead (e.g. a QuerySet.delete() that would otherwise record and count
+    every ticket one query at a time).
+    """
+    previous = getattr(_state, "bulk", False)
+    _state.bulk = True
+    try:
+        yield
+    finally:
+        _state.bulk = previous
+
+
+def _in_bulk_write():
+    return getattr(_state, "bulk", False)
+
+
+@receiver(pre_save, sender=Ticket)
+def ticket_saving(sender, instance, raw=False, **kwargs):
+    if raw or _in_bulk_write():
+        return
+    escalation.schedule(instance)
+    images.refresh_derivatives(instance)
+
+
+@receiver(post_save, sender=Ticket)
+def ticket_saved(sender, instance, created, raw=False, **kwargs):
+    if raw or _in_bulk_write():
+        return
+    operation = TicketChange.CREATED if created else TicketChange.UPDATED
+    change, = record_changes([instance.pk], operation)
+    previous = None if created else counters.loaded_bucket(instance)
+    if created or previous is not None:
+        counters.apply_deltas(counters.transition_deltas([(previous, counters.ticket_bucket(instance))]))
+    if created or search.text_changed(instance):
+        search.index_tickets([instance], replace=not created)
+    images.queue_derivatives(instance)
+    instance.remember_loaded_values()
+    if has_subscribers():
+        data = TicketSerializer(instance).data
+        publish_on_commit(build_event(operation, instance, seq=change.pk, data=data))
+
+
+@receiver(post_delete, sender=Ticket)
+def ticket_deleted(sender, instance, **kwargs):
+    if _in_bulk_write():
+        return
+    change, = record_changes([instance.pk], TicketChange.DELETED)
+    previous = counters.loaded_bucket(instance) or counters.ticket_bucket(instance)
+    counters.apply_deltas({previous: -1})
+    if has_subscribers():
+        publish_on_commit(build_event(TicketChange.DELETED, instance, seq=change.pk))
+
+
+# Bulk counterparts of the handlers above, for code that writes tickets with
+# QuerySet.update, bulk_create or bulk_update and so bypasses model signals.
+
+def tickets_bulk_created(tickets):
+    """
+    Record, count, index and publish freshly bulk-created tickets. The
+    tickets must have their primary keys set; insert them with
+    inserts.bulk_create_with_pks() inside bulk_write().
+    """
+    changes = record_changes([ticket.pk for ticket in tickets], TicketChange.CREATED)
+    counters.apply_deltas(counters.transition_deltas(
+        (None, counters.ticket_bucket(ticket)) for ticket in tickets
+    ))
+    search.index_tickets(tickets, replace=False)
+    for ticket in tickets:
+        ticket.remember_loaded_values()
+    if not has_subscribers():
+        return
+    # One list serializer builds its fields once instead of once per ticket.
+    serialized = TicketSerializer(tickets, many=True).data
+    for ticket, change, data in zip(tickets, changes, serialized):
+        publish_on_commit(build_event(TicketChange.CREATED, ticket, seq=change.pk, data=data))
+
+
+def tickets_bulk_updated(ticket_ids, previous_buckets=None, reindex_ids=()):
+    """
+    Record and publish updates to the given tickets, reading them back in a
+    single query. `previous_buckets` maps ticket id to its counter bucket
+    before the update; without it the counters are left for reconciliation.
+    Tickets in `reindex_ids` had their text changed and are re-indexed.
+    """
+    changes = record_changes(ticket_ids, TicketChange.UPDATED)
+    seqs = {change.ticket_id: change.pk for change in changes}
+    tickets = list(Ticket.objects.filter(pk__in=ticket_ids))
+    if previous_buckets:
+        counters.apply_deltas(counters.transition_deltas(
+            (previous_buckets.get(ticket.pk), counters.ticket_bucket(ticket)) for ticket in tickets
+        ))
+    if reindex_ids:
+        reindex_ids = set(reindex_ids)
+        search.index_tickets([ticket for ticket in tickets if ticket.pk in reindex_ids])
+    if not has_subscribers():
+        return
+    for ticket, data in zip(tickets, TicketSerializer(tickets, many=True).data):
+        publish_on_commit(build_event(TicketChange.UPDATED, ticket, seq=seqs.get(ticket.pk), data=data))
+
+
+def tickets_bulk_deleted(tickets):
+    """
+    Record, uncount and publish tickets deleted inside bulk_write(). Pass the
+    instances as loaded before the delete.
+    """
+    changes = record_changes([ticket.pk for ticket in tickets], TicketChange.DELETED)
+    counters.apply_deltas(counters.transition_deltas(
+        (counters.loaded_bucket(ticket) or counters.ticket_bucket(ticket), None) for ticket in tickets
+    ))
+    if not has_subscribers():
+        return
+    for ticket, change in zip(tickets, changes):
+        publish_on_commit(build_event(TicketChange.DELETED, ticket, seq=change.pk))
+
+
+# Priority levels and departments are served from the in-process reference
+# cache; any write to them drops the snapshot.
+@receiver([post_save, post_delete], sender=PriorityLevel)
+@receiver([post_save, post_delete], sender=MainDepartment)
+@receiver([post_save, post_delete], sender=SubDepartment)
+def reference_data_changed(sender, raw=False, **kwargs):
+    reference.invalidate_on_commit()
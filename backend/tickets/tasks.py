@@ -0,0 +1,39 @@
+from django.db import transaction
+from django.utils import timezone
+
+from . import images, workorder_store
+from .jobs import task
+from .models import Ticket
+from .signals import tickets_bulk_updated
+
+# Job functions run by the `run_job_workers` command. Each is called with
+# the job's payload outside any transaction, and may run more than once
+# (after a failure or a lost worker), so they must be safe to repeat.
+
+
+@task("tickets.image_derivatives")
+def image_derivatives(ticket_id, image):
+    """
+    Render the thumbnail and preview of a newly saved ticket image.
+    """
+    current = Ticket.objects.filter(pk=ticket_id, image=image)
+    if not current.exists():
+        return  # deleted, or the image was replaced and has its own job
+    names = images.derive(image)
+    # updated_at moves so cached renders and sync clients pick up the new
+    # image URLs.
+    with transaction.atomic():
+        if current.update(updated_at=timezone.now(), **names):
+            tickets_bulk_updated([ticket_id])
+            return
+    # The image changed while these were rendered.
+    images.delete_unused(names.items())
+
+
+@task(workorder_store.WORKORDER_BATCH_JOB)
+def workorder_batch(ticket_ids, fmt, name, owner_id):
+    """
+    Render a work order download too large to stream from its request.
+    `owner_id` is the user who asked for it and may download it.
+    """
+    workorder_store.write_batch(ticket_ids, fmt, name)
@@ -1,3 +1,1134 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import threading
+import zipfile
+from datetime import datetime, timedelta, timezone as dt_timezone
 
-# Create your tests here.
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+
+from authentication.models import User
+from authentication.serializers import MyTokenObtainPairSerializer
+from drf_jwt_backend import asgi, instrumentation, metrics
+from .models import PriorityLevel, MainDepartment, SubDepartment, Ticket, TicketChange, TicketImportCheckpoint, Job
+from . import (benchmarks, counters, events, jobs, loadgen, realtime, reference, views, workorder_store,
+               workorders)
+from .fast_serializer import render_rows, ticket_rows
+from .fragments import get_fragment_cache
+from .importer import TicketImporter, read_rows
+from .jobs import JobWorker
+from .search import search_tickets
+from .serializers import TicketSerializer
+from .escalation import EscalationScheduler
+
+
+class TicketFixtureMixin:
+    """
+    Builds a small department hierarchy and a helper to add tickets to it.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create(username="nurse", email="nurse@example.com")
+        cls.priorities = [
+            PriorityLevel.objects.create(level=level, description=f"Level {level}")
+            for level in (1, 2, 3)
+        ]
+        medical = MainDepartment.objects.create(name="Medical")
+        support = MainDepartment.objects.create(name="Support/Ancillary")
+        cls.sub_departments = [
+            SubDepartment.objects.create(name="ICU", main_department=medical, priority=cls.priorities[2]),
+            SubDepartment.objects.create(name="Pharmacy", main_department=support, priority=cls.priorities[0]),
+        ]
+        # Loaded up front, as the first request to a running server does.
+        reference.get_reference()
+
+    def make_tickets(self, count, user=None):
+        tickets = []
+        for i in range(count):
+            sub_department = self.sub_departments[i % len(self.sub_departments)]
+            tickets.append(Ticket(
+                user=user or self.user,
+                first_name="Pat",
+                last_name="Doe",
+                email="pat@example.com",
+                title=f"Ticket {i}",
+                issue="Monitor offline",
+                sub_department=sub_department,
+                PriorityLevel=sub_department.priority,
+            ))
+        return Ticket.objects.bulk_create(tickets)
+
+
+class TicketReadQueryCountTests(TicketFixtureMixin, TestCase):
+    """
+    Every ticket read path must issue a fixed number of queries, no matter how
+    many tickets it serializes.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.factory = APIRequestFactory()
+
+    def test_get_all_tickets(self):
+        for count in (1, 25):
+            Ticket.objects.all().delete()
+            self.make_tickets(count)
+            with self.assertNumQueries(1):
+                response = self.client.get("/api/tickets/all/")
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data), count)
+            self.assertEqual(response.data[0]["main_department_name"], "Medical")
+
+    def test_user_tickets(self):
+        other = User.objects.create(username="porter")
+        for count in (1, 25):
+            Ticket.objects.all().delete()
+            self.make_tickets(count)
+            self.make_tickets(count, user=other)
+            request = self.factory.get("/api/tickets/user/")
+            force_authenticate(request, user=self.user)
+            with self.assertNumQueries(1):
+                response = views.user_tickets(request)
+            self.assertEqual(len(response.data), count)
+
+    def test_detail_views(self):
+        ticket = self.make_tickets(1)[0]
+        for url in (f"/api/tickets/update/{ticket.pk}/", f"/api/tickets/{ticket.pk}/"):
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.data["sub_department_name"], "ICU")
+            self.assertEqual(response.data["priority_level_description"], "Level 3")
+
+
+class TicketCreateTests(TicketFixtureMixin, TestCase):
+    def test_create_requires_authentication_and_sets_owner(self):
+        client = APIClient()
+        payload = {"title": "Pump alarm", "issue": "Beeping", "sub_department": self.sub_departments[0].pk}
+        response = client.post("/api/tickets/create/", payload, format="json")
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(Ticket.objects.exists())
+
+        client.force_authenticate(self.user)
+        response = client.post("/api/tickets/create/", payload, format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Ticket.objects.get(pk=response.data["id"]).user_id, self.user.pk)
+
+
+class ReferenceCacheTests(TicketFixtureMixin, TestCase):
+    def test_resolves_from_memory_and_reloads_after_writes(self):
+        icu = self.sub_departments[0]
+        with self.assertNumQueries(0):
+            self.assertEqual(reference.sub_department(icu.pk).main_department.name, "Medical")
+            self.assertEqual(reference.sub_department(icu.pk).priority.level, 3)
+
+        version = reference.get_reference().version
+        icu.name = "Intensive Care"
+        icu.save()
+        self.assertGreater(reference.get_reference().version, version)
+        self.assertEqual(reference.sub_department(icu.pk).name, "Intensive Care")
+
+    def test_unknown_keys_do_not_flush_derived_caches(self):
+        reference.invalidate()  # drop what earlier tests' rolled-back writes left
+        version = reference.get_reference().version
+        with override_settings(TICKET_REFERENCE_MISS_INTERVAL=60):
+            reference._next_miss_reload = 0
+            with self.assertNumQueries(3):  # one reload...
+                self.assertIsNone(reference.sub_department(987654))
+            with self.assertNumQueries(0):  # ...then misses are throttled
+                self.assertIsNone(reference.sub_department(987655))
+        self.assertEqual(reference.get_reference().version, version)
+
+        # A row added behind the cache's back (another process, no signals)
+        # is found on the next allowed reload, and does move the version.
+        created = SubDepartment.objects.bulk_create([SubDepartment(
+            name="Radiology", main_department=self.sub_departments[0].main_department, priority=self.priorities[1],
+        )])[0]
+        reference._next_miss_reload = 0
+        self.assertEqual(reference.sub_department(created.pk).name, "Radiology")
+        self.assertGreater(reference.get_reference().version, version)
+
+    def test_new_ticket_defaults_to_sub_department_priority(self):
+        serializer = TicketSerializer(data={
+            "title": "Pump alarm", "issue": "Beeping", "sub_department": self.sub_departments[1].pk,
+        })
+        with self.assertNumQueries(0):
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertEqual(serializer.validated_data["PriorityLevel"], self.priorities[0])
+
+
+class TicketFragmentCacheTests(TicketFixtureMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        get_fragment_cache().clear()
+
+    def test_responses_match_serializer_and_reuse_fragments(self):
+        tickets = self.make_tickets(5)
+        expected = JSONRenderer().render(TicketSerializer(Ticket.objects.all(), many=True).data)
+        cache = get_fragment_cache()
+        self.assertEqual(self.client.get("/api/tickets/all/").content, expected)
+        self.assertEqual((cache.hits, cache.misses), (0, 5))
+        self.assertEqual(self.client.get("/api/tickets/all/").content, expected)
+        self.assertEqual((cache.hits, cache.misses), (5, 5))
+
+        ticket = Ticket.objects.get(pk=tickets[0].pk)
+        ticket.title = "Renamed"
+        ticket.save()
+        response = self.client.get(f"/api/tickets/{ticket.pk}/")
+        self.assertEqual(response.content, JSONRenderer().render(TicketSerializer(ticket).data))
+        self.assertEqual((cache.hits, cache.misses), (5, 6))
+
+        response = self.client.get("/api/tickets/all/?page_size=2")
+        self.assertEqual(len(response.data["results"]), 2)
+        self.assertIn("cursor=", response.data["next"])
+
+
+class FastSerializerCompatibilityTests(TicketFixtureMixin, TestCase):
+    """
+    The fast row serializer must produce exactly the bytes JSONRenderer does
+    for TicketSerializer, for any ticket content.
+    """
+
+    ALPHABET = "abcXYZ 019\"\\/\n\t\x00\x1f\u00e9\u4e2d\u2028\u2029\U0001f691<>&'"
+
+    def random_text(self, rng, longest):
+        return "".join(rng.choice(self.ALPHABET) for _ in range(rng.randint(0, longest)))
+
+    def test_matches_ticket_serializer_on_random_tickets(self):
+        rng = random.Random(20240611)
+        base = timezone.now()
+        tickets = []
+        for _ in range(200):
+            sub_department = rng.choice(self.sub_departments)
+            moment = base - timedelta(seconds=rng.randint(0, 10 ** 8),
+                                      microseconds=rng.choice([0, rng.randint(1, 999999)]))
+            tickets.append(Ticket(
+                user=self.user, first_name="Pat", last_name="Doe", email="pat@example.com",
+                title=self.random_text(rng, 40),
+                issue=self.random_text(rng, 400),
+                sub_department=sub_department,
+                PriorityLevel=rng.choice(self.priorities + [None]),
+                status=rng.choice(["open", "1", "2", "3", "archived", self.random_text(rng, 10)]),
+                created_at=moment,
+                updated_at=moment,
+            ))
+        Ticket.objects.bulk_create(tickets)
+
+        queryset = Ticket.objects.order_by("id")
+        for zone in ("UTC", "America/Chicago", "Asia/Kolkata"):
+            with timezone.override(zone):
+                expected = JSONRenderer().render(TicketSerializer(queryset, many=True).data)
+                for source in (list(ticket_rows(queryset)), list(queryset)):
+                    self.assertEqual(b"[" + b",".join(render_rows(source)) + b"]", expected)
+
+
+class TicketKeysetPaginationTests(TicketFixtureMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_walks_every_ticket_once_at_constant_cost(self):
+        created = self.make_tickets(7)
+        url = "/api/tickets/all/?page_size=3"
+        seen = []
+        while url:
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(ticket["id"] for ticket in response.data["results"])
+            url = response.data["next"]
+        self.assertEqual(seen, sorted((t.pk for t in created), reverse=True))
+
+    def test_filters(self):
+        self.make_tickets(4)
+        icu = self.sub_departments[0]
+        response = self.client.get(f"/api/tickets/all/?sub_department={icu.pk}&status=open")
+        self.assertEqual({t["sub_department"] for t in response.data}, {icu.pk})
+        self.assertEqual(len(response.data), 2)
+        response = self.client.get(f"/api/tickets/all/?main_department={icu.main_department_id}")
+        self.assertEqual(len(response.data), 2)
+        response = self.client.get("/api/tickets/all/?created_after=yesterday")
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/tickets/all/?cursor=bogus")
+        self.assertEqual(response.status_code, 404)
+
+
+class TicketChangeFeedTests(TicketFixtureMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_reports_upserts_and_tombstones_since_sequence(self):
+        kept, removed = [
+            Ticket.objects.create(
+                user=self.user, title=title, issue="x", sub_department=self.sub_departments[0],
+            )
+            for title in ("kept", "removed")
+        ]
+        head = self.client.get("/api/tickets/changes/").data["seq"]
+
+        kept.status = "2"
+        kept.save()
+        removed_pk = removed.pk
+        removed.delete()
+
+        response = self.client.get(f"/api/tickets/changes/?since={head}")
+        self.assertEqual([t["id"] for t in response.data["tickets"]], [kept.pk])
+        self.assertEqual(response.data["tickets"][0]["status"], "2")
+        self.assertEqual(response.data["deleted"], [removed_pk])
+
+        response = self.client.get(f"/api/tickets/changes/?since={response.data['seq']}")
+        self.assertEqual((response.data["tickets"], response.data["deleted"]), ([], []))
+
+    def test_holds_back_changes_behind_an_uncommitted_one(self):
+        for title in ("a", "b", "c"):
+            Ticket.objects.create(user=self.user, title=title, issue="x", sub_department=self.sub_departments[0])
+        first, pending, last = TicketChange.objects.order_by("id")
+        # As another process sees it while `pending` is still uncommitted.
+        pending.delete()
+
+        response = self.client.get(f"/api/tickets/changes/?since={first.id - 1}")
+        self.assertEqual((response.data["seq"], response.data["has_more"]), (first.id, False))
+        self.assertEqual(self.client.get("/api/tickets/changes/").data["seq"], first.id)
+
+        # A gap that stays open past the settle time was a rollback.
+        TicketChange.objects.filter(pk=last.pk).update(changed_at=timezone.now() - timedelta(minutes=5))
+        response = self.client.get(f"/api/tickets/changes/?since={first.id}")
+        self.assertEqual([ticket["id"] for ticket in response.data["tickets"]], [last.ticket_id])
+        self.assertEqual(self.client.get("/api/tickets/changes/").data["seq"], last.id)
+
+    def test_pruned_sequence_is_gone(self):
+        for _ in range(3):
+            Ticket.objects.create(user=self.user, title="t", issue="x", sub_department=self.sub_departments[0])
+        TicketChange.objects.filter(id__lt=TicketChange.objects.latest("id").id).delete()
+        first = TicketChange.objects.earliest("id").id
+        for since in (0, first - 2):
+            response = self.client.get(f"/api/tickets/changes/?since={since}")
+            self.assertEqual(response.status_code, 410)
+        response = self.client.get(f"/api/tickets/changes/?since={first - 1}")
+        self.assertEqual(response.status_code, 200)
+
+
+class FakeWebSocket:
+    """
+    The receive/send pair an ASGI server hands a WebSocket app: messages put
+    on `incoming` are received, sent ones are collected in `sent`.
+    """
+
+    def __init__(self):
+        self.incoming = asyncio.Queue()
+        self.sent = []
+        self.incoming.put_nowait({"type": "websocket.connect"})
+
+    async def receive(self):
+        return await self.incoming.get()
+
+    async def send(self, message):
+        self.sent.append(message)
+
+
+class TicketRealtimeTests(TicketFixtureMixin, TestCase):
+    def setUp(self):
+        self.token = str(MyTokenObtainPairSerializer.get_token(self.user).access_token)
+
+    def save_ticket(self, status="1"):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Ticket.objects.create(
+                user=self.user, title="Pump alarm", issue="x", sub_department=self.sub_departments[0], status=status,
+            )
+
+    async def wait_for(self, condition):
+        for _ in range(100):
+            if condition():
+                return
+            await asyncio.sleep(0.01)
+        self.fail("condition not met")
+
+    async def test_stream_rejects_missing_or_invalid_token(self):
+        for params in ("", "?token=not-a-token"):
+            response = await realtime.ticket_event_stream(RequestFactory().get(f"/api/tickets/events/{params}"))
+            self.assertEqual(response.status_code, 401)
+        self.assertEqual(events.get_broker().subscriber_count(), 0)
+
+    async def test_stream_delivers_saved_tickets_matching_filters(self):
+        request = RequestFactory().get("/api/tickets/events/?status=2", HTTP_AUTHORIZATION=f"Bearer {self.token}")
+        response = await realtime.ticket_event_stream(request)
+        self.assertEqual(response.status_code, 200)
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b"retry: 5000\n\n")
+
+        await sync_to_async(self.save_ticket)(status="1")
+        ticket = await sync_to_async(self.save_ticket)(status="2")
+        chunk = (await asyncio.wait_for(anext(stream), 1)).decode()
+        self.assertTrue(chunk.startswith("id: "))
+        event = json.loads(chunk.split("data: ", 1)[1])
+        self.assertEqual((event["type"], event["id"], event["ticket"]["title"]), ("created", ticket.pk, "Pump alarm"))
+
+        # A client disconnecting cancels the task streaming the response.
+        pending = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        pending.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await pending
+        self.assertEqual(events.get_broker().subscriber_count(), 0)
+
+    async def test_websocket_rejects_invalid_token(self):
+        socket = FakeWebSocket()
+        scope = {"type": "websocket", "path": "/ws/tickets/", "query_string": b"token=not-a-token", "headers": []}
+        await asgi.application(scope, socket.receive, socket.send)
+        self.assertEqual(socket.sent, [{"type": "websocket.close", "code": 4001}])
+
+        socket = FakeWebSocket()
+        await asgi.application(dict(scope, path="/ws/elsewhere/"), socket.receive, socket.send)
+        self.assertEqual(socket.sent, [{"type": "websocket.close", "code": 4404}])
+
+    async def test_websocket_delivers_saved_tickets_matching_filters(self):
+        socket = FakeWebSocket()
+        scope = {"type": "websocket", "path": "/ws/tickets/", "query_string": b"status=2",
+                 "headers": [(b"authorization", f"Bearer {self.token}".encode())]}
+        connection = asyncio.ensure_future(asgi.application(scope, socket.receive, socket.send))
+        await self.wait_for(lambda: events.get_broker().subscriber_count() == 1)
+        self.assertEqual(socket.sent, [{"type": "websocket.accept"}])
+
+        await sync_to_async(self.save_ticket)(status="1")
+        ticket = await sync_to_async(self.save_ticket)(status="2")
+        await self.wait_for(lambda: len(socket.sent) > 1)
+        self.assertEqual(len(socket.sent), 2)
+        event = json.loads(socket.sent[1]["text"])
+        self.assertEqual((event["type"], event["id"], event["status"]), ("created", ticket.pk, "2"))
+
+        socket.incoming.put_nowait({"type": "websocket.disconnect"})
+        await asyncio.wait_for(connection, 1)
+        self.assertEqual(events.get_broker().subscriber_count(), 0)
+
+    def test_no_events_are_built_without_subscribers(self):
+        self.assertEqual(events.get_broker().subscriber_count(), 0)
+        with mock.patch("tickets.signals.TicketSerializer") as serializer, \
+                mock.patch("tickets.signals.publish_on_commit") as publish:
+            ticket = self.save_ticket()
+            ticket.status = "2"
+            ticket.save()
+            ticket.delete()
+        serializer.assert_not_called()
+        publish.assert_not_called()
+
+
+class EscalationSchedulerTests(TicketFixtureMixin, TestCase):
+    def test_due_tickets_advance_in_batches(self):
+        icu, pharmacy = self.sub_departments
+        urgent = Ticket.objects.create(user=self.user, title="a", issue="x", sub_department=icu)
+        routine = Ticket.objects.create(user=self.user, title="b", issue="x", sub_department=pharmacy)
+        self.assertLess(urgent.escalation_due_at, routine.escalation_due_at)
+
+        scheduler = EscalationScheduler(horizon=60, batch_size=10)
+        self.assertEqual(scheduler.tick(urgent.escalation_due_at - timedelta(seconds=1)), 0)
+        self.assertEqual(scheduler.tick(urgent.escalation_due_at + timedelta(seconds=1)), 1)
+
+        urgent.refresh_from_db()
+        routine.refresh_from_db()
+        self.assertEqual((urgent.status, routine.status), ("2", "open"))
+        self.assertGreater(urgent.escalation_due_at, urgent.updated_at)
+        self.assertEqual(TicketChange.objects.filter(ticket_id=urgent.pk).last().operation, "updated")
+
+    def test_archived_tickets_have_no_deadline(self):
+        ticket = Ticket.objects.create(
+            user=self.user, title="a", issue="x", sub_department=self.sub_departments[0], status="archived",
+        )
+        self.assertIsNone(ticket.escalation_due_at)
+
+
+class TicketCounterTests(TicketFixtureMixin, TestCase):
+    def test_counters_follow_writes_and_reconcile(self):
+        icu = self.sub_departments[0]
+        ticket = Ticket.objects.create(
+            user=self.user, title="a", issue="x", sub_department=icu, PriorityLevel=icu.priority,
+        )
+        Ticket.objects.create(user=self.user, title="b", issue="x", sub_department=icu)
+        ticket = Ticket.objects.get(pk=ticket.pk)
+        ticket.status = "2"
+        ticket.save()
+        ticket.save()
+
+        self.assertEqual(counters.stored_counts(), counters.actual_counts())
+        response = APIClient().get("/api/tickets/stats/?group_by=status")
+        self.assertEqual(response.data["buckets"], [{"status": "2", "count": 1}, {"status": "open", "count": 1}])
+
+        ticket.delete()
+        Ticket.objects.update(status="3")  # bypasses the signals
+        self.assertEqual(counters.reconcile(), {("open", icu.pk, 0): 1, ("3", icu.pk, 0): -1})
+        self.assertEqual(counters.reconcile(), {})
+
+
+class TicketSearchTests(TicketFixtureMixin, TestCase):
+    def test_ranked_search_with_facets_and_paging(self):
+        icu, pharmacy = self.sub_departments
+        for title, issue, sub_department in (
+            ("Monitor offline", "Bedside monitor offline in bay 4", icu),
+            ("Printer jam", "Label printer offline again", pharmacy),
+            ("Network", "Wifi drops; monitor dashboards offline", icu),
+            ("Badge reader", "Door badge reader broken", pharmacy),
+        ):
+            Ticket.objects.create(user=self.user, title=title, issue=issue, sub_department=sub_department)
+
+        client = APIClient()
+        response = client.get("/api/tickets/search/?q=offline+monitor")
+        self.assertEqual([t["title"] for t in response.data["results"]], ["Monitor offline", "Network"])
+        self.assertEqual(response.data["facets"]["sub_department"], {icu.pk: 2})
+
+        response = client.get("/api/tickets/search/?q=offline&page_size=2")
+        self.assertEqual(response.data["count"], 3)
+        first_page = [t["id"] for t in response.data["results"]]
+        response = client.get(response.data["next"])
+        self.assertEqual(len(set(first_page + [t["id"] for t in response.data["results"]])), 3)
+        self.assertIsNone(response.data["next"])
+
+        ticket = Ticket.objects.get(title="Badge reader")
+        ticket.issue = "Door badge reader offline"
+        ticket.save()
+        response = client.get(f"/api/tickets/search/?q=offline&sub_department={pharmacy.pk}")
+        self.assertEqual(response.data["count"], 2)
+
+    def test_work_is_capped_for_common_terms(self):
+        icu = self.sub_departments[0]
+        for issue in ("Monitor offline", "Monitor offline, monitor dead", "Printer offline", "Pump offline"):
+            Ticket.objects.create(user=self.user, title="Fault", issue=issue, sub_department=icu)
+
+        result = search_tickets("offline monitor", facets=False)
+        self.assertEqual((result.total, result.truncated), (2, False))
+        self.assertEqual(result.facets, {})
+
+        with override_settings(TICKET_SEARCH_MAX_CANDIDATES=2):
+            # df, documents, cut-off posting, page, facets.
+            with self.assertNumQueries(5):
+                result = search_tickets("offline")
+            self.assertTrue(result.truncated)
+            self.assertEqual(result.total, 2)
+            self.assertEqual(sum(result.facets["sub_department"].values()), 2)
+            monitor = search_tickets("offline monitor")
+            self.assertEqual((monitor.total, monitor.truncated), (2, False))
+
+
+class BulkTicketTests(TicketFixtureMixin, TestCase):
+    def test_bulk_create_update_delete(self):
+        icu, pharmacy = self.sub_departments
+        existing, doomed = self.make_tickets(2)
+        counters.reconcile()  # make_tickets bypasses the write hooks
+        client = APIClient()
+        client.force_authenticate(self.user)
+        payload = {
+            "create": [
+                {"title": "Pump alarm", "issue": "Infusion pump alarm", "sub_department": icu.pk},
+                {"title": "Bad", "issue": "x", "sub_department": 999},
+            ] + [{"title": f"t{i}", "issue": "x", "sub_department": pharmacy.pk} for i in range(20)],
+            "update": [{"id": existing.pk, "status": "2", "issue": "Monitor replaced"}, {"id": 999}],
+            "delete": [doomed.pk, 12345],
+        }
+        response = client.post("/api/tickets/bulk/", payload, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([r["status"] for r in response.data["create"][:3]], [201, 400, 201])
+        self.assertEqual(response.data["create"][0]["ticket"]["sub_department_name"], "ICU")
+        self.assertEqual([r["status"] for r in response.data["update"]], [200, 404])
+        self.assertEqual(response.data["delete"], [{"id": doomed.pk, "status": 204}, {"id": 12345, "status": 404}])
+
+        existing.refresh_from_db()
+        self.assertEqual((existing.status, existing.issue), ("2", "Monitor replaced"))
+        self.assertFalse(Ticket.objects.filter(pk=doomed.pk).exists())
+        self.assertEqual(Ticket.objects.count(), 22)
+        self.assertEqual(counters.reconcile(), {})
+        self.assertEqual(TicketChange.objects.filter(operation="created").count(), 21)
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        query_counts = []
+        # The first batch also creates the counter rows; compare the later two.
+        for size in (5, 5, 50):
+            payload = {"create": [
+                {"title": f"t{i}", "issue": "x", "sub_department": self.sub_departments[i % 2].pk}
+                for i in range(size)
+            ]}
+            with CaptureQueriesContext(connection) as queries:
+                response = client.post("/api/tickets/bulk/", payload, format="json")
+            self.assertEqual(len(response.data["create"]), size)
+            query_counts.append(len(queries))
+        self.assertEqual(query_counts[1], query_counts[2])
+
+    def test_backend_without_bulk_insert_returning(self):
+        # MySQL does not return primary keys from a multi-row INSERT.
+        client = APIClient()
+        client.force_authenticate(self.user)
+        payload = {"create": [{"title": f"t{i}", "issue": "x", "sub_department": self.sub_departments[0].pk}
+                              for i in range(3)]}
+        with mock.patch.object(type(connection.features), "can_return_rows_from_bulk_insert", False):
+            response = client.post("/api/tickets/bulk/", payload, format="json")
+        ids = [result["ticket"]["id"] for result in response.data["create"]]
+        self.assertEqual(sorted(ids), sorted(Ticket.objects.values_list("id", flat=True)))
+        changes = TicketChange.objects.filter(operation=TicketChange.CREATED)
+        self.assertEqual(sorted(changes.values_list("ticket_id", flat=True)), sorted(ids))
+        self.assertEqual(counters.reconcile(), {})
+
+
+class TicketImportTests(TicketFixtureMixin, TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        self.csv_path = os.path.join(directory, "tickets.csv")
+        self.ndjson_path = os.path.join(directory, "tickets.ndjson")
+
+    def write_csv(self, rows):
+        with open(self.csv_path, "w", newline="") as target:
+            writer = csv.DictWriter(target, ["title", "issue", "sub_department", "priority", "user", "created_at"])
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def test_imports_csv_keeping_historical_timestamps(self):
+        self.write_csv([
+            {"title": "Pump alarm", "issue": "x", "sub_department": "icu", "priority": "Level 1 (Lowest)",
+             "user": "nurse", "created_at": "2020-03-01T08:30:00+00:00"},
+            {"title": "Fridge warm", "issue": "x", "sub_department": str(self.sub_departments[1].pk)},
+            {"title": "Nowhere", "issue": "x", "sub_department": "Morgue", "user": "nurse"},
+        ])
+        stdout, stderr = io.StringIO(), io.StringIO()
+        call_command("import_tickets", self.csv_path, user="nurse", stdout=stdout, stderr=stderr)
+        self.assertIn("Imported 2 ticket(s), skipped 1", stdout.getvalue())
+        self.assertIn("Row 3: unknown sub_department 'Morgue'", stderr.getvalue())
+
+        pump = Ticket.objects.get(title="Pump alarm")
+        moment = datetime(2020, 3, 1, 8, 30, tzinfo=dt_timezone.utc)
+        self.assertEqual((pump.created_at, pump.updated_at), (moment, moment))
+        self.assertEqual((pump.sub_department, pump.PriorityLevel), (self.sub_departments[0], self.priorities[0]))
+        fridge = Ticket.objects.get(title="Fridge warm")
+        self.assertEqual(fridge.PriorityLevel, self.sub_departments[1].priority)
+        self.assertEqual(TicketChange.objects.filter(operation=TicketChange.CREATED).count(), 2)
+
+        # Ordinary saves still stamp updated_at, and only ordinary saves.
+        pump.save()
+        self.assertGreater(pump.updated_at, moment)
+        self.assertEqual(Ticket.objects.get(pk=pump.pk).created_at, moment)
+        created = Ticket.objects.create(user=self.user, title="t", issue="x", sub_department=self.sub_departments[0],
+                                        created_at=moment, updated_at=moment)
+        self.assertEqual(created.updated_at, moment)
+
+    def test_malformed_ndjson_lines_are_skipped(self):
+        with open(self.ndjson_path, "w") as target:
+            target.write(json.dumps({"title": "First", "issue": "x", "sub_department": "ICU"}) + "\n")
+            target.write('{"title": "Broken", \n')
+            target.write("[1, 2]\n\n")
+            target.write(json.dumps({"title": "Last", "issue": "x", "sub_department": "Pharmacy"}) + "\n")
+        stderr = io.StringIO()
+        call_command("import_tickets", self.ndjson_path, user="nurse", stdout=io.StringIO(), stderr=stderr)
+        self.assertEqual(sorted(Ticket.objects.values_list("title", flat=True)), ["First", "Last"])
+        self.assertIn("Row 2: invalid JSON", stderr.getvalue())
+        self.assertIn("Row 3: expected a JSON object", stderr.getvalue())
+        self.assertEqual(TicketImportCheckpoint.objects.get(source=self.ndjson_path).rows_done, 4)
+
+    def test_bad_cells_skip_only_their_row(self):
+        rows = [
+            {"title": "Bad month", "issue": "x", "sub_department": "ICU", "created_at": "2020-13-45T00:00:00"},
+            {"title": "Number date", "issue": "x", "sub_department": "ICU", "updated_at": 5},
+            {"title": "List user", "issue": "x", "sub_department": "ICU", "user": ["a"]},
+            {"title": "Object user", "issue": "x", "sub_department": "ICU", "user": {"a": 1}},
+            {"title": "Good", "issue": "x", "sub_department": "ICU", "user": "nurse"},
+        ]
+        with open(self.ndjson_path, "w") as target:
+            target.writelines(json.dumps(row) + "\n" for row in rows)
+        stderr = io.StringIO()
+        call_command("import_tickets", self.ndjson_path, user="nurse", stdout=io.StringIO(), stderr=stderr)
+        self.assertEqual(list(Ticket.objects.values_list("title", flat=True)), ["Good"])
+        self.assertIn("Row 1: invalid created_at '2020-13-45T00:00:00'", stderr.getvalue())
+        self.assertIn("Row 2: invalid updated_at 5", stderr.getvalue())
+        self.assertIn("Row 3: invalid user ['a']", stderr.getvalue())
+        self.assertIn("Row 4: invalid user {'a': 1}", stderr.getvalue())
+
+    def test_resumes_after_last_committed_batch(self):
+        self.write_csv([{"title": f"Ticket {i}", "issue": "x", "sub_department": "ICU"} for i in range(5)])
+
+        def crash_after(rows, count):
+            for number, row in enumerate(rows):
+                if number == count:
+                    raise RuntimeError("killed")
+                yield row
+
+        importer = TicketImporter(self.csv_path, batch_size=2, default_user=self.user)
+        with self.assertRaises(RuntimeError):
+            importer.run(crash_after(read_rows(self.csv_path, "csv"), 3))
+        self.assertEqual(Ticket.objects.count(), 2)
+        self.assertEqual(TicketImportCheckpoint.objects.get(source=self.csv_path).rows_done, 2)
+
+        stdout = io.StringIO()
+        call_command("import_tickets", self.csv_path, user="nurse", batch_size=2, stdout=stdout)
+        self.assertIn("Resuming after row 2.", stdout.getvalue())
+        self.assertEqual(sorted(Ticket.objects.values_list("title", flat=True)),
+                         [f"Ticket {i}" for i in range(5)])
+
+        call_command("import_tickets", self.csv_path, user="nurse", restart=True, no_hooks=True, stdout=io.StringIO())
+        self.assertEqual(Ticket.objects.count(), 10)
+
+
+class TicketExportTests(TicketFixtureMixin, TestCase):
+    def test_exports_match_list_api(self):
+        self.make_tickets(3)
+        client = APIClient()
+        listed = client.get("/api/tickets/all/?status=open").data
+
+        response = client.get("/api/tickets/export.ndjson?status=open")
+        exported = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        for row in exported:
+            row.pop("updated_at")
+        self.assertEqual(sorted(exported, key=lambda r: r["id"]), sorted(listed, key=lambda r: r["id"]))
+
+        response = client.get("/api/tickets/export.csv")
+        rows = list(csv.reader(io.StringIO(b"".join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][:3], ["id", "title", "issue"])
+        self.assertEqual(len(rows), 4)
+        self.assertEqual(client.get("/api/tickets/export.xml").status_code, 404)
+
+    async def test_streams_asynchronously_under_asgi(self):
+        await sync_to_async(self.make_tickets)(3)
+        token = MyTokenObtainPairSerializer.get_token(self.user).access_token
+        contents = {}
+        for url in ("/api/tickets/export.ndjson", "/api/tickets/workorders.pdf"):
+            response = await AsyncClient().get(url, headers={"Authorization": f"Bearer {token}"})
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.is_async)
+            contents[url] = b"".join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(contents["/api/tickets/export.ndjson"].splitlines()), 3)
+        self.assertTrue(contents["/api/tickets/workorders.pdf"].endswith(b"%%EOF\n"))
+
+
+class WorkOrderTests(TicketFixtureMixin, TestCase):
+    def test_renders_ticket_work_orders(self):
+        ticket = self.make_tickets(1)[0]
+        ticket.issue = "Monitor offline " * 40
+        data = workorders.workorder_data(ticket)
+        self.assertEqual((data["department"], data["sub_department"]), ("Medical", "ICU"))
+        self.assertEqual(data["priority"], "Level 3 (Highest)")
+
+        lines = workorders.wrap_text(data["issue_description"], 465, 3)
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[-1].endswith("…"))
+
+        with tempfile.TemporaryDirectory() as output_dir:
+            count, _ = workorders.render_batch([data], output_dir, workers=1)
+            self.assertEqual(count, 1)
+            with Image.open(os.path.join(output_dir, workorders.workorder_filename(data))) as image:
+                self.assertEqual(image.size, workorders.load_template().size)
+
+
+class WorkOrderEndpointTests(TicketFixtureMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, True)
+        workorder_store._store = workorder_store.WorkOrderStore(self.cache_dir, 10 * 1024 * 1024)
+        self.addCleanup(setattr, workorder_store, "_store", None)
+
+    def test_renders_once_and_follows_ticket_changes(self):
+        ticket = self.make_tickets(1)[0]
+        url = f"/api/tickets/{ticket.pk}/workorder/"
+        response = self.client.get(url)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"\x89PNG"))
+        etag = response["ETag"]
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        ticket.issue = "Monitor replaced"
+        ticket.save()
+        self.assertNotEqual(self.client.get(url)["ETag"], etag)
+        self.assertEqual(self.client.get("/api/tickets/999999/workorder/").status_code, 404)
+
+    def test_evicts_least_recently_used(self):
+        tickets = self.make_tickets(3)
+        store = workorder_store.WorkOrderStore(self.cache_dir, 1)
+        for ticket in tickets:
+            store.get(ticket)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 0)
+
+    def test_batch_zip_and_pdf(self):
+        self.make_tickets(4)
+        self.assertEqual(self.client.get("/api/tickets/workorders.pdf").status_code, 401)
+        self.client.force_authenticate(self.user)
+        response = self.client.get("/api/tickets/workorders.zip?sub_department=%d" % self.sub_departments[0].pk)
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+        self.assertEqual(len(archive.namelist()), 2)
+        self.assertTrue(archive.read(archive.namelist()[0]).startswith(b"\x89PNG"))
+
+        pdf = b"".join(self.client.get("/api/tickets/workorders.pdf").streaming_content)
+        self.assertTrue(pdf.startswith(b"%PDF-1.4"))
+        self.assertIn(b"/Count 4", pdf)
+        self.assertTrue(pdf.rstrip().endswith(b"%%EOF"))
+        self.assertEqual(self.client.get("/api/tickets/workorders.tiff").status_code, 404)
+
+    def test_large_batches_are_rendered_by_a_job(self):
+        self.make_tickets(4)
+        batch_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, batch_dir, True)
+        self.client.force_authenticate(self.user)
+        with self.settings(TICKET_WORKORDER_INLINE_BATCH=2, TICKET_WORKORDER_BATCH_DIR=batch_dir):
+            response = self.client.get("/api/tickets/workorders.pdf")
+            self.assertEqual(response.status_code, 202)
+            url = response.data["url"]
+            self.assertEqual(self.client.get(url).status_code, 202)
+
+            other = APIClient()
+            other.force_authenticate(User.objects.create(username="porter"))
+            self.assertEqual(other.get(url).status_code, 404)
+
+            JobWorker().run_until_empty()
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pdf = b"".join(response.streaming_content)
+            self.assertTrue(pdf.startswith(b"%PDF-1.4"))
+            self.assertIn(b"/Count 4", pdf)
+
+    def test_template_changes_are_picked_up(self):
+        template = os.path.join(self.cache_dir, "template.png")
+        shutil.copy(workorders.TEMPLATE_PATH, template)
+        before = workorders.template_hash(template)
+        self.assertEqual(workorders.template_hash(template), before)
+        with Image.open(template) as image:
+            image.convert("L").resize((300, 400)).save(template)
+        stat = os.stat(template)
+        os.utime(template, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assertNotEqual(workorders.template_hash(template), before)
+        self.assertEqual(workorders.load_template(template).size, (300, 400))
+
+
+class TicketImageDerivativeTests(TicketFixtureMixin, TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, True)
+        override = self.settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def photo(self, name="photo.jpg", size=(2400, 1600)):
+        buffer = io.BytesIO()
+        Image.new("RGB", size, "teal").save(buffer, "JPEG")
+        return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/jpeg")
+
+    def test_derivatives_generated_on_save(self):
+        ticket = self.make_tickets(1)[0]
+        ticket.image = self.photo()
+        ticket.save()
+        job = Job.objects.get(name="tickets.image_derivatives")
+        self.assertEqual(job.payload, {"ticket_id": ticket.pk, "image": ticket.image.name})
+        JobWorker().run_until_empty()
+        ticket.refresh_from_db()
+        with Image.open(ticket.image_thumbnail) as thumbnail:
+            self.assertEqual(thumbnail.size, (128, 85))
+        with Image.open(ticket.image_preview) as preview:
+            self.assertEqual(preview.size, (800, 533))
+
+        data = TicketSerializer(ticket).data
+        self.assertEqual(data["image_thumbnail"], ticket.image_thumbnail.url)
+        self.assertTrue(data["image_preview"].startswith("/media/tickets/previews/"))
+
+        storage = Ticket._meta.get_field("image").storage
+        old = (ticket.image_thumbnail.name, ticket.image_preview.name)
+        ticket.image = None
+        with self.captureOnCommitCallbacks(execute=True):
+            ticket.save()
+        self.assertIsNone(TicketSerializer(ticket).data["image_thumbnail"])
+        self.assertFalse(any(storage.exists(name) for name in old))
+
+    def test_shared_derivatives_are_kept(self):
+        first, second = self.make_tickets(2)
+        first.image = self.photo()
+        first.save()
+        JobWorker().run_until_empty()
+        first.refresh_from_db()
+        Ticket.objects.filter(pk=second.pk).update(image=first.image.name, image_thumbnail=first.image_thumbnail.name)
+
+        preview = first.image_preview.name
+        first.image = self.photo("replacement.jpg")
+        with self.captureOnCommitCallbacks(execute=True):
+            first.save()
+        storage = Ticket._meta.get_field("image").storage
+        self.assertTrue(storage.exists(Ticket.objects.get(pk=second.pk).image_thumbnail.name))
+        self.assertFalse(storage.exists(preview))
+
+    def test_backfill_command(self):
+        tickets = self.make_tickets(2)
+        stored = Ticket._meta.get_field("image").storage.save("tickets/old.png", self.photo())
+        Ticket.objects.filter(pk=tickets[0].pk).update(image=stored)
+        call_command("generate_ticket_thumbnails", workers=1, stdout=io.StringIO())
+        refreshed = Ticket.objects.get(pk=tickets[0].pk)
+        self.assertTrue(refreshed.image_thumbnail.name.startswith("tickets/thumbnails/old"))
+        self.assertFalse(Ticket.objects.get(pk=tickets[1].pk).image_thumbnail)
+
+
+class JobQueueTests(TicketFixtureMixin, TestCase):
+    def setUp(self):
+        self.calls = []
+        for name, func in (("tests.record", self.calls.append), ("tests.fail", self.fail_job)):
+            jobs.task(name)(lambda func=func, **payload: func(payload))
+            self.addCleanup(jobs.REGISTRY.pop, name)
+
+    def fail_job(self, payload):
+        raise RuntimeError("printer on fire")
+
+    def test_claims_level_3_departments_first(self):
+        icu, pharmacy = self.make_tickets(2)  # Level 3 and Level 1
+        jobs.enqueue_for_ticket("tests.record", pharmacy, {"ticket": pharmacy.pk})
+        jobs.enqueue_for_ticket("tests.record", icu, {"ticket": icu.pk})
+        jobs.enqueue("tests.record", {"ticket": None}, delay=60)
+
+        first = jobs.claim("worker-1")
+        self.assertEqual([job.payload for job in first], [{"ticket": icu.pk}])
+        self.assertEqual((first[0].status, first[0].attempts, first[0].locked_by), (Job.RUNNING, 1, "worker-1"))
+        # A second worker never gets a job that is already claimed, nor one not yet due.
+        self.assertEqual([job.payload for job in jobs.claim("worker-2", limit=5)], [{"ticket": pharmacy.pk}])
+        self.assertEqual(jobs.claim("worker-3"), [])
+
+        with self.assertRaises(ValueError):
+            jobs.enqueue("tests.unknown")
+
+    def test_retries_with_backoff_then_fails(self):
+        job = jobs.enqueue("tests.fail", max_attempts=2)
+        worker = JobWorker(name="worker-1")
+        self.assertEqual(worker.run_until_empty(), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn("printer on fire", job.last_error)
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=4))
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        worker.run_until_empty()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, worker.failed), (Job.FAILED, 2, 2))
+
+    def test_stale_jobs_requeued_and_stats(self):
+        jobs.enqueue("tests.record", {"n": 1})
+        lost, = jobs.claim("dead-worker")
+        Job.objects.filter(pk=lost.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.requeue_stale(timeout=60), 1)
+
+        jobs.enqueue("tests.record", {"n": 2})
+        JobWorker().run_until_empty()
+        self.assertEqual(sorted(call["n"] for call in self.calls), [1, 2])
+
+        stats = self.client.get("/api/tickets/jobs/stats/").json()
+        self.assertEqual((stats["queued"], stats["done"]), (0, 2))
+        self.assertEqual(stats["jobs"]["tests.record"]["done"], 2)
+        self.assertIsNotNone(stats["jobs"]["tests.record"]["latency_p95"])
+
+
+    def test_heartbeat_keeps_long_jobs_claimed(self):
+        jobs.enqueue("tests.record", {"n": 1})
+        running, = jobs.claim("busy-worker")
+        Job.objects.filter(pk=running.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(jobs.heartbeat("busy-worker"), 1)
+        self.assertEqual(jobs.requeue_stale(timeout=60), 0)
+        self.assertEqual(Job.objects.get(pk=running.pk).status, Job.RUNNING)
+
+        # The worker beats from a thread while a job runs.
+        beaten = threading.Event()
+        jobs.task("tests.slow")(lambda **payload: self.calls.append(beaten.wait(5)))
+        self.addCleanup(jobs.REGISTRY.pop, "tests.slow")
+        jobs.enqueue("tests.slow")
+        worker = JobWorker(name="worker-1")
+        worker.heartbeat_interval = 0.01
+        with mock.patch.object(jobs, "heartbeat", side_effect=lambda name: beaten.set()) as beat:
+            worker.run_until_empty()
+        self.assertEqual(self.calls, [True])
+        beat.assert_called_with("worker-1")
+
+
+class LoadDataGeneratorTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, True)
+        override = self.settings(MEDIA_ROOT=media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def generate(self, **options):
+        end = datetime(2026, 6, 1, tzinfo=dt_timezone.utc)
+        inserted, _ = loadgen.generate(400, users=30, months=3, seed=7, end=end, image_ratio=0.2, batch_size=150,
+                                       **options)
+        self.assertEqual(inserted, 400)
+        return list(Ticket.objects.order_by("id").values_list(
+            "user__username", "sub_department__name", "title", "issue", "status",
+            "created_at", "updated_at", "image", "image_thumbnail",
+        ))
+
+    def test_keeps_sub_departments_loaded_under_other_departments(self):
+        elsewhere = MainDepartment.objects.create(name="Clinical")
+        neurology = SubDepartment.objects.create(name="Neurology", main_department=elsewhere)
+        sub_departments = loadgen.ensure_reference_data()
+        self.assertIn(neurology, sub_departments)
+        self.assertEqual(SubDepartment.objects.get(name="Neurology").main_department, elsewhere)
+
+    def test_same_seed_same_tickets(self):
+        first = self.generate()
+        Ticket.objects.all().delete()
+        self.assertEqual(self.generate(), first)
+        Ticket.objects.all().delete()
+        self.assertEqual(self.generate(run_hooks=True), first)
+
+        start = datetime(2026, 3, 2, tzinfo=dt_timezone.utc)
+        self.assertTrue(all(start <= row[5] < row[6] + timedelta(seconds=1) for row in first))
+        self.assertGreater(len({row[0] for row in first}), 15)
+        self.assertEqual({row[4] for row in first}, {"open", "1", "2", "3", "archived"})
+        with_images = [row for row in first if row[7]]
+        self.assertTrue(40 < len(with_images) < 120)
+        self.assertTrue(all(row[8].startswith("tickets/thumbnails/loadgen_") for row in with_images))
+
+
+@override_settings(PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"])
+class ApiBenchmarkTests(TestCase):
+    def test_run_and_compare(self):
+        results = benchmarks.run(scales=[60], requests=3, max_seconds=0)
+        self.assertEqual(results["scales"]["60"]["tickets"], 60)
+        cases = results["scales"]["60"]["cases"]
+        self.assertEqual(set(cases), {"get_all_tickets", "get_all_tickets_page", "user_tickets", "create_ticket",
+                                      "update_ticket", "delete_ticket", "login", "register"})
+        self.assertEqual(cases["get_all_tickets"]["queries"], 1)
+        self.assertEqual(cases["login"]["samples"], 3)
+        self.assertEqual(Ticket.objects.count(), 60)  # what create_ticket added, delete_ticket removed
+        json.dumps(results)
+
+        self.assertEqual(benchmarks.compare(results, results), [])
+        slower = json.loads(json.dumps(results))
+        slower["scales"]["60"]["cases"]["get_all_tickets"]["p95"] += 0.5
+        slower["scales"]["60"]["cases"]["create_ticket"]["queries"] += 1
+        regressions = benchmarks.compare(results, slower)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith("60 get_all_tickets: p95"))
+
+
+class SQLInstrumentationTests(TicketFixtureMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        instrumentation.get_route_table().reset()
+
+    def test_server_timing_and_route_table(self):
+        ticket = self.make_tickets(2)[0]
+        self.client.get("/api/tickets/all/")
+        response = self.client.get("/api/tickets/all/")
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="1 queries", app;dur=[\d.]+$')
+        # Async views' queries run in another thread and are counted too.
+        response = self.client.post("/api/auth/login/", {"username": "nobody", "password": "x"}, format="json")
+        self.assertIn('desc="1 queries"', response["Server-Timing"])
+
+        with override_settings(SQL_EXPLAIN_THRESHOLD_MS=0):
+            self.client.get(f"/api/tickets/{ticket.pk}/")
+        rows = {(row["route"], row["method"]): row for row in instrumentation.get_route_table().rows()}
+        self.assertEqual((rows["api/tickets/all/", "GET"]["requests"], rows["api/tickets/all/", "GET"]["queries"]),
+                         (2, 2))
+        detail = rows["api/tickets/<int:pk>/", "GET"]["slowest"][0]
+        self.assertIn('WHERE "tickets_ticket"."id" = ? LIMIT ?', detail["sql"])
+        self.assertTrue(detail["plan"])
+
+        self.assertEqual(self.client.get("/api/sql-stats/").status_code, 401)
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+        # Three routes, plus the refused request to this one.
+        self.assertEqual(len(self.client.get("/api/sql-stats/").data), 4)
+
+    def test_normalize(self):
+        self.assertEqual(
+            instrumentation.normalize("SELECT  \"t1\".\"id\" FROM t1 WHERE id IN (%s, %s,%s) AND name = 'it''s'\n"
+                                      "AND score > -1.5 LIMIT 21"),
+            'SELECT "t1"."id" FROM t1 WHERE id IN (...) AND name = ? AND score > ? LIMIT ?',
+        )
+        self.assertEqual(instrumentation.normalize("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)"),
+                         "INSERT INTO t (a, b) VALUES (...)")
+
+
+def _record_in_child():
+    metrics.inc("http_requests_total", {"route": "api/tickets/all/", "method": "GET", "status": "200"}, 5)
+    metrics.inc("http_requests_in_progress", {})  # exits mid-request
+
+
+class MetricsTests(TicketFixtureMixin, TestCase):
+    def setUp(self):
+        metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, metrics_dir, True)
+        override = self.settings(METRICS_DIR=metrics_dir)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client = APIClient()
+
+    def test_requests_and_app_gauges(self):
+        self.make_tickets(3)
+        counters.reconcile()
+        self.client.get("/api/tickets/all/")
+        self.client.get("/api/tickets/all/?status=open")
+        self.client.get("/api/tickets/999999/")
+
+        response = self.client.get("/metrics")
+        self.assertEqual(response["Content-Type"], metrics.CONTENT_TYPE)
+        body = response.content.decode()
+        self.assertIn('http_requests_total{method="GET",route="api/tickets/all/",status="200"} 2\n', body)
+        self.assertIn('http_requests_total{method="GET",route="api/tickets/<int:pk>/",status="404"} 1\n', body)
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="api/tickets/all/"} 2\n', body)
+        self.assertIn('http_response_size_bytes_bucket{method="GET",route="api/tickets/all/",le="+Inf"} 2\n', body)
+        self.assertIn("http_requests_in_progress 1\n", body)  # this request
+        # Two tickets land in ICU (level 3) and one in Pharmacy (level 1).
+        self.assertIn('tickets_open{priority="3"} 2\n', body)
+        self.assertIn('tickets_open{priority="1"} 1\n', body)
+        self.assertIn('jobs{status="queued"} 0\n', body)
+
+    def test_unknown_methods_share_a_label(self):
+        self.client.generic("FOO", "/api/tickets/all/")
+        self.client.generic("BAR", "/api/tickets/all/")
+
+        body = self.client.get("/metrics").content.decode()
+        self.assertIn('http_requests_total{method="other",route="api/tickets/all/",status="405"} 2\n', body)
+        self.assertNotIn('method="FOO"', body)
+
+    def test_job_gauges_do_not_load_jobs(self):
+        for _ in range(3):
+            jobs.enqueue("tickets.image_derivatives", {"ticket": 0}, delay=60)
+        with self.assertNumQueries(2):
+            depth = jobs.queue_depth()
+        self.assertEqual(depth["queued"], 3)
+
+    def test_aggregates_across_processes(self):
+        labels = {"route": "api/tickets/all/", "method": "GET", "status": "200"}
+        metrics.inc("http_requests_total", labels)
+        child = multiprocessing.get_context("fork").Process(target=_record_in_child)
+        child.start()
+        child.join()
+        totals = metrics.collect()
+        self.assertEqual(totals["http_requests_total", "", tuple(sorted(labels.items()))], 6)
+        # The exited process's in-flight request no longer counts.
+        self.assertNotIn(("http_requests_in_progress", "", ()), totals)
+
+        # Its counts moved to the archive, and only once.
+        directory = metrics.metrics_dir()
+        self.assertEqual(sorted(pid for _, pid in metrics._process_files(directory)), [os.getpid()])
+        self.assertIn(metrics.ARCHIVE_FILE, os.listdir(directory))
+        totals = metrics.collect()
+        self.assertEqual(totals["http_requests_total", "", tuple(sorted(labels.items()))], 6)
+
+        # A new process with this one's id (after a restart) keeps the old counts.
+        metrics._store.close()
+        metrics._store = None
+        metrics.inc("http_requests_total", labels)
+        totals = metrics.collect()
+        self.assertEqual(totals["http_requests_total", "", tuple(sorted(labels.items()))], 7)
+
+        call_command("reset_metrics", stdout=io.StringIO())
+        self.assertEqual(os.listdir(directory), [metrics.LOCK_FILE])
@@ -1,11 +1,21 @@
 from django.urls import path
-from tickets import views
+from tickets import realtime, views
 
 # <<<<<<<<<<<<<<<<< EXAMPLE FOR STARTER CODE USE <<<<<<<<<<<<<<<<<
 
 urlpatterns = [
     path('all/', views.get_all_tickets),
+    path('changes/', views.ticket_changes),
+    path('events/', realtime.ticket_event_stream),
+    path('stats/', views.get_ticket_stats),
+    path('jobs/stats/', views.get_job_stats),
+    path('search/', views.search_ticket_text),
+    path('export.<str:fmt>', views.export_tickets),
+    path('workorders.<str:fmt>', views.export_workorders),
+    path('workorders/batches/<int:job_id>/', views.workorder_batch),
     path('create/', views.create_ticket),
+    path('bulk/', views.bulk_tickets),
     path('update/<int:pk>/', views.update_ticket),
     path('<int:pk>/', views.delete_ticket),
+    path('<int:pk>/workorder/', views.ticket_workorder),
 ]
@@ -1,21 +1,57 @@
+import os
+import uuid
+from collections import OrderedDict
+
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, HttpResponseNotModified, StreamingHttpResponse
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.decorators import api_view, permission_classes
-from .models import Ticket
+from rest_framework.utils.urls import replace_query_param
+from .bulk import BulkPayloadError, apply_bulk
+from .changes import ChangeFeedExpired, changes_since, current_sequence
+from .counters import GROUP_FIELDS, ticket_stats
+from .export import EXPORT_FORMATS, export_rows, export_stream, iterate_async
+from .fast_serializer import ticket_rows
+from .filters import filter_tickets
+from .fragments import ticket_response
+from .jobs import enqueue, job_stats
+from .models import Job, Ticket
+from .pagination import TicketKeysetPagination
+from .search import search_tickets
 from .serializers import TicketSerializer
+from .workorder_store import (
+    MAX_WORKORDER_BATCH, WORKORDER_BATCH_JOB, WORKORDER_FORMATS, batch_path, get_workorder_store,
+    inline_batch_limit, pdf_stream, zip_stream,
+)
+from .workorders import WORKORDER_COLUMNS
+
 
+def _ticket_list_response(request, tickets):
+    """
+    Filter a ticket queryset by the request's query parameters and serialize
+    it, one keyset page at a time when the client asks for paging. Tickets
+    unchanged since they were last served are not re-serialized.
+    """
+    tickets = ticket_rows(filter_tickets(tickets, request.query_params))
+    paginator = TicketKeysetPagination()
+    if paginator.is_requested(request):
+        page = paginator.paginate_queryset(tickets, request)
+        return ticket_response(page, envelope=OrderedDict([
+            ('next', paginator.get_next_link()),
+            ('results', None),
+        ]))
+    return ticket_response(tickets)
 
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def get_all_tickets(request):
     """
-    Retrieve all tickets.
+    Retrieve all tickets, optionally filtered and keyset paginated.
     """
-    tickets = Ticket.objects.all()
-    serializer = TicketSerializer(tickets, many=True)
-    return Response(serializer.data)
+    return _ticket_list_response(request, Ticket.objects.all())
 
 
 @api_view(['GET', 'POST'])
@@ -25,32 +61,31 @@ def user_tickets(request):
     Retrieve tickets for the authenticated user or create a new ticket.
     Assumes Ticket model has a `user` field; if not, remove user filtering.
     """
-    print(f"User {request.user.id} {request.user.email} {request.user.username}")
+    print(f"User {request.user.id} {request.user.username}")
     if request.method == 'POST':
         serializer = TicketSerializer(data=request.data)
         if serializer.is_valid():
-            # Uncomment the following if your Ticket model supports a 'user' field.
-            # serializer.save(user=request.user)
-            serializer.save()
+            # user_id rather than user: request.user comes from the token
+            # claims and is not a model instance.
+            serializer.save(user_id=request.user.id)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     elif request.method == 'GET':
-        # Assumes that the Ticket model has a 'user' ForeignKey.
-        tickets = Ticket.objects.filter(user=request.user)
-        serializer = TicketSerializer(tickets, many=True)
-        return Response(serializer.data)
+        tickets = Ticket.objects.filter(user_id=request.user.id)
+        return _ticket_list_response(request, tickets)
 
 
 @api_view(['GET', 'POST'])
-@permission_classes([AllowAny])
+@permission_classes([IsAuthenticated])
 def create_ticket(request):
     """
-    Create a new ticket.
+    Create a new ticket, owned by the authenticated user.
     """
     if request.method == 'POST':
         serializer = TicketSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()  # or serializer.save(user=request.user) if applicable
+            # Owned by the authenticated user; the model requires an owner.
+            serializer.save(user_id=request.user.id)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     # Optionally support GET to return an empty serializer or guidance.
@@ -82,8 +117,7 @@ def update_ticket(request, pk):
         return Response(status=status.HTTP_204_NO_CONTENT)
     
     elif request.method == 'GET':
-        serializer = TicketSerializer(ticket)
-        return Response(serializer.data)
+        return ticket_response(ticket, many=False)
     
     return Response(status=status.HTTP_400_BAD_REQUEST)
 
@@ -111,7 +145,249 @@ def delete_ticket(request, pk):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     elif request.method == 'GET':
-        serializer = TicketSerializer(ticket)
-        return Response(serializer.data)
+        return ticket_response(ticket, many=False)
     
     return Response(status=status.HTTP_400_BAD_REQUEST)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def ticket_changes(request):
+    """
+    Incremental sync feed. Returns the tickets created or updated and the ids
+    of tickets deleted after change sequence `since`, plus the sequence to
+    poll from next.
+
+    Without `since` only the current sequence is returned: fetch it first,
+    then load the full list, then poll `?since=<seq>` for deltas.
+    A 410 response means the feed was pruned past `since`; resync from scratch.
+    Every change whose transaction commits within TICKET_CHANGE_SETTLE_SECONDS
+    of being written is delivered; newer changes may wait that long behind an
+    uncommitted one.
+    """
+    if 'since' not in request.query_params:
+        return Response({'seq': current_sequence(), 'has_more': False, 'tickets': [], 'deleted': []})
+
+    try:
+        since = int(request.query_params['since'])
+        limit = int(request.query_params.get('limit', 1000))
+    except ValueError:
+        return Response({'detail': 'since and limit must be integers.'}, status=status.HTTP_400_BAD_REQUEST)
+    limit = max(1, min(limit, 5000))
+
+    try:
+        seq, has_more, upserted, deleted = changes_since(since, limit)
+    except ChangeFeedExpired:
+        return Response({'detail': 'Change feed pruned past this sequence; resync required.'},
+                        status=status.HTTP_410_GONE)
+
+    tickets = Ticket.objects.filter(pk__in=upserted).order_by('id')
+    serializer = TicketSerializer(tickets, many=True)
+    return Response({
+        'seq': seq,
+        'has_more': has_more,
+        'tickets': serializer.data,
+        'deleted': deleted,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_ticket_stats(request):
+    """
+    Ticket counts by status, sub-department, main department and priority,
+    read from the incrementally maintained counters.
+    Use ?group_by=status,main_department to roll the buckets up.
+    """
+    group_by = GROUP_FIELDS
+    raw = request.query_params.get('group_by')
+    if raw:
+        group_by = tuple(field for field in raw.split(',') if field)
+        unknown = set(group_by) - set(GROUP_FIELDS)
+        if unknown:
+            return Response({'group_by': f"Unknown field(s): {', '.join(sorted(unknown))}."},
+                            status=status.HTTP_400_BAD_REQUEST)
+    buckets = ticket_stats(group_by)
+    return Response({
+        'total': sum(b['count'] for b in buckets),
+        'buckets': buckets,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def get_job_stats(request):
+    """
+    Background job queue depth, plus throughput and latency per job over
+    the last ?window=<seconds> (default one hour).
+    """
+    try:
+        window = int(request.query_params.get('window', 3600))
+    except ValueError:
+        window = 0
+    if window <= 0:
+        return Response({'window': 'Must be a positive number of seconds.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    return Response(job_stats(window))
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def search_ticket_text(request):
+    """
+    Ranked full-text search over ticket titles and issue text: ?q=<terms>.
+    Accepts the list filters, `page_size` and the `cursor` from `next`, and
+    returns facet counts by sub-department, priority and status. `truncated`
+    is true when a term was too common to rank every match; `count` and the
+    facets then cover the best-weighted ones.
+    """
+    query = request.query_params.get('q', '')
+    paginator = TicketKeysetPagination()
+    result = search_tickets(
+        query,
+        params=request.query_params,
+        page_size=paginator.get_page_size(request),
+        cursor=request.query_params.get('cursor'),
+    )
+
+    tickets = Ticket.objects.in_bulk([ticket_id for ticket_id, _ in result.ranked])
+    results = []
+    for ticket_id, score in result.ranked:
+        if ticket_id in tickets:
+            results.append(dict(TicketSerializer(tickets[ticket_id]).data, score=score))
+
+    next_link = None
+    if result.next_cursor:
+        next_link = replace_query_param(request.build_absolute_uri(), 'cursor', result.next_cursor)
+    return Response({
+        'count': result.total,
+        'next': next_link,
+        'truncated': result.truncated,
+        'facets': result.facets,
+        'results': results,
+    })
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def bulk_tickets(request):
+    """
+    Create, update and delete up to 1000 tickets in one transaction.
+    Body: {"create": [ticket, ...], "update": [{"id": ..., field: value}, ...], "delete": [id, ...]}.
+    Responds with a result per item; invalid items are skipped and reported.
+    """
+    try:
+        results = apply_bulk(request.data, request.user.id)
+    except BulkPayloadError as exc:
+        return Response({'detail': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(results)
+
+
+def _streaming_response(request, stream, content_type, filename):
+    # Served by an ASGI server, a sync iterator would be read to the end
+    # before the first byte is sent; hand it an async iterator instead.
+    if isinstance(request._request, ASGIRequest):
+        stream = iterate_async(stream)
+    response = StreamingHttpResponse(stream, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def export_tickets(request, fmt):
+    """
+    Stream every ticket matching the list filters as CSV (export.csv) or
+    newline-delimited JSON (export.ndjson). Rows are read through a
+    streaming cursor and written out as they arrive, so memory use does not
+    depend on the number of tickets exported. Under ASGI the chunks are
+    produced through an async iterator, so this holds there too.
+    """
+    if fmt not in EXPORT_FORMATS:
+        return Response({'detail': f"Unsupported format '{fmt}'."}, status=status.HTTP_404_NOT_FOUND)
+    tickets = filter_tickets(Ticket.objects.all(), request.query_params)
+    return _streaming_response(request, export_stream(fmt, export_rows(tickets)), EXPORT_FORMATS[fmt],
+                               f'tickets.{fmt}')
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def ticket_workorder(request, pk):
+    """
+    The ticket's work order form as a PNG, rendered on first request and
+    served from the disk cache until the ticket, its department names or
+    the template change.
+    """
+    try:
+        ticket = Ticket.objects.only(*WORKORDER_COLUMNS).get(pk=pk)
+    except Ticket.DoesNotExist:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+    key, image = get_workorder_store().open(ticket)
+    if request.headers.get('If-None-Match') == f'"{key}"':
+        image.close()
+        return HttpResponseNotModified()
+    response = FileResponse(image, content_type='image/png')
+    response['ETag'] = f'"{key}"'
+    response['Content-Disposition'] = f'inline; filename="workorder_ticket_{ticket.id}.png"'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_workorders(request, fmt):
+    """
+    The work orders of every ticket matching the list filters as a ZIP of
+    PNGs (workorders.zip) or a multi-page PDF (workorders.pdf).
+
+    Small batches are streamed one form at a time, through an async iterator
+    under ASGI. Larger ones are handed to the job queue: the response is 202
+    with the URL to download the file from once the job has rendered it.
+    """
+    if fmt not in WORKORDER_FORMATS:
+        return Response({'detail': f"Unsupported format '{fmt}'."}, status=status.HTTP_404_NOT_FOUND)
+    tickets = filter_tickets(Ticket.objects.all(), request.query_params).order_by('id')
+    count = tickets.count()
+    if count > MAX_WORKORDER_BATCH:
+        return Response({'detail': f'At most {MAX_WORKORDER_BATCH} work orders per request; narrow the filters.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if count > inline_batch_limit():
+        job = enqueue(WORKORDER_BATCH_JOB, {
+            'ticket_ids': list(tickets.values_list('id', flat=True)),
+            'fmt': fmt,
+            'name': uuid.uuid4().hex,
+            'owner_id': request.user.id,
+        })
+        return Response({
+            'job': job.id,
+            'status': job.status,
+            'url': request.build_absolute_uri(f'/api/tickets/workorders/batches/{job.id}/'),
+        }, status=status.HTTP_202_ACCEPTED)
+    rows = tickets.values_list(*WORKORDER_COLUMNS, named=True).iterator(chunk_size=500)
+    stream = zip_stream(rows) if fmt == 'zip' else pdf_stream(rows)
+    return _streaming_response(request, stream, WORKORDER_FORMATS[fmt], f'workorders.{fmt}')
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def workorder_batch(request, job_id):
+    """
+    Download a work order batch queued by export_workorders: 202 while it is
+    being rendered, the file once it is done. Only its requester sees it.
+    """
+    try:
+        job = Job.objects.get(pk=job_id, name=WORKORDER_BATCH_JOB)
+    except Job.DoesNotExist:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+    if job.payload.get('owner_id') != request.user.id:
+        return Response(status=status.HTTP_404_NOT_FOUND)
+    if job.status == Job.FAILED:
+        return Response({'job': job.id, 'status': job.status, 'detail': 'Rendering the work orders failed.'},
+                        status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    if job.status != Job.DONE:
+        return Response({'job': job.id, 'status': job.status}, status=status.HTTP_202_ACCEPTED)
+    fmt = job.payload['fmt']
+    path = batch_path(job.payload['name'], fmt)
+    if not os.path.exists(path):
+        return Response({'detail': 'This batch has expired; request it again.'}, status=status.HTTP_410_GONE)
+    return FileResponse(open(path, 'rb'), content_type=WORKORDER_FORMATS[fmt], as_attachment=True,
+                        filename=f'workorders.{fmt}')
@@ -0,0 +1,296 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import zipfile
+import zlib
+
+from django.conf import settings
+
+from . import workorders
+from .models import Ticket
+
+DEFAULT_CACHE_BYTES = 256 * 1024 * 1024
+
+WORKORDER_FORMATS = {
+    "zip": "application/zip",
+    "pdf": "application/pdf",
+}
+
+MAX_WORKORDER_BATCH = 5000
+# Batches up to this size are streamed from the request; larger ones are
+# rendered to a file by the tickets.workorder_batch job and downloaded when
+# it is done.
+DEFAULT_INLINE_BATCH = 200
+WORKORDER_BATCH_JOB = "tickets.workorder_batch"
+# Rendered batch files are removed after this many seconds.
+DEFAULT_BATCH_RETENTION = 24 * 60 * 60
+
+
+def _cache_dir():
+    return getattr(settings, "TICKET_WORKORDER_CACHE_DIR",
+                   os.path.join(settings.BASE_DIR, "generated_forms", "cache"))
+
+
+def _batch_dir():
+    return getattr(settings, "TICKET_WORKORDER_BATCH_DIR",
+                   os.path.join(settings.BASE_DIR, "generated_forms", "batches"))
+
+
+def inline_batch_limit():
+    return getattr(settings, "TICKET_WORKORDER_INLINE_BATCH", DEFAULT_INLINE_BATCH)
+
+
+class WorkOrderStore:
+    """
+    Disk cache of rendered work order PNGs with size-bounded LRU eviction.
+
+    Entries are named "<id>-<updated_at>-<digest>.png", where the digest
+    covers the template hash and every value printed on the form, so an
+    edited ticket, a renamed department or a new template each render
+    afresh. Superseded entries are never read again and age out. Reads bump
+    the file's mtime, which eviction treats as recency.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.size = None
+
+    def key(self, ticket, data, template_path=workorders.TEMPLATE_PATH):
+        content = json.dumps(data, sort_keys=True, default=str)
+        digest = hashlib.sha256(f"{workorders.template_hash(template_path)}\n{content}".encode()).hexdigest()
+        stamp = int(ticket.updated_at.timestamp() * 1_000_000)
+        return f"{ticket.id}-{stamp}-{digest[:20]}"
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.png")
+
+    def get(self, ticket, template_path=workorders.TEMPLATE_PATH):
+        """
+        Return (key, path) of the ticket's rendered work order, rendering it
+        on a miss.
+        """
+        data = workorders.workorder_data(ticket)
+        key = self.key(ticket, data, template_path)
+        path = self.path(key)
+        try:
+            os.utime(path)
+            return key, path
+        except FileNotFoundError:
+            pass
+
+        content = workorders.png_bytes(workorders.render_workorder(data, template_path))
+        os.makedirs(self.directory, exist_ok=True)
+        partial = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(partial, "wb") as output:
+            output.write(content)
+        os.replace(partial, path)
+        self._account(len(content))
+        return key, path
+
+    def open(self, ticket, template_path=workorders.TEMPLATE_PATH):
+        """
+        Return (key, open binary file) for the ticket's work order. Retries
+        once if eviction removes the entry between lookup and open.
+        """
+        for attempt in (1, 2):
+            key, path = self.get(ticket, template_path)
+            try:
+                return key, open(path, "rb")
+            except FileNotFoundError:
+                if attempt == 2:
+                    raise
+
+    def read(self, ticket, template_path=workorders.TEMPLATE_PATH):
+        _, cached = self.open(ticket, template_path)
+        with cached:
+            return cached.read()
+
+    def _entries(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        entries = []
+        for name in names:
+            if not name.endswith(".png"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def _account(self, delta):
+        with self.lock:
+            if self.size is None:
+                self.size = sum(size for _, size, _ in self._entries())
+            else:
+                self.size += delta
+            if self.size > self.max_bytes:
+                self.size = self._evict()
+
+    def _evict(self):
+        # Drop least recently used entries until under 90% of the budget,
+        # so eviction does not run again on the very next write.
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, name in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+        return total
+
+
+_store = None
+
+
+def get_workorder_store():
+    global _store
+    if _store is None:
+        _store = WorkOrderStore(
+            _cache_dir(), getattr(settings, "TICKET_WORKORDER_CACHE_BYTES", DEFAULT_CACHE_BYTES)
+        )
+    return _store
+
+
+class _StreamBuffer:
+    """
+    Write-only file object that zipfile writes into; hands back what was
+    written so far.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def zip_stream(tickets, store=None):
+    """
+    Yield a ZIP archive of work order PNGs, one entry at a time. PNGs are
+    already compressed, so entries are stored rather than deflated.
+    """
+    store = store or get_workorder_store()
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for ticket in tickets:
+            archive.writestr(f"workorder_ticket_{ticket.id}.png", store.read(ticket))
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+def pdf_stream(tickets, template_path=workorders.TEMPLATE_PATH):
+    """
+    Yield a PDF with one work order per page, written object by object so
+    only the current page is ever in memory. The page tree comes last,
+    once every page's object number is known.
+    """
+    template = workorders.load_template(template_path)
+    width, height = template.size
+    offsets = {}
+    position = 0
+    page_ids = []
+
+    def emit(number, body):
+        nonlocal position
+        chunk = b"%d 0 obj\n" % number + body + b"\nendobj\n"
+        offsets[number] = position
+        position += len(chunk)
+        return chunk
+
+    header = b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n"
+    position = len(header)
+    yield header + emit(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+
+    number = 3
+    for ticket in tickets:
+        image = workorders.render_workorder(workorders.workorder_data(ticket), template_path)
+        pixels = zlib.compress(image.tobytes(), 1)
+        image_id, content_id, page_id = number, number + 1, number + 2
+        number += 3
+        content = b"q %d 0 0 %d 0 0 cm /Im0 Do Q" % (width, height)
+        yield (
+            emit(image_id, b"<< /Type /XObject /Subtype /Image /Width %d /Height %d "
+                           b"/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /FlateDecode "
+                           b"/Length %d >>\nstream\n" % (width, height, len(pixels))
+                 + pixels + b"\nendstream")
+            + emit(content_id, b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+            + emit(page_id, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+                            b"/Resources << /XObject << /Im0 %d 0 R >> >> /Contents %d 0 R >>"
+                   % (width, height, image_id, content_id))
+        )
+        page_ids.append(page_id)
+
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    tail = emit(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids)))
+    xref_at = position
+    xref = [b"xref\n0 %d\n" % number, b"0000000000 65535 f \n"]
+    xref.extend(b"%010d 00000 n \n" % offsets[index] for index in range(1, number))
+    trailer = b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (number, xref_at)
+    yield tail + b"".join(xref) + trailer
+
+
+def batch_path(name, fmt):
+    return os.path.join(_batch_dir(), f"{name}.{fmt}")
+
+
+def _prune_batches(retention):
+    cutoff = time.time() - retention
+    try:
+        names = os.listdir(_batch_dir())
+    except FileNotFoundError:
+        return
+    for name in names:
+        path = os.path.join(_batch_dir(), name)
+        try:
+            if os.stat(path).st_mtime < cutoff:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def write_batch(ticket_ids, fmt, name):
+    """
+    Render the work orders of `ticket_ids` into batch_path(name, fmt) as a
+    ZIP or PDF, written under a temporary name and moved into place once
+    complete. Batch files older than TICKET_WORKORDER_BATCH_RETENTION
+    seconds are removed on the way.
+    """
+    _prune_batches(getattr(settings, "TICKET_WORKORDER_BATCH_RETENTION", DEFAULT_BATCH_RETENTION))
+    rows = (
+        Ticket.objects.filter(pk__in=ticket_ids).order_by("id")
+        .values_list(*workorders.WORKORDER_COLUMNS, named=True).iterator(chunk_size=500)
+    )
+    path = batch_path(name, fmt)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    partial = f"{path}.{os.getpid()}.tmp"
+    with open(partial, "wb") as output:
+        for chunk in zip_stream(rows) if fmt == "zip" else pdf_stream(rows):
+            output.write(chunk)
+    os.replace(partial, path)
+    return path
@@ -0,0 +1,229 @@
+import hashlib
+import io
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils import timezone
+from PIL import Image, ImageDraw, ImageFont
+
+from . import reference
+
+TEMPLATE_PATH = os.path.join(settings.BASE_DIR, "templates", "workorder.png")
+
+FONT_NAMES = ("arial.ttf", "Arial.ttf", "DejaVuSans.ttf")
+FONT_SIZE = 12
+
+# Where each value goes on the template, right of its printed label:
+# field -> ((x, y), wrap width in px, max lines, line pitch in px).
+# "Assigned to: Helpdesk" is printed on the template itself.
+LAYOUT = {
+    "department": ((142, 120), 240, 1, 14),
+    "ticket_number": ((450, 137), 90, 1, 14),
+    "date": ((450, 169), 90, 1, 14),
+    "sub_department": ((176, 222), 195, 2, 14),
+    "priority": ((432, 222), 110, 2, 14),
+    "issue_description": ((72, 338), 465, 3, 14),
+    "work_performed": ((72, 512), 465, 3, 29),
+}
+
+WORKORDER_COLUMNS = ("id", "issue", "sub_department_id", "PriorityLevel_id", "created_at", "updated_at")
+
+
+def _file_version(path):
+    # The cached template and hash are keyed on this, so an edited or
+    # replaced template file is picked up without restarting the process.
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_template(path=TEMPLATE_PATH):
+    """
+    Decode the blank form once per process and template version. Workers
+    forked after this call share the decoded pixels copy-on-write. The form
+    is black and white, so it is kept as 8-bit grayscale, which encodes to
+    PNG about 3x faster than RGB.
+    """
+    return _load_template(path, _file_version(path))
+
+
+@lru_cache(maxsize=4)
+def _load_template(path, version):
+    with Image.open(path) as image:
+        return image.convert("L")
+
+
+def template_hash(path=TEMPLATE_PATH):
+    """
+    SHA-256 of the template file, so cached renders follow template edits.
+    Re-read only when the file's mtime or size changes.
+    """
+    return _template_hash(path, _file_version(path))
+
+
+@lru_cache(maxsize=4)
+def _template_hash(path, version):
+    with open(path, "rb") as template:
+        return hashlib.sha256(template.read()).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def load_font(size=FONT_SIZE):
+    """
+    Arial as the original forms used, falling back to DejaVu Sans and then
+    Pillow's built-in font on hosts without it.
+    """
+    for name in FONT_NAMES:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+@lru_cache(maxsize=65536)
+def _text_width(text, size=FONT_SIZE):
+    return load_font(size).getlength(text)
+
+
+@lru_cache(maxsize=4096)
+def wrap_text(text, width, max_lines, size=FONT_SIZE):
+    """
+    Break `text` into lines no wider than `width` pixels, ending with an
+    ellipsis if it does not fit in `max_lines`. Word widths and whole
+    layouts are cached, as the same department names and issue texts recur
+    across tickets.
+    """
+    lines = []
+    for paragraph in text.splitlines() or [""]:
+        line = ""
+        for word in paragraph.split():
+            candidate = f"{line} {word}" if line else word
+            if line and _text_width(candidate, size) > width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        lines.append(line)
+    if len(lines) > max_lines:
+        lines = lines[:max_lines]
+        lines[-1] = lines[-1].rstrip() + "…"
+    return tuple(lines)
+
+
+def workorder_data(ticket):
+    """
+    The values printed on a work order, from a Ticket or a row with
+    WORKORDER_COLUMNS.
+    """
+    sub_department = reference.sub_department(ticket.sub_department_id)
+    priority = reference.priority(ticket.PriorityLevel_id)
+    return {
+        "ticket_number": ticket.id,
+        "department": sub_department.main_department.name if sub_department else "",
+        "sub_department": sub_department.name if sub_department else "",
+        "priority": str(priority) if priority else "",
+        "issue_description": ticket.issue,
+        "work_performed": "",
+        "date": timezone.localtime(ticket.created_at).strftime("%m/%d/%Y"),
+    }
+
+
+def render_workorder(data, template_path=TEMPLATE_PATH):
+    """
+    Draw one work order onto a copy of the decoded template.
+    """
+    image = load_template(template_path).copy()
+    draw = ImageDraw.Draw(image)
+    font = load_font()
+    for field, ((x, y), width, max_lines, pitch) in LAYOUT.items():
+        value = data.get(field)
+        if value in (None, ""):
+            continue
+        for line in wrap_text(str(value), width, max_lines):
+            draw.text((x, y), line, fill="black", font=font)
+            y += pitch
+    return image
+
+
+def png_bytes(image, compress_level=1):
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG", compress_level=compress_level)
+    return buffer.getvalue()
+
+
+def workorder_filename(data):
+    return f"workorder_ticket_{data['ticket_number']}.png"
+
+
+def save_workorder(data, output_dir, template_path=TEMPLATE_PATH, compress_level=1):
+    """
+    Render and write one work order; returns its path. PNG compression level
+    1 is several times faster than Pillow's default for a few percent more
+    bytes.
+    """
+    path = os.path.join(output_dir, workorder_filename(data))
+    render_workorder(data, template_path).save(path, "PNG", compress_level=compress_level)
+    return path
+
+
+def _save_chunk(chunk, output_dir, template_path):
+    return [save_workorder(data, output_dir, template_path) for data in chunk]
+
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _pool_context():
+    # fork lets workers inherit the decoded template and loaded fonts.
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("fork" if "fork" in methods else None)
+
+
+def render_batch(items, output_dir, workers=None, chunk_size=32, template_path=TEMPLATE_PATH, progress=None):
+    """
+    Render work orders for an iterable of workorder_data() dicts across a
+    process pool. Returns (count, elapsed seconds); `progress` is called
+    with the running count after each chunk.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count() or 1
+    started = time.monotonic()
+    load_template(template_path)
+    load_font()
+
+    count = 0
+    if workers == 1:
+        for chunk in _chunks(items, chunk_size):
+            count += len(_save_chunk(chunk, output_dir, template_path))
+            if progress:
+                progress(count)
+        return count, time.monotonic() - started
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+        pending = set()
+        for chunk in _chunks(items, chunk_size):
+            pending.add(pool.submit(_save_chunk, chunk, output_dir, template_path))
+            # Keep a bounded number of chunks in flight so a large queryset
+            # is never held in memory at once.
+            if len(pending) >= workers * 4:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                count += sum(len(future.result()) for future in done)
+                if progress:
+                    progress(count)
+        for future in pending:
+            count += len(future.result())
+    if progress:
+        progress(count)
+    return count, time.monotonic() - started
@@ -595,7 +595,8 @@ function createTicketCard(ticket) {
 
   // Insert basic details
   const MEDIA_URL = "http://10.10.10.1:8000";
-  const thumbnailSrc = ticket.image ? MEDIA_URL + ticket.image : "/static/default_thumbnail.jpg";
+  const thumbnailPath = ticket.image_thumbnail || ticket.image;
+  const thumbnailSrc = thumbnailPath ? MEDIA_URL + thumbnailPath : "/static/default_thumbnail.jpg";
 
   const infoDiv = document.createElement("div");
   infoDiv.innerHTML = `